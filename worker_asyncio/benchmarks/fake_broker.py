@@ -0,0 +1,236 @@
+"""
+Упрощенная замена RabbitMQ в памяти процесса для нагрузочного теста без брокера.
+
+Повторяет используемую консьюмерами часть интерфейса aiormq Connection/Channel:
+channel, basic_qos, queue_declare, exchange_declare (fanout), queue_bind, basic_consume, basic_ack, basic_nack.
+Сообщения доставляются с учетом prefetch_count, каждая доставка обрабатывается в отдельной asyncio задаче.
+"""
+
+import json
+import time
+import asyncio
+import itertools
+from datetime import datetime
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Set
+
+
+@dataclass
+class FakeDelivery:
+    delivery_tag: int
+    redelivered: bool = False
+
+
+@dataclass
+class FakeProperties:
+    timestamp: datetime = None
+
+
+@dataclass
+class FakeHeader:
+    properties: FakeProperties
+
+
+@dataclass
+class FakeDeliveredMessage:
+    body: bytes
+    channel: 'FakeChannel'
+    delivery: FakeDelivery
+    header: FakeHeader
+
+
+@dataclass
+class FakeDeclareOk:
+    queue: str
+
+
+@dataclass
+class BrokerStats:
+    published: int = 0
+    deliveries: int = 0
+    redeliveries: int = 0
+    acks: int = 0
+    nacks: int = 0
+
+
+@dataclass
+class SettledMessage:
+    queue: str
+    body: bytes
+    published_at: float
+    settled_at: float
+    acked: bool
+
+
+@dataclass
+class _QueuedMessage:
+    body: bytes
+    published_at: float
+    timestamp: datetime  # как свойство timestamp сообщения, выставленное издателем
+    redelivered: bool = False
+
+
+@dataclass
+class _Unacked:
+    queue: str
+    message: _QueuedMessage
+
+
+@dataclass
+class _FakeQueue:
+    name: str
+    messages: asyncio.Queue = field(default_factory=asyncio.Queue)
+
+
+class FakeBroker:
+    """Очереди и fanout обменники. Создается внутри запущенного event loop."""
+
+    def __init__(self) -> None:
+        self.stats = BrokerStats()
+        self.settled: List[SettledMessage] = []  # подтвержденные (ack) и отклоненные без возврата (nack) сообщения
+        self._queues: Dict[str, _FakeQueue] = {}
+        self._exchanges: Dict[str, Set[str]] = {}
+        self._unacked = 0
+        self._queue_names = itertools.count(1)
+
+    def publish(self, exchange: str, routing_key: str, body: bytes | str | dict) -> None:
+        """Пустой exchange - публикация напрямую в очередь routing_key (default exchange)"""
+        if isinstance(body, dict):
+            body = json.dumps(body)
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+
+        queue_names = self._exchanges.get(exchange, set()) if exchange else {routing_key}
+        for queue_name in queue_names:
+            self.declare_queue(queue_name).messages.put_nowait(_QueuedMessage(body, time.monotonic(), datetime.now()))
+            self.stats.published += 1
+
+    def declare_queue(self, queue_name: str = '') -> _FakeQueue:
+        queue_name = queue_name or f'amq.gen-{next(self._queue_names)}'
+        if queue_name not in self._queues:
+            self._queues[queue_name] = _FakeQueue(queue_name)
+        return self._queues[queue_name]
+
+    def declare_exchange(self, exchange: str) -> None:
+        self._exchanges.setdefault(exchange, set())
+
+    def bind(self, queue_name: str, exchange: str) -> None:
+        self._exchanges[exchange].add(queue_name)
+
+    async def connect(self) -> 'FakeConnection':
+        return FakeConnection(self)
+
+    @property
+    def is_drained(self) -> bool:
+        """Все сообщения доставлены и подтверждены"""
+        return not self._unacked and all(queue.messages.empty() for queue in self._queues.values())
+
+
+class FakeConnection:
+    def __init__(self, broker: FakeBroker) -> None:
+        self._broker = broker
+        self._channels: List[FakeChannel] = []
+
+    async def channel(self) -> 'FakeChannel':
+        channel = FakeChannel(self._broker)
+        self._channels.append(channel)
+        return channel
+
+    async def close(self) -> None:
+        for channel in self._channels:
+            await channel.close()
+
+
+class FakeChannel:
+    def __init__(self, broker: FakeBroker) -> None:
+        self._broker = broker
+        self._prefetch_count = 0
+        self._unacked: Dict[int, _Unacked] = {}
+        self._settled = asyncio.Event()
+        self._delivery_tags = itertools.count(1)
+        self._consumers: List[asyncio.Task] = []
+        self._handlers: Set[asyncio.Task] = set()
+
+    async def basic_qos(self, prefetch_count: int = 0, **kwargs: Any) -> None:
+        self._prefetch_count = prefetch_count
+
+    async def queue_declare(self, queue: str = '', **kwargs: Any) -> FakeDeclareOk:
+        return FakeDeclareOk(self._broker.declare_queue(queue).name)
+
+    async def exchange_declare(self, exchange: str, exchange_type: str = 'fanout', **kwargs: Any) -> None:
+        if exchange_type != 'fanout':
+            raise ValueError(f'Тип обменника {exchange_type} не поддерживается')
+        self._broker.declare_exchange(exchange)
+
+    async def queue_bind(self, queue: str, exchange: str, **kwargs: Any) -> None:
+        self._broker.bind(queue, exchange)
+
+    async def basic_publish(self, body: bytes, exchange: str = '', routing_key: str = '', **kwargs: Any) -> None:
+        self._broker.publish(exchange, routing_key, body)
+
+    async def basic_consume(self, queue: str, consumer_callback: Callable[[FakeDeliveredMessage], Awaitable],
+                            no_ack: bool = False, **kwargs: Any) -> None:
+        consumer = asyncio.create_task(self._consume(self._broker.declare_queue(queue), consumer_callback, no_ack))
+        self._consumers.append(consumer)
+
+    async def basic_ack(self, delivery_tag: int, **kwargs: Any) -> None:
+        self._settle(delivery_tag, requeue=None)
+
+    async def basic_nack(self, delivery_tag: int, requeue: bool = True, **kwargs: Any) -> None:
+        self._settle(delivery_tag, requeue=requeue)
+
+    async def basic_reject(self, delivery_tag: int, requeue: bool = True, **kwargs: Any) -> None:
+        self._settle(delivery_tag, requeue=requeue)
+
+    async def close(self) -> None:
+        for task in self._consumers + list(self._handlers):
+            task.cancel()
+
+    async def _consume(self, queue: _FakeQueue, callback: Callable, no_ack: bool) -> None:
+        while True:
+            while self._prefetch_count and not no_ack and len(self._unacked) >= self._prefetch_count:
+                self._settled.clear()
+                await self._settled.wait()
+
+            message = await queue.messages.get()
+            delivery_tag = next(self._delivery_tags)
+            self._broker.stats.deliveries += 1
+            self._broker.stats.redeliveries += message.redelivered
+
+            if no_ack:
+                self._broker.settled.append(
+                    SettledMessage(queue.name, message.body, message.published_at, time.monotonic(), acked=True)
+                )
+            else:
+                self._unacked[delivery_tag] = _Unacked(queue.name, message)
+                self._broker._unacked += 1
+
+            delivered_message = FakeDeliveredMessage(
+                body=message.body,
+                channel=self,
+                delivery=FakeDelivery(delivery_tag, message.redelivered),
+                header=FakeHeader(FakeProperties(timestamp=message.timestamp)),
+            )
+            handler = asyncio.create_task(callback(delivered_message))
+            self._handlers.add(handler)
+            handler.add_done_callback(self._handlers.discard)
+
+    def _settle(self, delivery_tag: int, requeue: bool | None) -> None:
+        """requeue=None - ack, иначе nack"""
+        unacked = self._unacked.pop(delivery_tag)
+        self._broker._unacked -= 1
+        self._settled.set()
+
+        if requeue is None:
+            self._broker.stats.acks += 1
+        else:
+            self._broker.stats.nacks += 1
+
+        if requeue:
+            unacked.message.redelivered = True
+            self._broker.declare_queue(unacked.queue).messages.put_nowait(unacked.message)
+        else:
+            self._broker.settled.append(SettledMessage(
+                unacked.queue, unacked.message.body, unacked.message.published_at, time.monotonic(),
+                acked=requeue is None,
+            ))
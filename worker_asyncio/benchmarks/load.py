@@ -0,0 +1,155 @@
+"""
+Нагрузочный тест воркера на замене RabbitMQ в памяти (FakeBroker), без брокера и docker-compose.
+
+Запускает CommandConsumer и TaskConsumer на одном соединении (как Worker), публикует смесь коротких и длинных задач,
+распределенных по сессиям, через cancel-after-sec секунд отменяет часть сессий командой в обменник команд
+и ждет подтверждения всех задач.
+Печатает json: пропускная способность, перцентили времени от публикации до подтверждения
+(отдельно для выполненных и отмененных задач), время отмены сессии (от команды до подтверждения
+последней задачи сессии), статистику брокера (повторные доставки) и метрики воркера.
+
+Воркер берет по одной задаче за раз и проверяет ее завершение раз в секунду,
+поэтому задач нужно меньше, чем для worker_multiprocessing.
+
+Запуск из директории worker_asyncio:
+python -m benchmarks.load --short 20 --long 2 --sessions 5 --cancel-sessions 1
+"""
+
+import json
+import time
+import random
+import asyncio
+import logging
+import argparse
+from asyncio import Queue
+from dataclasses import asdict
+from typing import Dict, List
+
+from worker_asyncio.consumer import CommandConsumer, TaskConsumer
+from worker_asyncio.metrics import WorkerMetrics
+from worker_asyncio.schema import CommandMessage, TaskMessage
+from worker_asyncio.utils import CanceledSessions
+
+from .fake_broker import FakeBroker
+
+COMMAND_EXCHANGE_NAME = 'wa_command_exchange'
+TASK_QUEUE_NAME = 'wa_task_queue'
+STATUSES = ('done', 'error', 'canceled', 'skipped')
+
+
+def sleep_task(task_message: TaskMessage) -> str:
+    time.sleep(task_message.payload['sleep_sec'])
+    return '{TASK_RESPONSE}'
+
+
+def percentiles(values: List[float]) -> Dict[str, float]:
+    if not values:
+        return {}
+    values = sorted(values)
+    pick = lambda q: values[min(len(values) - 1, int(q * len(values)))]  # noqa: E731
+    return {
+        'count': len(values),
+        'p50_ms': round(pick(0.5) * 1000, 2),
+        'p90_ms': round(pick(0.9) * 1000, 2),
+        'p99_ms': round(pick(0.99) * 1000, 2),
+        'max_ms': round(values[-1] * 1000, 2),
+    }
+
+
+def publish_tasks(broker: FakeBroker, args: argparse.Namespace) -> None:
+    rng = random.Random(args.seed)
+    tasks = [args.short_sec] * args.short + [args.long_sec] * args.long
+    rng.shuffle(tasks)
+
+    for task_id, sleep_sec in enumerate(tasks):
+        broker.publish('', TASK_QUEUE_NAME, {
+            'id': task_id,
+            'session_id': task_id % args.sessions,
+            'payload': {'sleep_sec': sleep_sec},
+        })
+
+
+async def run_load(args: argparse.Namespace) -> dict:
+    broker = FakeBroker()
+    connection = await broker.connect()
+
+    canceled_sessions = CanceledSessions(ttl_sec=3600, max_size=10000)
+    metrics = WorkerMetrics()
+    consumers = [
+        CommandConsumer(COMMAND_EXCHANGE_NAME, canceled_sessions=canceled_sessions),
+        TaskConsumer(TASK_QUEUE_NAME, sleep_task, canceled_sessions=canceled_sessions, metrics=metrics),
+    ]
+
+    canceled_at: Dict[int, float] = {}
+
+    async def cancel_sessions():
+        await asyncio.sleep(args.cancel_after_sec)
+        for session_id in range(args.cancel_sessions):
+            canceled_at[session_id] = time.monotonic()
+            broker.publish(COMMAND_EXCHANGE_NAME, '', {
+                'type': CommandMessage.Types.session_canceled,
+                'payload': {'session_id': session_id},
+            })
+
+    started_at = time.monotonic()
+    command_queue = Queue()
+    for consumer in consumers:
+        await consumer.start_consume(connection, command_queue)
+    publish_tasks(broker, args)
+    cancel_task = asyncio.create_task(cancel_sessions())
+
+    try:
+        while not (cancel_task.done() and broker.is_drained):
+            await asyncio.sleep(0.05)
+    finally:
+        cancel_task.cancel()
+        await connection.close()
+    wall_time_sec = time.monotonic() - started_at
+
+    latencies = {'done': [], 'canceled': []}
+    session_settled_at: Dict[int, float] = {}  # последнее подтверждение после отмены
+    for message in broker.settled:
+        if message.queue != TASK_QUEUE_NAME:
+            continue
+        session_id = json.loads(message.body)['session_id']
+        # задачи отмененной сессии, подтвержденные до команды отмены, считаются обычными
+        kind = 'canceled' if message.settled_at >= canceled_at.get(session_id, float('inf')) else 'done'
+        latencies[kind].append(message.settled_at - message.published_at)
+        if kind == 'canceled':
+            session_settled_at[session_id] = max(session_settled_at.get(session_id, 0), message.settled_at)
+
+    # сессии, все задачи которых подтверждены до команды отмены, не учитываются
+    cancel_latencies = [
+        session_settled_at[session_id] - cancel_time
+        for session_id, cancel_time in canceled_at.items() if session_id in session_settled_at
+    ]
+    tasks_settled = sum(len(values) for values in latencies.values())
+
+    return {
+        'wall_time_sec': round(wall_time_sec, 3),
+        'tasks_per_sec': round(tasks_settled / wall_time_sec, 2),
+        'publish_to_ack': {kind: percentiles(values) for kind, values in latencies.items()},
+        'cancel_to_session_acked': percentiles(cancel_latencies),
+        'broker': asdict(broker.stats),
+        'worker_tasks_total': {status: metrics.tasks_total.value(status=status) for status in STATUSES},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load test of the worker against an in-memory broker.')
+    parser.add_argument('--short', type=int, default=20, help='Number of short tasks')
+    parser.add_argument('--short-sec', type=float, default=0.01)
+    parser.add_argument('--long', type=int, default=2, help='Number of long tasks')
+    parser.add_argument('--long-sec', type=float, default=5)
+    parser.add_argument('--sessions', type=int, default=5)
+    parser.add_argument('--cancel-sessions', type=int, default=1, help='Number of sessions to cancel')
+    parser.add_argument('--cancel-after-sec', type=float, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    logging.getLogger('worker_async').setLevel(logging.WARNING)
+    print(json.dumps(asyncio.run(run_load(args)), indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# пакет worker_asyncio и benchmarks импортируются от корня проекта (как при запуске python -m)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
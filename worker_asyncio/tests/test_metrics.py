@@ -0,0 +1,21 @@
+from worker_asyncio.metrics import Counter, Histogram
+
+
+def test_histogram_bucket_upper_bound_is_inclusive():
+    histogram = Histogram('latency_seconds', 'Latency', buckets=(1, 0.1, 0.5))
+    for value in (0.1, 0.10001, 0.5, 1, 2):
+        histogram.observe(value)
+
+    lines = histogram.render()
+    assert 'latency_seconds_bucket{le="0.1"} 1' in lines
+    assert 'latency_seconds_bucket{le="0.5"} 3' in lines
+    assert 'latency_seconds_bucket{le="1"} 4' in lines
+    assert 'latency_seconds_bucket{le="+Inf"} 5' in lines
+    assert 'latency_seconds_count 5' in lines
+
+
+def test_counter_escapes_label_values():
+    counter = Counter('tasks_total', 'Tasks', ['status'])
+    counter.inc(status='a"b\\c\nd')
+
+    assert 'tasks_total{status="a\\"b\\\\c\\nd"} 1' in counter.render()
@@ -0,0 +1,47 @@
+import pytest
+
+from worker_asyncio import utils
+from worker_asyncio.utils import CanceledSessions
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(utils.time, 'monotonic', lambda: now[0])
+    return now
+
+
+def test_session_expires_after_ttl(clock):
+    sessions = CanceledSessions(ttl_sec=10, max_size=100)
+    sessions.add(1)
+    clock[0] += 9.9
+    assert 1 in sessions
+
+    clock[0] += 0.1
+    assert 1 not in sessions
+    assert len(sessions) == 0
+
+
+def test_oldest_sessions_evicted_on_overflow(clock):
+    sessions = CanceledSessions(ttl_sec=10, max_size=2)
+    for session_id in (1, 2, 3):
+        sessions.add(session_id)
+        clock[0] += 1
+
+    assert 1 not in sessions
+    assert 2 in sessions and 3 in sessions
+    assert len(sessions) == 2
+
+
+def test_readded_session_is_refreshed(clock):
+    sessions = CanceledSessions(ttl_sec=10, max_size=2)
+    sessions.add(1)
+    sessions.add(2)
+    clock[0] += 5
+    sessions.add(1)  # теперь самая новая: вытесняется 2, а срок 1 продлен
+    sessions.add(3)
+
+    assert 2 not in sessions
+    assert 1 in sessions and 3 in sessions
+    clock[0] += 9
+    assert 1 in sessions
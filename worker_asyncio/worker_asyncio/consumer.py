@@ -1,4 +1,5 @@
 import json
+import time
 import asyncio
 from typing import Callable, Any
 from asyncio.queues import Queue
@@ -9,6 +10,7 @@ import aiormq
 
 from . import schema, utils
 from .logger import logger
+from .metrics import WorkerMetrics
 
 
 class BaseConsumer(ABC):
@@ -18,8 +20,9 @@ class BaseConsumer(ABC):
 
 
 class CommandConsumer(BaseConsumer):
-    def __init__(self, command_exchange_name: str) -> None:
+    def __init__(self, command_exchange_name: str, canceled_sessions: utils.CanceledSessions = None) -> None:
         self._command_exchange_name = command_exchange_name
+        self._canceled_sessions = canceled_sessions
 
     async def start_consume(self, connection: aiormq.abc.AbstractConnection, command_queue: Queue) -> None:
         channel = await connection.channel()
@@ -29,18 +32,28 @@ class CommandConsumer(BaseConsumer):
 
         await channel.basic_consume(commands_queue.queue, partial(self._on_message, command_queue), no_ack=True)
 
-    @staticmethod
-    async def _on_message(command_queue: Queue, message: aiormq.abc.DeliveredMessage) -> None:
+    async def _on_message(self, command_queue: Queue, message: aiormq.abc.DeliveredMessage) -> None:
         logger.debug(f'Поступила сообщение в очередь команд: {message.body}')
         message_data = json.loads(message.body)
-        command_message = schema.CommandMessage(**message_data)
+        command_message = schema.CommandMessage(**message_data, received_at=time.time())
+
+        # запоминаем отмененную сессию, чтобы ее задачи из очереди не запускались
+        if command_message.type == schema.CommandMessage.Types.session_canceled and self._canceled_sessions is not None:
+            self._canceled_sessions.add(command_message.payload['session_id'])
+
         await command_queue.put(command_message)
 
 
 class TaskConsumer(BaseConsumer):
-    def __init__(self, tasks_queue_name: str, task_handler: Callable[[schema.TaskMessage], Any]) -> None:
+    def __init__(self, tasks_queue_name: str, task_handler: Callable[[schema.TaskMessage], Any],
+                 canceled_sessions: utils.CanceledSessions = None, metrics: WorkerMetrics = None) -> None:
         self._tasks_queue_name = tasks_queue_name
         self._task_handler = task_handler
+        self._canceled_sessions = canceled_sessions
+        self._busy_tasks = 0
+
+        self.metrics = metrics or WorkerMetrics()
+        self.metrics.add_gauge('worker_busy_slots', 'Slots running a task', lambda: self._busy_tasks)
 
     async def start_consume(self, connection: aiormq.abc.AbstractConnection, command_queue: Queue) -> None:
         channel = await connection.channel()
@@ -54,6 +67,30 @@ class TaskConsumer(BaseConsumer):
         message_data = json.loads(message.body)
         task_message = schema.TaskMessage(**message_data)
 
+        if self._canceled_sessions is not None and task_message.session_id in self._canceled_sessions:
+            await message.channel.basic_ack(message.delivery.delivery_tag)
+            logger.info(f'Задача #{task_message.id} пропущена, сессия отменена')
+            self.metrics.tasks_total.inc(status='skipped')
+            return
+
+        self._busy_tasks += 1
+        started_at = time.monotonic()
+        published_at = message.header.properties.timestamp
+        self.metrics.queue_to_start_seconds.observe(
+            max(0.0, time.time() - published_at.timestamp()) if published_at else 0.0
+        )
+
+        try:
+            status = await self._run_task(command_queue, message, task_message)
+        finally:
+            self._busy_tasks -= 1
+
+        self.metrics.run_seconds.observe(time.monotonic() - started_at)
+        self.metrics.tasks_total.inc(status=status)
+
+    async def _run_task(self, command_queue: Queue, message: aiormq.abc.DeliveredMessage,
+                        task_message: schema.TaskMessage) -> str:
+        """Выполняет задачу и возвращает статус ее завершения: done, error или canceled"""
         # loop.run_in_executor не позволяет отменить задачу если она уже начала выполняться
         # поэтому создаем и управляем процессом самостоятельно
         task_process = utils.TaskRunner(target=self._task_handler, args=(task_message,))
@@ -68,7 +105,7 @@ class TaskConsumer(BaseConsumer):
                 else:
                     logger.info(f'Подтверждаю завершение задачи #{task_message.id}')
                 await message.channel.basic_ack(message.delivery.delivery_tag)
-                break
+                return 'error' if type(result) == schema.TaskError else 'done'
 
             if not command_queue.empty():
                 command_message: schema.CommandMessage = await command_queue.get()
@@ -76,9 +113,12 @@ class TaskConsumer(BaseConsumer):
                 if command_message.type == schema.CommandMessage.Types.session_canceled:
                     if task_message.session_id == command_message.payload['session_id']:
                         task_process.terminate()
+                        await asyncio.get_running_loop().run_in_executor(None, task_process.join)
+                        if command_message.received_at:
+                            self.metrics.cancel_to_terminate_seconds.observe(time.time() - command_message.received_at)
                         await message.channel.basic_ack(message.delivery.delivery_tag)
                         logger.info(f'Задача #{task_message.id} отменена')
-                        break
+                        return 'canceled'
 
                 if command_message.type == schema.CommandMessage.Types.say_hello:
                     logger.info('Hello!')
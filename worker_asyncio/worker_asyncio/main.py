@@ -6,6 +6,8 @@ from .worker import Worker
 from .consumer import CommandConsumer, TaskConsumer
 from .schema import TaskMessage
 from .logger import logger
+from .utils import CanceledSessions
+from .metrics import WorkerMetrics, MetricsServer
 
 
 def blocking_task(task_message: TaskMessage) -> str:
@@ -18,13 +20,19 @@ def blocking_task(task_message: TaskMessage) -> str:
     return '{TASK_RESPONSE}'
 
 
-def start_worker():
+def start_worker(metrics: WorkerMetrics, metrics_server: MetricsServer):
+    # задачи отмененных сессий подтверждаются без запуска (сессии помнятся сутки, не больше 10000)
+    canceled_sessions = CanceledSessions(ttl_sec=24 * 60 * 60, max_size=10000)
+
     command_consumer = CommandConsumer(
         command_exchange_name='wa_command_exchange',
+        canceled_sessions=canceled_sessions,
     )
     task_consumer = TaskConsumer(
         tasks_queue_name='wa_task_queue',
         task_handler=blocking_task,
+        canceled_sessions=canceled_sessions,
+        metrics=metrics,
     )
 
     worker = Worker(
@@ -33,15 +41,20 @@ def start_worker():
             command_consumer,
             task_consumer,
         ],
+        metrics_server=metrics_server,
     )
 
     worker.run()
 
 
 def main():
+    # метрики в формате Prometheus на http://localhost:9100/metrics, сохраняются между переподключениями
+    metrics = WorkerMetrics()
+    metrics_server = MetricsServer(metrics, host='0.0.0.0', port=9100)
+
     while True:
         try:
-            start_worker()
+            start_worker(metrics, metrics_server)
         except aiormq.exceptions.AMQPConnectionError:
             logger.info('Connection error, wait 5 seconds and retry...')
             time.sleep(5)
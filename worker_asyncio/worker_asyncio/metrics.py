@@ -0,0 +1,171 @@
+import bisect
+import asyncio
+from threading import Lock
+from typing import Callable, Dict, List, Sequence, Tuple
+
+from .logger import logger
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300, 900, 3600)
+
+
+def _escape_label_value(value: str) -> str:
+    """Экранирование значения метки по текстовому формату Prometheus"""
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(label_names: Sequence[str], label_values: Tuple[str, ...]) -> str:
+    pairs = [f'{name}="{_escape_label_value(value)}"' for name, value in zip(label_names, label_values)]
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class Metric:
+    """Метрика в текстовом формате Prometheus"""
+    type_name = 'untyped'
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._lock = Lock()
+
+    def render(self) -> List[str]:
+        return [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.type_name}']
+
+    def _label_values(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels[name]) for name in self.label_names)
+
+
+class Counter(Metric):
+    type_name = 'counter'
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = ()) -> None:
+        super().__init__(name, documentation, label_names)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = self._label_values(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels: str) -> float:
+        key = self._label_values(labels)
+        with self._lock:
+            return self._values.get(key, 0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = dict(self._values)
+        return super().render() + [
+            f'{self.name}{_format_labels(self.label_names, key)} {value}' for key, value in values.items()
+        ]
+
+
+class Gauge(Metric):
+    """Значение вычисляется функцией в момент запроса метрик"""
+    type_name = 'gauge'
+
+    def __init__(self, name: str, documentation: str, function: Callable[[], float]) -> None:
+        super().__init__(name, documentation)
+        self._function = function
+
+    def render(self) -> List[str]:
+        return super().render() + [f'{self.name} {self._function()}']
+
+
+class Histogram(Metric):
+    type_name = 'histogram'
+
+    def __init__(self, name: str, documentation: str, buckets: Sequence[float] = DEFAULT_BUCKETS) -> None:
+        super().__init__(name, documentation)
+        self._buckets = tuple(sorted(buckets))
+        self._counts = [0] * (len(self._buckets) + 1)
+        self._sum = 0.0
+
+    def observe(self, value: float) -> None:
+        with self._lock:
+            self._counts[bisect.bisect_left(self._buckets, value)] += 1
+            self._sum += value
+
+    def render(self) -> List[str]:
+        with self._lock:
+            counts, total_sum = list(self._counts), self._sum
+
+        lines = super().render()
+        cumulative = 0
+        for upper_bound, count in zip(self._buckets, counts):
+            cumulative += count
+            lines.append(f'{self.name}_bucket{{le="{upper_bound}"}} {cumulative}')
+        cumulative += counts[-1]
+        lines.append(f'{self.name}_bucket{{le="+Inf"}} {cumulative}')
+        lines.append(f'{self.name}_sum {total_sum}')
+        lines.append(f'{self.name}_count {cumulative}')
+        return lines
+
+
+class WorkerMetrics:
+    """Метрики воркера. Статусы задач: done, error, canceled, skipped (отмененная сессия, не запускалась)."""
+
+    def __init__(self) -> None:
+        self.queue_to_start_seconds = Histogram(
+            'worker_task_queue_to_start_seconds',
+            'Time from publishing (or receiving if no timestamp) to start of the task',
+        )
+        self.run_seconds = Histogram('worker_task_run_seconds', 'Task run time until done, error or cancel')
+        self.cancel_to_terminate_seconds = Histogram(
+            'worker_task_cancel_to_terminate_seconds',
+            'Time from session cancel command to termination of the task process',
+        )
+        self.tasks_total = Counter('worker_tasks_total', 'Finished tasks by status', ['status'])
+        self._metrics: List[Metric] = [
+            self.queue_to_start_seconds,
+            self.run_seconds,
+            self.cancel_to_terminate_seconds,
+            self.tasks_total,
+        ]
+
+    def add_gauge(self, name: str, documentation: str, function: Callable[[], float]) -> None:
+        """Добавляет gauge (gauge с тем же именем заменяется)"""
+        self._metrics = [metric for metric in self._metrics if metric.name != name]
+        self._metrics.append(Gauge(name, documentation, function))
+
+    def render(self) -> str:
+        return '\n'.join(line for metric in self._metrics for line in metric.render()) + '\n'
+
+
+class MetricsServer:
+    """HTTP сервер на asyncio, отдающий метрики на /metrics"""
+
+    def __init__(self, metrics: WorkerMetrics, host: str, port: int) -> None:
+        self._metrics = metrics
+        self._host = host
+        self._port = port
+        self._server = None
+
+    async def start(self) -> None:
+        """Запускает сервер (повторный вызов, например при переподключении воркера, ничего не делает)"""
+        if self._server is None:
+            self._server = await asyncio.start_server(self._on_connection, self._host, self._port)
+
+    async def _on_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            request_line = await reader.readline()
+            while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+                pass  # заголовки запроса не нужны
+
+            parts = request_line.decode('latin-1').split()
+            if len(parts) >= 2 and parts[0] == 'GET' and parts[1].split('?')[0] == '/metrics':
+                status, body = '200 OK', self._metrics.render().encode('utf-8')
+            else:
+                status, body = '404 Not Found', b'Not Found\n'
+
+            writer.write(
+                f'HTTP/1.1 {status}\r\n'
+                f'Content-Type: text/plain; version=0.0.4; charset=utf-8\r\n'
+                f'Content-Length: {len(body)}\r\n'
+                f'Connection: close\r\n\r\n'.encode('latin-1') + body
+            )
+            await writer.drain()
+        except ConnectionError as error:
+            logger.debug(f'Ошибка соединения с сервером метрик: {error}')
+        finally:
+            writer.close()
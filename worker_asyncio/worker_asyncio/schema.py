@@ -18,6 +18,7 @@ class CommandMessage:
 
     type: Types
     payload: Any = None
+    received_at: float = None  # время получения команды воркером (time.time())
 
 
 @dataclass
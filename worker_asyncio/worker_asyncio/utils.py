@@ -1,4 +1,6 @@
+import time
 import traceback
+from collections import OrderedDict
 from multiprocessing import Process, Manager
 
 from . import schema
@@ -24,3 +26,38 @@ class TaskRunner(Process):
     def result(self):
         if len(self._calc_result):
             return self._calc_result[0]
+
+
+class CanceledSessions:
+    """
+    Отмененные сессии, которые помнятся ttl_sec секунд.
+
+    Хранится не больше max_size сессий, при переполнении забываются самые старые.
+    """
+
+    def __init__(self, ttl_sec: float, max_size: int) -> None:
+        self._ttl_sec = ttl_sec
+        self._max_size = max_size
+        self._expires_at: OrderedDict[int, float] = OrderedDict()
+
+    def add(self, session_id: int) -> None:
+        self._expires_at[session_id] = time.monotonic() + self._ttl_sec
+        self._expires_at.move_to_end(session_id)
+        self._evict()
+
+    def __contains__(self, session_id: int) -> bool:
+        expires_at = self._expires_at.get(session_id)
+        return expires_at is not None and expires_at > time.monotonic()
+
+    def __len__(self) -> int:
+        self._evict()
+        return len(self._expires_at)
+
+    def _evict(self) -> None:
+        # сессии упорядочены по времени добавления, а значит и по времени истечения
+        now = time.monotonic()
+        while self._expires_at:
+            session_id, expires_at = next(iter(self._expires_at.items()))
+            if expires_at > now and len(self._expires_at) <= self._max_size:
+                break
+            self._expires_at.popitem(last=False)
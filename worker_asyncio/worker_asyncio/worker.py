@@ -5,12 +5,14 @@ from typing import List
 import aiormq
 
 from .consumer import BaseConsumer
+from .metrics import MetricsServer
 
 
 class Worker:
-    def __init__(self, connection_url: str, consumers: List[BaseConsumer]):
+    def __init__(self, connection_url: str, consumers: List[BaseConsumer], metrics_server: MetricsServer = None):
         self._connection_url = connection_url
         self._consumers = consumers
+        self._metrics_server = metrics_server
 
     def run(self):
         loop = asyncio.get_event_loop()
@@ -18,6 +20,9 @@ class Worker:
         loop.run_forever()
 
     async def _start_consumers(self):
+        if self._metrics_server:
+            await self._metrics_server.start()
+
         command_queue = Queue()
         connection = await aiormq.connect(self._connection_url)
 
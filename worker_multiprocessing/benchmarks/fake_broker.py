@@ -0,0 +1,223 @@
+"""
+Упрощенная замена RabbitMQ в памяти процесса для бенчмарков без брокера.
+
+Повторяет используемую воркером часть интерфейса pika BlockingConnection/BlockingChannel:
+basic_qos, basic_consume, start_consuming, basic_ack, basic_nack, add_callback_threadsafe, process_data_events.
+Если соединение не обслуживается дольше двух интервалов heartbeat (как в RabbitMQ), брокер считает его оборванным:
+неподтвержденные сообщения возвращаются в очередь (redelivered), а подтверждения по старым delivery_tag игнорируются.
+"""
+
+import json
+import time
+import heapq
+import itertools
+from queue import Empty, SimpleQueue
+from threading import Lock
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List
+
+
+@dataclass
+class FakeMethodFrame:
+    delivery_tag: int
+    redelivered: bool = False
+
+
+@dataclass
+class FakeProperties:
+    priority: int = 0
+
+
+@dataclass
+class BrokerStats:
+    published: int = 0
+    deliveries: int = 0
+    redeliveries: int = 0
+    acks: int = 0
+    nacks: int = 0
+    stale_acks: int = 0
+    connection_drops: int = 0
+    max_heartbeat_gap_sec: float = 0.0
+
+
+@dataclass
+class SettledMessage:
+    body: bytes
+    published_at: float
+    settled_at: float
+    acked: bool
+
+
+@dataclass(order=True)
+class _QueuedMessage:
+    sort_key: tuple
+    body: bytes = field(compare=False)
+    published_at: float = field(default=0.0, compare=False)
+    redelivered: bool = field(default=False, compare=False)
+
+
+class FakeBroker:
+    """Одна очередь с приоритетами (как x-max-priority), prefetch и подсчетом повторных доставок"""
+
+    def __init__(self, heartbeat_sec: float = 60, max_deliveries: int = None) -> None:
+        self.heartbeat_sec = heartbeat_sec
+        self.max_deliveries = max_deliveries
+        self.stats = BrokerStats()
+        self.settled: List[SettledMessage] = []  # подтвержденные (ack) и отклоненные без возврата (nack) сообщения
+        self._ready: List[_QueuedMessage] = []
+        self._unacked: Dict[int, _QueuedMessage] = {}
+        self._order = itertools.count()
+        self._delivery_tags = itertools.count(1)
+        self._lock = Lock()
+
+    def publish(self, body: bytes | str | dict, priority: int = 0) -> None:
+        if isinstance(body, dict):
+            body = json.dumps(body)
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        with self._lock:
+            message = _QueuedMessage((-priority, next(self._order)), body, published_at=time.monotonic())
+            heapq.heappush(self._ready, message)
+            self.stats.published += 1
+
+    def connect(self) -> 'FakeConnection':
+        return FakeConnection(self)
+
+    @property
+    def is_drained(self) -> bool:
+        """Все сообщения подтверждены или достигнут лимит доставок"""
+        with self._lock:
+            if self.max_deliveries is not None and self.stats.deliveries >= self.max_deliveries and not self._unacked:
+                return True
+            return not self._ready and not self._unacked
+
+    def _next_message(self, prefetch_count: int) -> tuple | None:
+        with self._lock:
+            if not self._ready or (prefetch_count and len(self._unacked) >= prefetch_count):
+                return None
+            if self.max_deliveries is not None and self.stats.deliveries >= self.max_deliveries:
+                return None
+
+            message = heapq.heappop(self._ready)
+            delivery_tag = next(self._delivery_tags)
+            self._unacked[delivery_tag] = message
+            self.stats.deliveries += 1
+            self.stats.redeliveries += message.redelivered
+            return delivery_tag, message
+
+    def _settle(self, delivery_tag: int, requeue: bool | None) -> None:
+        """requeue=None - ack, иначе nack"""
+        with self._lock:
+            message = self._unacked.pop(delivery_tag, None)
+            if message is None:
+                self.stats.stale_acks += 1
+                return
+
+            if requeue is None:
+                self.stats.acks += 1
+                self.settled.append(SettledMessage(message.body, message.published_at, time.monotonic(), acked=True))
+                return
+
+            self.stats.nacks += 1
+            if requeue:
+                message.redelivered = True
+                heapq.heappush(self._ready, message)
+            else:
+                self.settled.append(SettledMessage(message.body, message.published_at, time.monotonic(), acked=False))
+
+    def _drop_connection(self) -> None:
+        with self._lock:
+            self.stats.connection_drops += 1
+            for message in self._unacked.values():
+                message.redelivered = True
+                heapq.heappush(self._ready, message)
+            self._unacked.clear()
+
+
+class FakeConnection:
+    def __init__(self, broker: FakeBroker) -> None:
+        self._broker = broker
+        self._callbacks = SimpleQueue()
+        self._channel = FakeChannel(self, broker)
+        self._serviced_at = time.monotonic()
+        self.is_open = True
+
+    def channel(self) -> 'FakeChannel':
+        return self._channel
+
+    def add_callback_threadsafe(self, callback: Callable) -> None:
+        if not self.is_open:
+            raise ConnectionError('Connection is closed')
+        self._callbacks.put(callback)
+
+    def process_data_events(self, time_limit: float = 0) -> None:
+        deadline = time.monotonic() + time_limit
+
+        while True:
+            self._service_heartbeat()
+            self._channel._deliver()
+
+            try:
+                callback = self._callbacks.get(timeout=max(0.0, min(deadline - time.monotonic(), 0.01)))
+            except Empty:
+                pass
+            else:
+                callback()
+
+            if time.monotonic() >= deadline:
+                return
+
+    def close(self) -> None:
+        self.is_open = False
+
+    def _service_heartbeat(self) -> None:
+        now = time.monotonic()
+        gap = now - self._serviced_at
+        self._serviced_at = now
+        self._broker.stats.max_heartbeat_gap_sec = max(self._broker.stats.max_heartbeat_gap_sec, gap)
+
+        if gap > 2 * self._broker.heartbeat_sec:
+            self._broker._drop_connection()
+
+
+class FakeChannel:
+    def __init__(self, connection: FakeConnection, broker: FakeBroker) -> None:
+        self.connection = connection
+        self._broker = broker
+        self._prefetch_count = 0
+        self._on_message_callback = None
+
+    @property
+    def is_open(self) -> bool:
+        return self.connection.is_open
+
+    def basic_qos(self, prefetch_count: int = 0) -> None:
+        self._prefetch_count = prefetch_count
+
+    def basic_consume(self, queue: str = None, on_message_callback: Callable = None, **kwargs: Any) -> None:
+        self._on_message_callback = on_message_callback
+
+    def basic_ack(self, delivery_tag: int) -> None:
+        self._broker._settle(delivery_tag, requeue=None)
+
+    def basic_nack(self, delivery_tag: int, requeue: bool = True) -> None:
+        self._broker._settle(delivery_tag, requeue=requeue)
+
+    def start_consuming(self) -> None:
+        """В отличие от pika завершается, когда все сообщения брокера обработаны"""
+        while self.is_open and not self._broker.is_drained:
+            self.connection.process_data_events(time_limit=0.05)
+
+    def stop_consuming(self) -> None:
+        self.connection.close()
+
+    def _deliver(self) -> None:
+        if self._on_message_callback is None:
+            return
+
+        while (next_message := self._broker._next_message(self._prefetch_count)) is not None:
+            delivery_tag, message = next_message
+            method_frame = FakeMethodFrame(delivery_tag, message.redelivered)
+            properties = FakeProperties(priority=-message.sort_key[0])
+            self._on_message_callback(self, method_frame, properties, message.body)
+            self.connection._service_heartbeat()
@@ -0,0 +1,84 @@
+"""
+Бенчмарк повторных доставок задач, которые выполняются дольше интервала heartbeat.
+
+Воркер получает задачи из FakeBroker (замена RabbitMQ в памяти) в двух режимах:
+blocking - обработчик сообщения ждет завершения задачи в потоке соединения (как раньше),
+threaded - задачи выполняются в потоке WorkerTask, подтверждения передаются через add_callback_threadsafe.
+Для каждого режима печатается json со статистикой брокера (redeliveries, connection_drops, max_heartbeat_gap_sec).
+
+Запуск из директории worker_multiprocessing:
+python -m benchmarks.heartbeat --tasks 4 --task-sec 3 --heartbeat-sec 1 --slots 2
+"""
+
+import time
+import json
+import logging
+import argparse
+from dataclasses import asdict
+from multiprocessing import Queue
+from typing import Generator
+
+from worker_multiprocessing import schema
+from worker_multiprocessing.task import Task
+from worker_multiprocessing.worker import WorkerTask
+
+from .fake_broker import FakeBroker
+
+
+class SleepTask(Task):
+    def run(self, task_message: schema.TaskMessage) -> Generator[schema.TaskProgress | schema.TaskDone, None, None]:
+        time.sleep(task_message.payload['sleep_sec'])
+        yield schema.TaskDone(task_id=task_message.id)
+
+
+def run_mode(mode: str, tasks: int, task_sec: float, heartbeat_sec: float, slots: int) -> dict:
+    # задачи, которые снова и снова обрываются по heartbeat, не должны выполняться бесконечно
+    broker = FakeBroker(heartbeat_sec=heartbeat_sec, max_deliveries=tasks * 3)
+    for task_id in range(tasks):
+        broker.publish({'id': task_id, 'session_id': 1, 'payload': {'sleep_sec': task_sec}})
+
+    worker_task = WorkerTask([Queue() for _ in range(slots)], 'bench', SleepTask())
+    channel = broker.connect().channel()
+    channel.basic_qos(prefetch_count=slots)
+
+    if mode == 'threaded':
+        worker_task.start()
+        on_message_callback = worker_task
+    else:
+        def on_message_callback(ch, method_frame, header_frame, body):
+            worker_task.on_message(ch, method_frame, header_frame, body)
+            worker_task.process_events(timeout=0)
+            while worker_task.busy_slots:
+                worker_task.process_events(timeout=None)
+
+    channel.basic_consume(on_message_callback=on_message_callback)
+
+    started_at = time.perf_counter()
+    try:
+        channel.start_consuming()
+    finally:
+        worker_task.close()
+
+    return {
+        'mode': mode,
+        'wall_time_sec': round(time.perf_counter() - started_at, 3),
+        **asdict(broker.stats),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmarks task redeliveries caused by missed heartbeats.')
+    parser.add_argument('--tasks', type=int, default=4)
+    parser.add_argument('--task-sec', type=float, default=3)
+    parser.add_argument('--heartbeat-sec', type=float, default=1)
+    parser.add_argument('--slots', type=int, default=2)
+    parser.add_argument('--modes', nargs='+', choices=['blocking', 'threaded'], default=['blocking', 'threaded'])
+    args = parser.parse_args()
+
+    logging.getLogger('worker').setLevel(logging.WARNING)
+    report = [run_mode(mode, args.tasks, args.task_sec, args.heartbeat_sec, args.slots) for mode in args.modes]
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
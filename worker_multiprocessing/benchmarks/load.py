@@ -0,0 +1,155 @@
+"""
+Нагрузочный тест воркера на замене RabbitMQ в памяти (FakeBroker), без брокера и docker-compose.
+
+Публикует смесь коротких и длинных задач, распределенных по сессиям, через cancel-after-sec секунд
+отменяет часть сессий командой (WorkerCommand) и ждет подтверждения всех сообщений.
+Печатает json: пропускная способность, перцентили времени от публикации до подтверждения
+(отдельно для выполненных и отмененных задач), время отмены сессии (от команды до подтверждения
+последней задачи сессии), статистику брокера (повторные доставки) и метрики воркера.
+
+Запуск из директории worker_multiprocessing:
+python -m benchmarks.load --slots 4 --prefetch-window 8 --short 500 --long 8 --sessions 20 --cancel-sessions 4
+"""
+
+import json
+import time
+import random
+import logging
+import argparse
+from threading import Thread
+from dataclasses import asdict
+from multiprocessing import Queue
+from typing import Dict, Generator, List
+
+from worker_multiprocessing import schema
+from worker_multiprocessing.task import Task
+from worker_multiprocessing.utils import CanceledSessions
+from worker_multiprocessing.worker import WorkerCommand, WorkerTask
+
+from .fake_broker import FakeBroker
+
+STATUSES = ('done', 'error', 'timeout', 'canceled', 'skipped')
+
+
+class LoadTask(Task):
+    def run(self, task_message: schema.TaskMessage) -> Generator[schema.TaskProgress | schema.TaskDone, None, None]:
+        sleep_sec = task_message.payload['sleep_sec']
+        time.sleep(sleep_sec / 2)
+        yield schema.TaskProgress(message='half', in_percentages=50)
+        time.sleep(sleep_sec / 2)
+        yield schema.TaskDone(task_id=task_message.id)
+
+
+def percentiles(values: List[float]) -> Dict[str, float]:
+    if not values:
+        return {}
+    values = sorted(values)
+    pick = lambda q: values[min(len(values) - 1, int(q * len(values)))]  # noqa: E731
+    return {
+        'count': len(values),
+        'p50_ms': round(pick(0.5) * 1000, 2),
+        'p90_ms': round(pick(0.9) * 1000, 2),
+        'p99_ms': round(pick(0.99) * 1000, 2),
+        'max_ms': round(values[-1] * 1000, 2),
+    }
+
+
+def publish_tasks(broker: FakeBroker, args: argparse.Namespace) -> None:
+    rng = random.Random(args.seed)
+    tasks = [args.short_sec] * args.short + [args.long_sec] * args.long
+    rng.shuffle(tasks)
+
+    for task_id, sleep_sec in enumerate(tasks):
+        broker.publish(
+            {'id': task_id, 'session_id': task_id % args.sessions, 'payload': {'sleep_sec': sleep_sec}},
+            priority=rng.randint(0, args.max_priority),
+        )
+
+
+def run_load(args: argparse.Namespace) -> dict:
+    broker = FakeBroker(heartbeat_sec=args.heartbeat_sec)
+    publish_tasks(broker, args)
+
+    ipc_queues = [Queue() for _ in range(args.slots)]
+    worker_command = WorkerCommand(ipc_queues, 'load')
+    worker_task = WorkerTask(
+        ipc_queues,
+        'load',
+        LoadTask(progress_timeout_sec=args.progress_timeout_sec),
+        canceled_sessions=CanceledSessions(ttl_sec=3600, max_size=10000),
+    )
+    worker_task.start()
+
+    channel = broker.connect().channel()
+    channel.basic_qos(prefetch_count=args.slots + args.prefetch_window)
+    channel.basic_consume(on_message_callback=worker_task)
+
+    canceled_at: Dict[int, float] = {}
+
+    def cancel_sessions():
+        time.sleep(args.cancel_after_sec)
+        for session_id in range(args.cancel_sessions):
+            canceled_at[session_id] = time.monotonic()
+            body = json.dumps({'message_type': schema.QueueMessageType.session_canceled, 'session_id': session_id})
+            worker_command(None, None, None, body)
+
+    cancel_thread = Thread(target=cancel_sessions, daemon=True)
+    started_at = time.monotonic()
+    cancel_thread.start()
+    try:
+        channel.start_consuming()
+    finally:
+        worker_task.close()
+    wall_time_sec = time.monotonic() - started_at
+
+    latencies = {'done': [], 'canceled': []}
+    session_settled_at: Dict[int, float] = {}  # последнее подтверждение после отмены
+    for message in broker.settled:
+        session_id = json.loads(message.body)['session_id']
+        # задачи отмененной сессии, подтвержденные до команды отмены, считаются обычными
+        kind = 'canceled' if message.settled_at >= canceled_at.get(session_id, float('inf')) else 'done'
+        latencies[kind].append(message.settled_at - message.published_at)
+        if kind == 'canceled':
+            session_settled_at[session_id] = max(session_settled_at.get(session_id, 0), message.settled_at)
+
+    # сессии, все задачи которых подтверждены до команды отмены, не учитываются
+    cancel_latencies = [
+        session_settled_at[session_id] - cancel_time
+        for session_id, cancel_time in canceled_at.items() if session_id in session_settled_at
+    ]
+
+    return {
+        'slots': args.slots,
+        'prefetch_window': args.prefetch_window,
+        'wall_time_sec': round(wall_time_sec, 3),
+        'tasks_per_sec': round(len(broker.settled) / wall_time_sec, 2),
+        'publish_to_ack': {kind: percentiles(values) for kind, values in latencies.items()},
+        'cancel_to_session_acked': percentiles(cancel_latencies),
+        'broker': asdict(broker.stats),
+        'worker_tasks_total': {status: worker_task.metrics.tasks_total.value(status=status) for status in STATUSES},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load test of the worker against an in-memory broker.')
+    parser.add_argument('--slots', type=int, default=4)
+    parser.add_argument('--prefetch-window', type=int, default=0)
+    parser.add_argument('--short', type=int, default=500, help='Number of short tasks')
+    parser.add_argument('--short-sec', type=float, default=0.01)
+    parser.add_argument('--long', type=int, default=8, help='Number of long tasks')
+    parser.add_argument('--long-sec', type=float, default=2)
+    parser.add_argument('--sessions', type=int, default=20)
+    parser.add_argument('--cancel-sessions', type=int, default=4, help='Number of sessions to cancel')
+    parser.add_argument('--cancel-after-sec', type=float, default=0.5)
+    parser.add_argument('--max-priority', type=int, default=0)
+    parser.add_argument('--progress-timeout-sec', type=float, default=None)
+    parser.add_argument('--heartbeat-sec', type=float, default=60)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    logging.getLogger('worker').setLevel(logging.WARNING)
+    print(json.dumps(run_load(args), indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+from urllib.request import urlopen
+
+import pytest
+
+from worker_multiprocessing.metrics import Counter, Histogram, MetricsServer, WorkerMetrics
+
+
+def test_histogram_bucket_upper_bound_is_inclusive():
+    histogram = Histogram('latency_seconds', 'Latency', buckets=(1, 0.1, 0.5))
+    for value in (0.1, 0.10001, 0.5, 1, 2):
+        histogram.observe(value)
+
+    lines = histogram.render()
+    assert 'latency_seconds_bucket{le="0.1"} 1' in lines
+    assert 'latency_seconds_bucket{le="0.5"} 3' in lines
+    assert 'latency_seconds_bucket{le="1"} 4' in lines
+    assert 'latency_seconds_bucket{le="+Inf"} 5' in lines
+    assert 'latency_seconds_count 5' in lines
+
+
+def test_counter_escapes_label_values():
+    counter = Counter('tasks_total', 'Tasks', ['status'])
+    counter.inc(status='a"b\\c\nd')
+
+    assert 'tasks_total{status="a\\"b\\\\c\\nd"} 1' in counter.render()
+
+
+def test_metrics_server_binds_on_start():
+    metrics = WorkerMetrics()
+    metrics.tasks_total.inc(status='done')
+    server = MetricsServer(metrics, '127.0.0.1', 0)
+    server.stop()  # еще не запущен: порт не занят
+
+    server.start()
+    server.start()
+    try:
+        with urlopen(f'http://127.0.0.1:{server.port}/metrics', timeout=5) as response:
+            assert 'worker_tasks_total{status="done"} 1' in response.read().decode('utf-8')
+    finally:
+        server.stop()
+
+
+def test_metrics_server_can_retry_after_bind_error():
+    busy_server = MetricsServer(WorkerMetrics(), '127.0.0.1', 0)
+    busy_server.start()
+    server = MetricsServer(WorkerMetrics(), '127.0.0.1', busy_server.port)
+    try:
+        with pytest.raises(OSError):
+            server.start()
+        server.stop()
+    finally:
+        busy_server.stop()
+
+    server.start()
+    try:
+        with urlopen(f'http://127.0.0.1:{server.port}/metrics', timeout=5) as response:
+            assert response.status == 200
+    finally:
+        server.stop()
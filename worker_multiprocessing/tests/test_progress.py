@@ -0,0 +1,55 @@
+import time
+from threading import Event, Thread
+
+from worker_multiprocessing import schema
+from worker_multiprocessing.progress import ProgressBatcher
+
+
+def progress(task_id: int, percentages: int):
+    task_message = schema.TaskMessage(id=task_id, session_id=1, payload={})
+    ipc_message = schema.QueueMessage(
+        type=schema.QueueMessageType.progress_changed,
+        payload=schema.TaskProgress(message='', in_percentages=percentages),
+    )
+    return task_message, ipc_message
+
+
+def test_keeps_last_update_per_task():
+    batches = []
+    batcher = ProgressBatcher(batches.append, interval_sec=60)
+    batcher.add(*progress(1, 10))
+    batcher.add(*progress(1, 20))
+    batcher.add(*progress(2, 10))
+    batcher.discard(2)
+    batcher.flush()
+
+    assert [(task.id, message.payload.in_percentages) for task, message in batches[0]] == [(1, 20)]
+
+
+def test_discard_defers_callback_until_batch_in_progress_is_sent():
+    events = []
+    in_batch, release_batch = Event(), Event()
+
+    def on_batch(updates):
+        in_batch.set()
+        release_batch.wait(5)
+        events.append(('batch', [task.id for task, _ in updates]))
+
+    batcher = ProgressBatcher(on_batch, interval_sec=60)
+    batcher.add(*progress(1, 50))
+    flusher = Thread(target=batcher.flush)
+    flusher.start()
+    assert in_batch.wait(5)
+
+    # discard и add не блокируются отправкой пачки
+    started_at = time.monotonic()
+    batcher.discard(1, then=lambda: events.append(('done', 1)))
+    batcher.discard(2, then=lambda: events.append(('done', 2)))
+    batcher.add(*progress(3, 50))
+    assert time.monotonic() - started_at < 1
+    assert events == [('done', 2)]
+
+    release_batch.set()
+    flusher.join()
+
+    assert events == [('done', 2), ('batch', [1]), ('done', 1)]
@@ -0,0 +1,33 @@
+import os
+from pathlib import Path
+
+from worker_multiprocessing import schema
+from worker_multiprocessing.task import load_spilled_payload, release_executor_spills, spill_payload
+
+
+def test_small_payload_is_pickled_inline(tmp_path: Path):
+    done = spill_payload(schema.TaskDone(task_id=1, payload={'rows': [1, 2, 3]}), min_size=1024, dir_path=str(tmp_path))
+
+    assert isinstance(done.payload, schema.PickledPayload)
+    assert load_spilled_payload(done.payload) == {'rows': [1, 2, 3]}
+    assert not list(tmp_path.iterdir())
+
+
+def test_large_payload_is_spilled_to_file(tmp_path: Path):
+    payload = {'rows': list(range(100000)), 'blob': b'x' * 200000}
+    done = spill_payload(schema.TaskDone(task_id=1, payload=payload), min_size=1024, dir_path=str(tmp_path))
+
+    assert isinstance(done.payload, schema.SpilledPayload)
+    assert os.path.getsize(done.payload.path) == done.payload.size
+    assert load_spilled_payload(done.payload) == payload
+
+
+def test_release_executor_spills_removes_only_its_files(tmp_path: Path):
+    done = spill_payload(schema.TaskDone(task_id=1, payload=b'x' * 4096), min_size=1024, dir_path=str(tmp_path))
+    other = tmp_path / f'task_payload_{os.getpid() + 1}_other.pickle'
+    other.write_bytes(b'')
+
+    release_executor_spills(os.getpid(), str(tmp_path))
+
+    assert not os.path.exists(done.payload.path)
+    assert other.exists()
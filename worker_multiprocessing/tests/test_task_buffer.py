@@ -0,0 +1,34 @@
+from worker_multiprocessing import schema
+from worker_multiprocessing.worker import TaskBuffer
+
+
+def put(buffer: TaskBuffer, task_id: int, priority: int = 0, session_id: int = 1) -> None:
+    buffer.put(priority, None, task_id, schema.TaskMessage(id=task_id, session_id=session_id, payload={}), 0.0)
+
+
+def task_ids(items) -> list:
+    return [task_message.id for _, _, task_message, _ in items]
+
+
+def test_pop_by_priority_then_arrival_order():
+    buffer = TaskBuffer()
+    for task_id, priority in [(1, 0), (2, 5), (3, 0), (4, 10), (5, 5)]:
+        put(buffer, task_id, priority)
+
+    items = []
+    while (item := buffer.pop()) is not None:
+        items.append(item)
+
+    assert task_ids(items) == [4, 2, 5, 1, 3]
+    assert len(buffer) == 0
+
+
+def test_pop_session_keeps_order_of_the_rest():
+    buffer = TaskBuffer()
+    for task_id, priority, session_id in [(1, 0, 1), (2, 5, 2), (3, 5, 1), (4, 0, 2), (5, 1, 1)]:
+        put(buffer, task_id, priority, session_id)
+
+    assert sorted(task_ids(buffer.pop_session(2))) == [2, 4]
+    assert buffer.pop_session(3) == []
+    assert task_ids(buffer.pop_all()) == [3, 5, 1]
+    assert buffer.pop() is None
@@ -0,0 +1,145 @@
+import json
+import time
+from threading import Thread
+from multiprocessing import Process, Queue
+from typing import Generator, List
+
+from benchmarks.fake_broker import FakeBroker
+from worker_multiprocessing import schema
+from worker_multiprocessing.task import Task
+from worker_multiprocessing.utils import CanceledSessions
+from worker_multiprocessing.worker import WorkerCommand, WorkerTask
+
+
+def child_sleep(sleep_sec: float) -> None:
+    time.sleep(sleep_sec)
+
+
+class ChildProcessTask(Task):
+    """Выполняет задачу в дочернем процессе (daemon процесс не может их запускать)"""
+
+    def run(self, task_message: schema.TaskMessage) -> Generator[schema.TaskProgress | schema.TaskDone, None, None]:
+        child = Process(target=child_sleep, args=(task_message.payload['sleep_sec'],))
+        child.start()
+        child.join()
+        yield schema.TaskDone(task_id=task_message.id, payload={'exitcode': child.exitcode})
+
+
+def run_worker(broker: FakeBroker, slots: int, task_obj: Task, on_started=None, **kwargs) -> WorkerTask:
+    ipc_queues = [Queue() for _ in range(slots)]
+    worker_task = WorkerTask(ipc_queues, 'test', task_obj, canceled_sessions=CanceledSessions(ttl_sec=60, max_size=100), **kwargs)
+    worker_task.start()
+    try:
+        channel = broker.connect().channel()
+        channel.basic_qos(prefetch_count=slots)
+        channel.basic_consume(on_message_callback=worker_task)
+        if on_started:
+            on_started(WorkerCommand(ipc_queues, 'test'))
+        channel.start_consuming()
+    finally:
+        worker_task.close()
+    return worker_task
+
+
+def settled_ids(broker: FakeBroker) -> List[int]:
+    return sorted(json.loads(message.body)['id'] for message in broker.settled)
+
+
+def test_task_can_start_child_process():
+    broker = FakeBroker()
+    for task_id in range(3):
+        broker.publish({'id': task_id, 'session_id': 1, 'payload': {'sleep_sec': 0}})
+
+    worker_task = run_worker(broker, 2, ChildProcessTask())
+
+    assert settled_ids(broker) == [0, 1, 2]
+    assert all(message.acked for message in broker.settled)
+    assert worker_task.metrics.tasks_total.value(status='done') == 3
+
+
+def test_executor_replaced_after_max_tasks_and_cancel():
+    broker = FakeBroker()
+    broker.publish({'id': 0, 'session_id': 1, 'payload': {'sleep_sec': 30}})
+    for task_id in range(1, 4):
+        broker.publish({'id': task_id, 'session_id': 2, 'payload': {'sleep_sec': 0}})
+
+    def cancel_session(worker_command: WorkerCommand):
+        time.sleep(0.5)
+        body = json.dumps({'message_type': schema.QueueMessageType.session_canceled, 'session_id': 1})
+        worker_command(None, None, None, body)
+
+    started_at = time.monotonic()
+    worker_task = run_worker(
+        broker, 2, ChildProcessTask(), executor_max_tasks=1,
+        on_started=lambda worker_command: Thread(target=cancel_session, args=(worker_command,), daemon=True).start(),
+    )
+
+    assert time.monotonic() - started_at < 20
+    assert settled_ids(broker) == [0, 1, 2, 3]
+    assert worker_task.metrics.tasks_total.value(status='canceled') == 1
+    assert worker_task.metrics.tasks_total.value(status='done') == 3
+
+
+class FailingHookTask(ChildProcessTask):
+    def on_done(self, task_message: schema.TaskMessage, ipc_message: schema.QueueMessage) -> None:
+        if task_message.id == 0:
+            raise RuntimeError('on_done failed')
+
+
+def test_hook_error_does_not_stop_supervisor():
+    broker = FakeBroker()
+    for task_id in range(3):
+        broker.publish({'id': task_id, 'session_id': 1, 'payload': {'sleep_sec': 0}})
+
+    worker_task = run_worker(broker, 1, FailingHookTask())
+
+    assert settled_ids(broker) == [0, 1, 2]
+    assert worker_task.metrics.tasks_total.value(status='error') == 1
+    assert worker_task.metrics.tasks_total.value(status='done') == 2
+
+
+def test_cancel_reaches_idle_worker():
+    ipc_queues = [Queue() for _ in range(2)]
+    canceled_sessions = CanceledSessions(ttl_sec=60, max_size=100)
+    worker_task = WorkerTask(ipc_queues, 'test', ChildProcessTask(), canceled_sessions=canceled_sessions)
+    worker_task.start()
+    try:
+        body = json.dumps({'message_type': schema.QueueMessageType.session_canceled, 'session_id': 7})
+        WorkerCommand(ipc_queues, 'test')(None, None, None, body)
+
+        deadline = time.monotonic() + 5
+        while time.monotonic() < deadline and 7 not in canceled_sessions:
+            time.sleep(0.01)
+        assert 7 in canceled_sessions
+    finally:
+        worker_task.close()
+
+
+class FloodingTask(ChildProcessTask):
+    """Задачи сессии 1 без конца шлют прогресс, пока их не отменят"""
+
+    def run(self, task_message: schema.TaskMessage) -> Generator[schema.TaskProgress | schema.TaskDone, None, None]:
+        while task_message.session_id == 1:
+            yield schema.TaskProgress(message='flood')
+        yield from super().run(task_message)
+
+
+def test_replaced_executor_gets_fresh_queue():
+    broker = FakeBroker()
+    broker.publish({'id': 0, 'session_id': 1, 'payload': {}})
+    for task_id in range(1, 3):
+        broker.publish({'id': task_id, 'session_id': 2, 'payload': {'sleep_sec': 0}})
+
+    def cancel_session(worker_command: WorkerCommand):
+        time.sleep(0.5)
+        body = json.dumps({'message_type': schema.QueueMessageType.session_canceled, 'session_id': 1})
+        worker_command(None, None, None, body)
+
+    worker_task = run_worker(
+        broker, 1, FloodingTask(),
+        on_started=lambda worker_command: Thread(target=cancel_session, args=(worker_command,), daemon=True).start(),
+    )
+
+    assert settled_ids(broker) == [0, 1, 2]
+    assert worker_task.metrics.tasks_total.value(status='canceled') == 1
+    assert worker_task.metrics.tasks_total.value(status='done') == 2
@@ -0,0 +1,90 @@
+import os
+import pickle
+import sqlite3
+import tempfile
+from typing import Any
+from threading import Lock
+from pathlib import Path
+from abc import ABC, abstractmethod
+
+
+class CheckpointStore(ABC):
+    """
+    Хранилище контрольных точек задач (schema.TaskCheckpoint) по id задачи.
+
+    Используется из потока слежения за задачами WorkerTask, delete - еще и из потока ProgressBatcher
+    (завершение задачи, прогресс которой передавался в пачке).
+    """
+
+    @abstractmethod
+    def load(self, task_id: int) -> Any | None:
+        raise NotImplementedError
+
+    @abstractmethod
+    def save(self, task_id: int, state: Any) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    def delete(self, task_id: int) -> None:
+        raise NotImplementedError
+
+
+class FileCheckpointStore(CheckpointStore):
+    """Контрольная точка каждой задачи в отдельном pickle файле (запись через временный файл)"""
+
+    def __init__(self, dir_path: Path | str) -> None:
+        self._dir_path = Path(dir_path)
+        self._dir_path.mkdir(parents=True, exist_ok=True)
+
+    def load(self, task_id: int) -> Any | None:
+        try:
+            with open(self._file_path(task_id), 'rb') as file:
+                return pickle.load(file)
+        except FileNotFoundError:
+            return None
+
+    def save(self, task_id: int, state: Any) -> None:
+        fd, tmp_path = tempfile.mkstemp(dir=self._dir_path, suffix='.tmp')
+        try:
+            with open(fd, 'wb') as file:
+                pickle.dump(state, file, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self._file_path(task_id))
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+    def delete(self, task_id: int) -> None:
+        try:
+            os.remove(self._file_path(task_id))
+        except FileNotFoundError:
+            pass
+
+    def _file_path(self, task_id: int) -> Path:
+        return self._dir_path / f'{task_id}.pickle'
+
+
+class SQLiteCheckpointStore(CheckpointStore):
+    """Контрольные точки в таблице SQLite"""
+
+    def __init__(self, db_path: Path | str) -> None:
+        # создается в основном потоке, а используется в потоках WorkerTask (см. CheckpointStore)
+        self._connection = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._lock = Lock()
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.execute(
+            'CREATE TABLE IF NOT EXISTS checkpoints (task_id INTEGER PRIMARY KEY, state BLOB NOT NULL)'
+        )
+
+    def load(self, task_id: int) -> Any | None:
+        with self._lock:
+            row = self._connection.execute('SELECT state FROM checkpoints WHERE task_id = ?', (task_id,)).fetchone()
+        return pickle.loads(row[0]) if row else None
+
+    def save(self, task_id: int, state: Any) -> None:
+        data = pickle.dumps(state, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._connection.execute('INSERT OR REPLACE INTO checkpoints (task_id, state) VALUES (?, ?)', (task_id, data))
+
+    def delete(self, task_id: int) -> None:
+        with self._lock:
+            self._connection.execute('DELETE FROM checkpoints WHERE task_id = ?', (task_id,))
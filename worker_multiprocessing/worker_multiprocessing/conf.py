@@ -1,10 +1,33 @@
+import os
 
 RABBITMQ_USER = 'admin'
 RABBITMQ_PASS = 'admin'
 RABBITMQ_HOST = 'rabbit'
 RABBITMQ_PORT = 5672
+RABBITMQ_HEARTBEAT_SEC = 60
 
 WORKER_COMMANDS_EXCHANGE = 'worker_commands_exchange'
 
 TASKS_QUEUE = 'worker_tasks_queue'
 TASKS_MAX_PRIORITY = 10
+
+# количество задач, выполняемых воркером одновременно
+TASK_SLOTS = 1
+# сколько задач сверх слотов получать заранее в локальный буфер
+TASKS_PREFETCH_WINDOW = 0
+# после скольки задач процесс слота перезапускается (None - не перезапускать)
+EXECUTOR_MAX_TASKS = 100
+# результаты задач от этого размера (байт) передаются через временный файл в SPILL_DIR_PATH
+# (/dev/shm - в памяти, если его нет - системный temp)
+SPILL_MIN_SIZE = 1024 * 1024
+SPILL_DIR_PATH = '/dev/shm' if os.path.isdir('/dev/shm') else None
+# сколько помнить отмененные сессии (их задачи подтверждаются без запуска) и сколько сессий хранить максимум
+CANCELED_SESSIONS_TTL_SEC = 24 * 60 * 60
+CANCELED_SESSIONS_MAX_SIZE = 10000
+# директория контрольных точек задач (для продолжения после повторной доставки), None - не сохранять
+# в docker-compose задана через окружение: общий volume всех воркеров хоста, чтобы задачу мог продолжить
+# и пересозданный контейнер (воркерам на разных хостах нужен общий сетевой диск)
+CHECKPOINTS_DIR_PATH = os.environ.get('CHECKPOINTS_DIR_PATH')
+# порт HTTP сервера с метриками в формате Prometheus (/metrics), None - не запускать
+METRICS_HOST = '0.0.0.0'
+METRICS_PORT = 9100
@@ -1,10 +1,11 @@
 from multiprocessing import Queue, Process
-from typing import Tuple, Callable
+from typing import Tuple, Callable, List
 
 import pika
 from pika.adapters.blocking_connection import BlockingConnection, BlockingChannel
 
 from . import conf
+from .worker import WorkerTask
 
 
 class BaseConsumer:
@@ -15,14 +16,15 @@ class BaseConsumer:
             host=conf.RABBITMQ_HOST,
             port=conf.RABBITMQ_PORT,
             credentials=credentials,
+            heartbeat=conf.RABBITMQ_HEARTBEAT_SEC,
         )
         conn = BlockingConnection(parameters)
         return conn, conn.channel()
 
 
 class WorkerCommandConsumer(BaseConsumer, Process):
-    def __init__(self, ipc_queue: Queue, on_message_callback: Callable) -> None:
-        self._ipc_queue = ipc_queue
+    def __init__(self, ipc_queues: List[Queue], on_message_callback: Callable) -> None:
+        self._ipc_queues = ipc_queues
         self._on_message_callback = on_message_callback
         self._connection, self._channel = self._create_blocking_connection_and_channel()
         super().__init__()
@@ -49,8 +51,18 @@ class WorkerCommandConsumer(BaseConsumer, Process):
 
 
 class TaskConsumer(BaseConsumer):
-    def __init__(self, ipc_queue: Queue, worker_name: str, on_message_callback: Callable) -> None:
-        self._ipc_queue = ipc_queue
+    """
+    Получает задачи из очереди: по одной на слот (len(ipc_queues)) и еще prefetch_window в локальный буфер WorkerTask,
+    чтобы освободившийся слот сразу получал следующую задачу (с учетом приоритета) без ожидания брокера.
+
+    Задачи выполняются в потоке WorkerTask, поэтому start_consuming не блокируется на время их выполнения
+    и соединение успевает обрабатывать heartbeat.
+    """
+
+    def __init__(self, ipc_queues: List[Queue], worker_name: str, on_message_callback: WorkerTask,
+                 prefetch_window: int = 0) -> None:
+        self._ipc_queues = ipc_queues
+        self._prefetch_window = prefetch_window
         self._worker_name = worker_name
         self._on_message_callback = on_message_callback
         self._connection, self._channel = self._create_blocking_connection_and_channel()
@@ -67,7 +79,7 @@ class TaskConsumer(BaseConsumer):
             raise error
 
     def _setup(self) -> None:
-        self._channel.basic_qos(prefetch_count=1)
+        self._channel.basic_qos(prefetch_count=len(self._ipc_queues) + self._prefetch_window)
 
         queue = self._channel.queue_declare(
             queue=conf.TASKS_QUEUE,
@@ -1,26 +1,32 @@
 import time
 import argparse
-from typing import Generator
+from typing import Generator, List, Tuple
 from multiprocessing import Queue
 
 from pika.exceptions import AMQPConnectionError
 from pika.adapters.utils.connection_workflow import AMQPConnectionWorkflowFailed, AMQPConnectorSocketConnectError
 
-from . import schema, utils
+from . import conf, schema, utils
 from .logger import logger
 from .task import Task
+from .checkpoint import FileCheckpointStore
+from .metrics import MetricsServer, WorkerMetrics
 from .worker import WorkerCommand, WorkerTask
 from .consumer import WorkerCommandConsumer, TaskConsumer
 
 
 class TaskExample(Task):
     def run(self, task_message: schema.TaskMessage) -> Generator[schema.TaskProgress | schema.TaskDone, None, None]:
-        for stage in range(1, 6):
+        # при повторном запуске продолжаем со следующей после сохраненной стадии
+        completed_stage = task_message.checkpoint or 0
+
+        for stage in range(completed_stage + 1, 6):
             time.sleep(5)
             yield schema.TaskProgress(
                 message=f'Complete stage {stage}',
                 in_percentages=stage * 20,
             )
+            yield schema.TaskCheckpoint(state=stage)
 
         if task_message.payload.get('raise_error'):
             raise Exception('Error in task')
@@ -31,6 +37,10 @@ class TaskExample(Task):
         # [записываем изменившийся прогресc в бд, отправляем уведомление и.т.д]
         pass
 
+    def on_progress_batch(self, updates: List[Tuple[schema.TaskMessage, schema.QueueMessage]]) -> None:
+        # [записываем прогресс всех задач в бд одним запросом]
+        pass
+
     def on_progress_timeout(self, task_message: schema.TaskMessage) -> None:
         # [уведомляем, что задача "зависла" и.т.д]
         pass
@@ -48,28 +58,70 @@ class TaskExample(Task):
         pass
 
 
-def start_worker():
+def start_worker(metrics: WorkerMetrics, metrics_server: MetricsServer | None):
     parser = argparse.ArgumentParser(description='Runs calculation of tasks from the RabbitMQ queue.')
     parser.add_argument('--name', type=str, help='Name of the worker (showing in admin interface)')
+    parser.add_argument('--slots', type=int, default=conf.TASK_SLOTS, help='Number of tasks running concurrently')
+    parser.add_argument('--prefetch-window', type=int, default=conf.TASKS_PREFETCH_WINDOW,
+                        help='Number of tasks prefetched into the local buffer in addition to slots')
     args_dict = vars(parser.parse_args())
 
-    ipc_queue = Queue()  # для взаимодействия между процессами
+    # команды воркера процессам задач (отмена сессии), по одной на слот
+    ipc_queues = [Queue() for _ in range(args_dict['slots'])]
     worker_name = args_dict.get('name', utils.create_worker_name())
 
-    worker_command = WorkerCommand(ipc_queue, worker_name)
-    worker_command_consumer = WorkerCommandConsumer(ipc_queue, worker_command)
-    worker_command_consumer.start()
-
-    task_example = TaskExample(progress_timeout_sec=10)
-    worker_task = WorkerTask(ipc_queue, worker_name, task_example)
-    task_consumer = TaskConsumer(ipc_queue, worker_name, worker_task)
-    task_consumer.start_consuming()
+    checkpoint_store = None
+    if conf.CHECKPOINTS_DIR_PATH is not None:
+        try:
+            checkpoint_store = FileCheckpointStore(conf.CHECKPOINTS_DIR_PATH)
+        except OSError as error:
+            logger.error(f'Unable to use checkpoints dir {conf.CHECKPOINTS_DIR_PATH}, checkpoints disabled: {error}')
+
+    worker_command = WorkerCommand(ipc_queues, worker_name)
+    task_example = TaskExample(progress_timeout_sec=10, progress_batch_interval_sec=1)
+    worker_task = WorkerTask(
+        ipc_queues,
+        worker_name,
+        task_example,
+        executor_max_tasks=conf.EXECUTOR_MAX_TASKS,
+        spill_min_size=conf.SPILL_MIN_SIZE,
+        spill_dir_path=conf.SPILL_DIR_PATH,
+        canceled_sessions=utils.CanceledSessions(conf.CANCELED_SESSIONS_TTL_SEC, conf.CANCELED_SESSIONS_MAX_SIZE),
+        checkpoint_store=checkpoint_store,
+        metrics=metrics,
+    )
+    # подключение к RabbitMQ может не удаться, тогда процессы слотов и поток должны быть освобождены
+    worker_command_consumer = None
+    try:
+        task_consumer = TaskConsumer(ipc_queues, worker_name, worker_task, prefetch_window=args_dict['prefetch_window'])
+        worker_command_consumer = WorkerCommandConsumer(ipc_queues, worker_command)
+        worker_command_consumer.start()
+
+        if metrics_server:
+            try:
+                metrics_server.start()
+            except OSError as error:
+                # без метрик воркер продолжает работать, порт пробуем открыть снова при переподключении
+                logger.error(f'Unable to start metrics server on port {conf.METRICS_PORT}, metrics disabled: {error}')
+        worker_task.start()
+        task_consumer.start_consuming()
+    finally:
+        worker_task.close()
+        if worker_command_consumer:
+            worker_command_consumer.terminate()
+            worker_command_consumer.join()
 
 
 def main():
+    # метрики сохраняются между переподключениями, порт открывается один раз
+    metrics = WorkerMetrics()
+    metrics_server = None
+    if conf.METRICS_PORT is not None:
+        metrics_server = MetricsServer(metrics, conf.METRICS_HOST, conf.METRICS_PORT)
+
     while True:
         try:
-            start_worker()
+            start_worker(metrics, metrics_server)
         except (AMQPConnectionError, AMQPConnectionWorkflowFailed, AMQPConnectorSocketConnectError):
             logger.info('Unable to connect RabbitMQ, wait 5 second and retry')
             time.sleep(5)
@@ -77,6 +129,9 @@ def main():
             logger.error(f'Uncaught exception received, stop worker. Message: {error}')
             break
 
+    if metrics_server:
+        metrics_server.stop()
+
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,192 @@
+import bisect
+from threading import Thread, Lock
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Sequence, Tuple
+
+from .logger import logger
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300, 900, 3600)
+
+
+def _escape_label_value(value: str) -> str:
+    """Экранирование значения метки по текстовому формату Prometheus"""
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(label_names: Sequence[str], label_values: Tuple[str, ...]) -> str:
+    pairs = [f'{name}="{_escape_label_value(value)}"' for name, value in zip(label_names, label_values)]
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class Metric:
+    """Метрика в текстовом формате Prometheus"""
+    type_name = 'untyped'
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._lock = Lock()
+
+    def render(self) -> List[str]:
+        return [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.type_name}']
+
+    def _label_values(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels[name]) for name in self.label_names)
+
+
+class Counter(Metric):
+    type_name = 'counter'
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = ()) -> None:
+        super().__init__(name, documentation, label_names)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = self._label_values(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels: str) -> float:
+        key = self._label_values(labels)
+        with self._lock:
+            return self._values.get(key, 0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = dict(self._values)
+        return super().render() + [
+            f'{self.name}{_format_labels(self.label_names, key)} {value}' for key, value in values.items()
+        ]
+
+
+class Gauge(Metric):
+    """Значение вычисляется функцией в момент запроса метрик"""
+    type_name = 'gauge'
+
+    def __init__(self, name: str, documentation: str, function: Callable[[], float]) -> None:
+        super().__init__(name, documentation)
+        self._function = function
+
+    def render(self) -> List[str]:
+        return super().render() + [f'{self.name} {self._function()}']
+
+
+class Histogram(Metric):
+    type_name = 'histogram'
+
+    def __init__(self, name: str, documentation: str, buckets: Sequence[float] = DEFAULT_BUCKETS) -> None:
+        super().__init__(name, documentation)
+        self._buckets = tuple(sorted(buckets))
+        self._counts = [0] * (len(self._buckets) + 1)
+        self._sum = 0.0
+
+    def observe(self, value: float) -> None:
+        with self._lock:
+            self._counts[bisect.bisect_left(self._buckets, value)] += 1
+            self._sum += value
+
+    def render(self) -> List[str]:
+        with self._lock:
+            counts, total_sum = list(self._counts), self._sum
+
+        lines = super().render()
+        cumulative = 0
+        for upper_bound, count in zip(self._buckets, counts):
+            cumulative += count
+            lines.append(f'{self.name}_bucket{{le="{upper_bound}"}} {cumulative}')
+        cumulative += counts[-1]
+        lines.append(f'{self.name}_bucket{{le="+Inf"}} {cumulative}')
+        lines.append(f'{self.name}_sum {total_sum}')
+        lines.append(f'{self.name}_count {cumulative}')
+        return lines
+
+
+class WorkerMetrics:
+    """Метрики воркера. Статусы задач: done, error, timeout, canceled, skipped (отмененная сессия, не запускалась)."""
+
+    def __init__(self) -> None:
+        self.queue_to_start_seconds = Histogram(
+            'worker_task_queue_to_start_seconds',
+            'Time from publishing (or receiving if no timestamp) to start of the task',
+        )
+        self.run_seconds = Histogram('worker_task_run_seconds', 'Task run time until done, error, timeout or cancel')
+        self.progress_interval_seconds = Histogram(
+            'worker_task_progress_interval_seconds',
+            'Time between progress updates of a task',
+        )
+        self.cancel_to_terminate_seconds = Histogram(
+            'worker_task_cancel_to_terminate_seconds',
+            'Time from session cancel command to termination of the task process',
+        )
+        self.tasks_total = Counter('worker_tasks_total', 'Finished tasks by status', ['status'])
+        self._metrics: List[Metric] = [
+            self.queue_to_start_seconds,
+            self.run_seconds,
+            self.progress_interval_seconds,
+            self.cancel_to_terminate_seconds,
+            self.tasks_total,
+        ]
+
+    def add_gauge(self, name: str, documentation: str, function: Callable[[], float]) -> None:
+        """Добавляет gauge (gauge с тем же именем заменяется)"""
+        self._metrics = [metric for metric in self._metrics if metric.name != name]
+        self._metrics.append(Gauge(name, documentation, function))
+
+    def render(self) -> str:
+        return '\n'.join(line for metric in self._metrics for line in metric.render()) + '\n'
+
+
+class MetricsServer(Thread):
+    """
+    HTTP сервер, отдающий метрики на /metrics.
+
+    Порт открывается в start, сервер создается один раз в main и сохраняется между переподключениями воркера.
+    """
+
+    def __init__(self, metrics: WorkerMetrics, host: str, port: int) -> None:
+        self._handler = type('MetricsHandler', (_MetricsHandler,), {'metrics': metrics})
+        self._address = (host, port)
+        self._server = None
+        super().__init__(daemon=True)
+
+    @property
+    def port(self) -> int:
+        return self._server.server_address[1]
+
+    def start(self) -> None:
+        """
+        Открывает порт и запускает сервер (повторный вызов ничего не делает).
+
+        Если порт открыть не удалось (OSError), start можно вызвать снова.
+        """
+        if self._server is None:
+            self._server = ThreadingHTTPServer(self._address, self._handler)
+            super().start()
+
+    def run(self) -> None:
+        self._server.serve_forever()
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    metrics: WorkerMetrics
+
+    def do_GET(self) -> None:
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+
+        body = self.metrics.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args) -> None:
+        logger.debug(format % args)
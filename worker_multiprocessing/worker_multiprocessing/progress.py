@@ -0,0 +1,79 @@
+from threading import Thread, Event, Lock
+from typing import Callable, Dict, List, Set, Tuple
+
+from . import schema
+from .logger import logger
+
+ProgressUpdate = Tuple[schema.TaskMessage, schema.QueueMessage]
+
+
+class ProgressBatcher(Thread):
+    """
+    Объединяет обновления прогресса задач и раз в interval_sec передает их пачкой в on_batch в отдельном потоке.
+
+    Для каждой задачи хранится только последнее обновление за интервал.
+    discard(task_id, then) не ждет отправки пачки: если в ней есть прогресс задачи, then вызывается после on_batch,
+    поэтому после then прогресс этой задачи в on_batch уже не попадет.
+    """
+
+    def __init__(self, on_batch: Callable[[List[ProgressUpdate]], None], interval_sec: float) -> None:
+        self._on_batch = on_batch
+        self._interval_sec = interval_sec
+        self._pending: Dict[int, ProgressUpdate] = {}
+        self._in_flight: Set[int] = set()  # задачи, прогресс которых сейчас передается в on_batch
+        self._after_flush: List[Callable[[], None]] = []
+        self._lock = Lock()
+        self._flush_lock = Lock()
+        self._stop_event = Event()
+        super().__init__(daemon=True)
+
+    def add(self, task_message: schema.TaskMessage, ipc_message: schema.QueueMessage) -> None:
+        with self._lock:
+            self._pending[task_message.id] = (task_message, ipc_message)
+
+    def discard(self, task_id: int, then: Callable[[], None] | None = None) -> None:
+        """
+        Отбрасывает неотправленное обновление (например, задача завершается и прогресс больше не важен).
+
+        then вызывается сразу в текущем потоке или, если прогресс задачи уже передается в on_batch,
+        после отправки пачки в потоке flush (тогда его ошибки только логируются).
+        """
+        with self._lock:
+            self._pending.pop(task_id, None)
+            if then is not None and task_id in self._in_flight:
+                self._after_flush.append(then)
+                return
+        if then is not None:
+            then()
+
+    def run(self) -> None:
+        while not self._stop_event.wait(self._interval_sec):
+            self.flush()
+        self.flush()
+
+    def flush(self) -> None:
+        with self._flush_lock:
+            # add и discard не ждут отправки пачки
+            with self._lock:
+                updates, self._pending = list(self._pending.values()), {}
+                self._in_flight = {task_message.id for task_message, _ in updates}
+
+            if updates:
+                try:
+                    self._on_batch(updates)
+                except Exception as error:
+                    logger.error(f'Progress batch of {len(updates)} updates failed: {error}')
+
+            with self._lock:
+                self._in_flight = set()
+                callbacks, self._after_flush = self._after_flush, []
+            for callback in callbacks:
+                try:
+                    callback()
+                except Exception as error:
+                    logger.exception(f'Callback after progress batch failed: {error}')
+
+    def stop(self) -> None:
+        """Останавливает поток, отправив оставшиеся обновления"""
+        self._stop_event.set()
+        self.join()
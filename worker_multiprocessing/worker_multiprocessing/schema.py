@@ -8,6 +8,7 @@ class TaskMessage:
     id: int
     session_id: int
     payload: dict
+    checkpoint: Any = None  # последняя сохраненная контрольная точка, если задача уже выполнялась
 
 
 @dataclass
@@ -16,6 +17,25 @@ class TaskProgress:
     in_percentages: int = 0
 
 
+@dataclass
+class TaskCheckpoint:
+    """Состояние, с которого можно продолжить задачу при повторном запуске"""
+    state: Any
+
+
+@dataclass
+class SpilledPayload:
+    """Ссылка на результат задачи, записанный во временный файл вместо передачи через очередь"""
+    path: str
+    size: int
+
+
+@dataclass
+class PickledPayload:
+    """Результат задачи меньше порога spill, уже сериализованный при проверке размера"""
+    data: bytes
+
+
 @dataclass
 class TaskDone:
     task_id: int
@@ -26,6 +46,7 @@ class QueueMessageType(str, Enum):
     done = 'done'
     error = 'error'
     progress_changed = 'progress_changed'
+    checkpoint = 'checkpoint'
     session_canceled = 'session_canceled'
 
 
@@ -1,11 +1,139 @@
+import os
+import mmap
+import pickle
+import tempfile
 import traceback
+from pathlib import Path
 from multiprocessing import Process, Queue
-from typing import Callable, Iterator
+from typing import Any, Callable, Iterator, List, Tuple
 from abc import ABC, abstractmethod
 
 from . import schema
 
 
+class _SpillWriter:
+    """
+    Файл для pickle.dump: держит данные в памяти, пока их меньше min_size байт, затем пишет во временный файл.
+
+    Так размер результата становится известен за одну сериализацию, а большой результат не копируется в память целиком.
+    """
+
+    def __init__(self, min_size: int, dir_path: str = None) -> None:
+        self.buffer = bytearray()
+        self.path = None
+        self.size = 0
+        self._min_size = min_size
+        self._dir_path = dir_path
+        self._file = None
+
+    def write(self, data: bytes) -> int:
+        self.size += len(data)
+        if self._file is not None:
+            return self._file.write(data)
+
+        self.buffer += data
+        if len(self.buffer) >= self._min_size:
+            fd, self.path = tempfile.mkstemp(prefix=spill_file_prefix(os.getpid()), suffix='.pickle', dir=self._dir_path)
+            self._file = open(fd, 'wb')
+            self._file.write(self.buffer)
+            self.buffer = bytearray()
+        return len(data)
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+
+
+def spill_file_prefix(pid: int) -> str:
+    """Префикс временных файлов процесса pid, по нему удаляются файлы остановленного процесса"""
+    return f'task_payload_{pid}_'
+
+
+def spill_payload(done: schema.TaskDone, min_size: int, dir_path: str = None) -> schema.TaskDone:
+    """
+    Записывает результат задачи во временный файл если он занимает не меньше min_size байт.
+
+    В очередь тогда передается только schema.SpilledPayload, а не весь результат
+    (dir_path='/dev/shm' позволяет держать файл в памяти). Результат меньше min_size передается
+    уже сериализованным (schema.PickledPayload), чтобы очередь не сериализовала его второй раз.
+    """
+    writer = _SpillWriter(min_size, dir_path)
+    try:
+        pickle.dump(done.payload, writer, protocol=pickle.HIGHEST_PROTOCOL)
+    except BaseException:
+        writer.close()
+        if writer.path is not None:
+            os.remove(writer.path)
+        raise
+    writer.close()
+
+    if writer.path is None:
+        return schema.TaskDone(task_id=done.task_id, payload=schema.PickledPayload(data=bytes(writer.buffer)))
+    return schema.TaskDone(task_id=done.task_id, payload=schema.SpilledPayload(path=writer.path, size=writer.size))
+
+
+def load_spilled_payload(spilled: schema.SpilledPayload | schema.PickledPayload) -> Any:
+    if isinstance(spilled, schema.PickledPayload):
+        return pickle.loads(spilled.data)
+    with open(spilled.path, 'rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        return pickle.loads(mm)
+
+
+def release_spilled_payload(spilled: schema.SpilledPayload) -> None:
+    try:
+        os.remove(spilled.path)
+    except FileNotFoundError:
+        pass
+
+
+def release_executor_spills(pid: int, dir_path: str = None) -> None:
+    """
+    Удаляет временные файлы результатов остановленного процесса pid.
+
+    Нужен если процесс убит после записи файла, а сообщение с ним не дошло или так и осталось в очереди.
+    """
+    for path in Path(dir_path or tempfile.gettempdir()).glob(f'{spill_file_prefix(pid)}*.pickle'):
+        release_spilled_payload(schema.SpilledPayload(path=str(path), size=0))
+
+
+def run_task(ipc_queue: Queue, task: schema.TaskMessage,
+             task_handler: Callable[[schema.TaskMessage], Iterator[schema.TaskProgress]],
+             spill_min_size: int = None, spill_dir_path: str = None) -> None:
+    """
+    Выполняет задачу, отправляя прогресс, результат или ошибку в ipc_queue.
+
+    Результаты больше spill_min_size байт передаются через временный файл (см. spill_payload).
+    """
+    try:
+        for progress in task_handler(task):
+            match type(progress):
+                case schema.TaskProgress:
+                    message_type = schema.QueueMessageType.progress_changed
+                case schema.TaskCheckpoint:
+                    message_type = schema.QueueMessageType.checkpoint
+                case schema.TaskDone:
+                    message_type = schema.QueueMessageType.done
+                    if spill_min_size is not None:
+                        progress = spill_payload(progress, spill_min_size, spill_dir_path)
+                case _:
+                    raise Exception('Unknown progress type')
+
+            message = schema.QueueMessage(
+                type=message_type,
+                payload=progress,
+            )
+            ipc_queue.put(message)
+    except Exception as error:
+        message = schema.QueueMessage(
+            type=schema.QueueMessageType.error,
+            payload={
+                'message': str(error),
+                'traceback': traceback.format_exc(),
+            },
+        )
+        ipc_queue.put(message)
+
+
 class TaskRunner(Process):
     def __init__(self, ipc_queue: Queue, task: schema.TaskMessage,
                  task_handler: Callable[[schema.TaskMessage], Iterator[schema.TaskProgress]]) -> None:
@@ -15,35 +143,38 @@ class TaskRunner(Process):
         super().__init__()
 
     def run(self) -> None:
-        try:
-            for progress in self._task_handler(self._task):
-                match type(progress):
-                    case schema.TaskProgress:
-                        message_type = schema.QueueMessageType.progress_changed
-                    case schema.TaskDone:
-                        message_type = schema.QueueMessageType.done
-                    case _:
-                        raise Exception('Unknown progress type')
-
-                message = schema.QueueMessage(
-                    type=message_type,
-                    payload=progress,
-                )
-                self._ipc_queue.put(message)
-        except Exception as error:
-            message = schema.QueueMessage(
-                type=schema.QueueMessageType.error,
-                payload={
-                    'message': str(error),
-                    'traceback': traceback.format_exc(),
-                },
-            )
-            self._ipc_queue.put(message)
+        run_task(self._ipc_queue, self._task, self._task_handler)
+
+
+class TaskExecutor(Process):
+    """
+    Заранее запущенный процесс, который по очереди выполняет задачи из task_queue.
+
+    Позволяет не создавать новый процесс на каждую задачу. None в task_queue - завершить работу.
+    Прогресс и результаты отправляются в ipc_queue, у каждого процесса она своя: если процесс убит во время записи,
+    очередь (с захваченным lock или неполным сообщением) выбрасывается вместе с ним.
+    Процесс не daemon, чтобы задача могла запускать свои процессы, поэтому его нужно останавливать явно
+    (WorkerTask.close).
+    """
+
+    def __init__(self, ipc_queue: Queue, task_handler: Callable[[schema.TaskMessage], Iterator[schema.TaskProgress]],
+                 task_queue: Queue = None, spill_min_size: int = None, spill_dir_path: str = None) -> None:
+        self.task_queue = task_queue or Queue()
+        self.ipc_queue = ipc_queue
+        self._task_handler = task_handler
+        self._spill_min_size = spill_min_size
+        self._spill_dir_path = spill_dir_path
+        super().__init__()
+
+    def run(self) -> None:
+        while (task := self.task_queue.get()) is not None:
+            run_task(self.ipc_queue, task, self._task_handler, self._spill_min_size, self._spill_dir_path)
 
 
 class Task(ABC):
-    def __init__(self, progress_timeout_sec=None):
+    def __init__(self, progress_timeout_sec=None, progress_batch_interval_sec=None):
         self.progress_timeout_sec = progress_timeout_sec
+        self.progress_batch_interval_sec = progress_batch_interval_sec
 
     @abstractmethod
     def run(self, task_message: schema.TaskMessage) -> Iterator[schema.TaskProgress | schema.TaskDone]:
@@ -53,6 +184,10 @@ class Task(ABC):
         Задача может возвращать результаты по частям или целиком.
         Опционально можно оправлять прогресс schema.TaskProgress (функция должна быть генератором).
         Но в конце обязательно нужно вернуть schema.TaskDone.
+
+        Также можно возвращать schema.TaskCheckpoint. Если задача будет запущена повторно
+        (после истечения времени ожидания прогресса или падения воркера), последнее сохраненное состояние
+        будет в task_message.checkpoint и выполнение можно продолжить с него.
         """
         raise NotImplementedError
 
@@ -62,6 +197,17 @@ class Task(ABC):
         """
         pass
 
+    def on_progress_batch(self, updates: List[Tuple[schema.TaskMessage, schema.QueueMessage]]) -> None:
+        """
+        Вызывается вместо on_progress_changed если задан progress_batch_interval_sec.
+
+        Получает последние обновления прогресса задач за интервал (не больше одного на задачу).
+        Вызывается в отдельном потоке, поэтому подходит для медленных операций (например, одна запись в бд на пачку).
+        По умолчанию вызывает on_progress_changed для каждого обновления.
+        """
+        for task_message, ipc_message in updates:
+            self.on_progress_changed(task_message, ipc_message)
+
     def on_progress_timeout(self, task_message: schema.TaskMessage) -> None:
         """
         Вызывается когда время ожидания прогресса истекло.
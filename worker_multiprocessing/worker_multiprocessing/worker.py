@@ -1,18 +1,28 @@
 import time
 import json
-from datetime import datetime
-from typing import Any
-from multiprocessing import Queue
+import heapq
+import itertools
+from functools import partial
+from queue import Empty
+from threading import Thread, Event, Lock
+from dataclasses import dataclass
+from typing import Any, Callable, Iterator, List, Tuple
+from multiprocessing import Queue, Pipe
+from multiprocessing.connection import wait
 from abc import ABC, abstractmethod
 
 from . import schema
 from .logger import logger
-from .task import TaskRunner, Task
+from .task import TaskExecutor, Task, load_spilled_payload, release_spilled_payload, release_executor_spills
+from .progress import ProgressBatcher
+from .utils import CanceledSessions
+from .checkpoint import CheckpointStore
+from .metrics import WorkerMetrics
 
 
 class BaseWorker(ABC):
-    def __init__(self, ipc_queue: Queue, worker_name: str) -> None:
-        self._ipc_queue = ipc_queue
+    def __init__(self, ipc_queues: List[Queue], worker_name: str) -> None:
+        self._ipc_queues = ipc_queues
         self._worker_name = worker_name
 
     def __call__(self, ch, method_frame, header_frame, body) -> None:
@@ -38,15 +48,151 @@ class WorkerCommand(BaseWorker):
     def _session_canceled(self, payload: Any) -> None:
         message = schema.QueueMessage(
             type=schema.QueueMessageType.session_canceled,
-            payload={'session_id': payload['session_id']}
+            payload={'session_id': payload['session_id'], 'canceled_at': time.time()}
         )
-        self._ipc_queue.put(message)
+        # команда отправляется во все слоты, каждый слот сам проверяет относится ли она к его задаче
+        for ipc_queue in self._ipc_queues:
+            ipc_queue.put(message)
+
+
+@dataclass
+class TaskSlot:
+    """
+    Слот для выполнения одной задачи.
+
+    У каждого слота своя очередь команд ipc_queue (см. WorkerCommand) и свой заранее запущенный процесс executor.
+    Сообщения задачи приходят в executor.ipc_queue, она создается заново для каждого процесса.
+    """
+    ipc_queue: Queue
+    executor: TaskExecutor | None = None
+    executor_tasks_count: int = 0
+    channel: Any = None
+    delivery_tag: int | None = None
+    task_message: schema.TaskMessage | None = None
+    started_at: float = 0.0
+    last_progress_at: float = 0.0
+
+    @property
+    def is_free(self) -> bool:
+        return self.task_message is None
+
+    def drain(self) -> Iterator[schema.QueueMessage]:
+        """Забирает все накопившиеся сообщения: сначала от процесса задачи, затем команды"""
+        queues = [self.ipc_queue] if self.executor is None else [self.executor.ipc_queue, self.ipc_queue]
+        for queue in queues:
+            while True:
+                try:
+                    yield queue.get_nowait()
+                except Empty:
+                    break
+
+
+class TaskBuffer:
+    """
+    Локальный буфер полученных, но еще не запущенных задач.
+
+    Задачи выдаются по приоритету сообщения (больше - раньше), при равном приоритете - в порядке получения.
+    Пополняется из потока соединения, забирается потоком слежения за задачами.
+    Элементы - (канал, delivery_tag, задача, время публикации или получения сообщения).
+    """
+
+    def __init__(self) -> None:
+        self._heap = []
+        self._order = itertools.count()
+        self._lock = Lock()
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def put(self, priority: int, ch, delivery_tag: int, task_message: schema.TaskMessage, queued_at: float) -> None:
+        with self._lock:
+            heapq.heappush(self._heap, (-priority, next(self._order), ch, delivery_tag, task_message, queued_at))
+
+    def pop(self) -> Tuple[Any, int, schema.TaskMessage, float] | None:
+        with self._lock:
+            if not self._heap:
+                return None
+            return heapq.heappop(self._heap)[2:]
+
+    def pop_session(self, session_id: int) -> List[Tuple[Any, int, schema.TaskMessage, float]]:
+        """Забирает все задачи сессии"""
+        with self._lock:
+            items = [item for item in self._heap if item[4].session_id == session_id]
+            if items:
+                self._heap = [item for item in self._heap if item[4].session_id != session_id]
+                heapq.heapify(self._heap)
+            return [item[2:] for item in items]
+
+    def pop_all(self) -> List[Tuple[Any, int, schema.TaskMessage, float]]:
+        with self._lock:
+            items, self._heap = sorted(self._heap), []
+            return [item[2:] for item in items]
 
 
 class WorkerTask(BaseWorker):
-    def __init__(self, ipc_queue: Queue, worker_name: str, task_obj: Task) -> None:
-        super().__init__(ipc_queue, worker_name)
+    """
+    Выполняет задачи в отдельных процессах, по одной задаче на слот (количество слотов = количество ipc_queues).
+
+    Процессы (TaskExecutor) запускаются заранее и выполняют задачи одну за другой. При отмене задачи или истечении
+    времени ожидания прогресса процесс слота убивается и заменяется новым, а после executor_max_tasks задач
+    перезапускается (чтобы ограничить утечки памяти). Замена идет в фоновом потоке, слот принимает задачи
+    когда новый процесс запущен, а остальные слоты тем временем продолжают работать.
+
+    on_message (поток соединения RabbitMQ) только передает задачу и сразу возвращает управление.
+    Запуском задач в свободных слотах и слежением за ними занимается отдельный поток (start),
+    поэтому соединение продолжает обрабатывать heartbeat независимо от длительности задач и обработчиков Task.
+    Каждое сообщение подтверждается (ack/nack) отдельно по своему delivery_tag через
+    connection.add_callback_threadsafe, т.к. BlockingConnection можно использовать только из его потока.
+
+    Результаты задач больше spill_min_size байт передаются через временный файл в spill_dir_path,
+    в on_done приходит уже загруженный результат, а файл удаляется сразу после загрузки.
+    Файлы, оставшиеся от убитого или остановленного процесса слота, удаляются при его остановке.
+
+    Отмененные сессии запоминаются в canceled_sessions, их задачи подтверждаются без запуска.
+
+    Контрольные точки задач сохраняются в checkpoint_store и передаются задаче при повторном запуске.
+    Контрольная точка удаляется, когда сообщение задачи подтверждено (ack).
+
+    Метрики выполнения задач собираются в metrics (см. metrics.MetricsServer).
+    """
+
+    def __init__(self, ipc_queues: List[Queue], worker_name: str, task_obj: Task,
+                 executor_max_tasks: int | None = None, spill_min_size: int | None = None,
+                 spill_dir_path: str | None = None, canceled_sessions: CanceledSessions | None = None,
+                 checkpoint_store: CheckpointStore | None = None, metrics: WorkerMetrics | None = None) -> None:
+        super().__init__(ipc_queues, worker_name)
+        self._canceled_sessions = canceled_sessions
+        self._checkpoint_store = checkpoint_store
         self._task_obj = task_obj
+        self._executor_max_tasks = executor_max_tasks
+        self._spill_min_size = spill_min_size
+        self._spill_dir_path = spill_dir_path
+        self._slots = [TaskSlot(ipc_queue) for ipc_queue in ipc_queues]
+        self._replacers: List[Thread] = []
+
+        for slot in self._slots:
+            self._start_executor(slot)
+
+        self._progress_batcher = None
+        if task_obj.progress_batch_interval_sec:
+            self._progress_batcher = ProgressBatcher(task_obj.on_progress_batch, task_obj.progress_batch_interval_sec)
+            self._progress_batcher.start()
+
+        # новые задачи из потока соединения, pipe нужен чтобы разбудить поток слежения за задачами
+        self._incoming_tasks = TaskBuffer()
+
+        self.metrics = metrics or WorkerMetrics()
+        self.metrics.add_gauge('worker_busy_slots', 'Slots running a task', lambda: len(self.busy_slots))
+        self.metrics.add_gauge('worker_slots', 'Total task slots', lambda: len(self._slots))
+        self.metrics.add_gauge('worker_buffered_tasks', 'Received tasks waiting for a slot',
+                               lambda: len(self._incoming_tasks))
+        self._wakeup_reader, self._wakeup_writer = Pipe(duplex=False)
+        self._stop_event = Event()
+        self._supervisor = Thread(target=self._supervise, daemon=True)
+
+    @property
+    def busy_slots(self) -> List[TaskSlot]:
+        return [slot for slot in self._slots if not slot.is_free]
 
     def on_message(self, ch, method_frame, header_frame, body) -> None:
         task_data = json.loads(body)
@@ -56,46 +202,336 @@ class WorkerTask(BaseWorker):
             payload=task_data['payload'],
         )
 
-        task_runner = TaskRunner(self._ipc_queue, task_message, self._task_obj.run)
-        task_runner.start()
+        priority = getattr(header_frame, 'priority', None) or 0
+        queued_at = getattr(header_frame, 'timestamp', None) or time.time()
+        self._incoming_tasks.put(priority, ch, method_frame.delivery_tag, task_message, queued_at)
+        self._wakeup_writer.send_bytes(b'')
 
-        last_progress_at_dt = datetime.now()
+    def start(self) -> None:
+        """Запускает поток слежения за задачами"""
+        self._supervisor.start()
 
-        while True:
-            time.sleep(1)
-            last_progress_sec = (datetime.now() - last_progress_at_dt).total_seconds()
+    def close(self) -> None:
+        """
+        Останавливает поток слежения за задачами, процессы всех слотов и отправку прогресса.
 
-            if not self._ipc_queue.empty():
-                ipc_message: schema.QueueMessage = self._ipc_queue.get()
+        Полученные, но не запущенные задачи возвращаются в очередь (если соединение уже закрыто, их вернет брокер).
+        """
+        if self._supervisor.is_alive():
+            self._stop_event.set()
+            self._wakeup_writer.send_bytes(b'')
+            self._supervisor.join()
 
-                if ipc_message.type == schema.QueueMessageType.progress_changed:
-                    logger.info(f'Task({task_message.id}) progress updated ({ipc_message.payload.in_percentages} %)')
-                    last_progress_at_dt = datetime.now()
-                    self._task_obj.on_progress_changed(task_message, ipc_message)
+        for ch, delivery_tag, task_message, _ in self._incoming_tasks.pop_all():
+            self._call_threadsafe(ch, ch.basic_nack, delivery_tag=delivery_tag, requeue=True)
 
-                if ipc_message.type == schema.QueueMessageType.session_canceled:
-                    if ipc_message.payload['session_id'] == task_message.session_id:
-                        logger.info(f'Task({task_message.id}) canceled')
-                        task_runner.terminate()
-                        self._task_obj.on_session_canceled(task_message, ipc_message)
-                        ch.basic_ack(delivery_tag=method_frame.delivery_tag)
-                        break
-
-                if ipc_message.type == schema.QueueMessageType.done:
-                    logger.info(f'Task({task_message.id}) done')
-                    self._task_obj.on_done(task_message, ipc_message)
-                    ch.basic_ack(delivery_tag=method_frame.delivery_tag)
-                    break
+        for replacer in self._replacers:
+            replacer.join()
+
+        for slot in self._slots:
+            self._stop_executor(slot.executor, kill=not slot.is_free)
+
+        if self._progress_batcher:
+            self._progress_batcher.stop()
+
+    def _supervise(self) -> None:
+        while not self._stop_event.is_set():
+            try:
+                self.process_events(timeout=None)
+            except Exception as error:
+                # поток не должен падать: иначе воркер зависнет с неподтвержденными сообщениями
+                logger.exception(f'Task events processing failed: {error}')
+                self._stop_event.wait(1)
+
+    def process_events(self, timeout: float | None) -> None:
+        """
+        Запускает новые задачи в свободных слотах,
+        ждет не больше timeout секунд новых задач, сообщений от процессов задач или их завершения и обрабатывает их.
+        """
+        self._start_incoming_tasks()
+        busy_slots = self.busy_slots
+
+        progress_timeout_sec = self._task_obj.progress_timeout_sec
+        if progress_timeout_sec and busy_slots:
+            deadline = min(slot.last_progress_at for slot in busy_slots) + progress_timeout_sec
+            until_deadline = max(0.0, deadline - time.monotonic())
+            timeout = until_deadline if timeout is None else min(timeout, until_deadline)
+
+        # очереди свободных слотов тоже: отмена сессии должна сразу убрать ее задачи из буфера
+        # (у слота, процесс которого заменяется, очередь не читается, пока новый процесс не запущен)
+        ready_slots = [slot for slot in self._slots if slot.executor is not None]
+        wait([self._wakeup_reader]
+             + [slot.ipc_queue._reader for slot in ready_slots]
+             + [slot.executor.ipc_queue._reader for slot in busy_slots]
+             + [slot.executor.sentinel for slot in busy_slots],
+             timeout)
+
+        while self._wakeup_reader.poll():
+            self._wakeup_reader.recv_bytes()
+
+        for slot in ready_slots:
+            if slot.is_free:
+                self._drain_free_slot(slot)
+
+        for slot in busy_slots:
+            try:
+                self._process_slot_events(slot)
+            except Exception as error:
+                self._fail_slot(slot, error)
+
+        self._start_incoming_tasks()
 
-                if ipc_message.type == schema.QueueMessageType.error:
-                    logger.info(f'Task({task_message.id}) error: {ipc_message.payload["message"]}')
-                    self._task_obj.on_error(task_message, ipc_message)
-                    ch.basic_ack(delivery_tag=method_frame.delivery_tag)
+    def _start_incoming_tasks(self) -> None:
+        """Запускает полученные задачи из буфера, пока есть свободные слоты"""
+        for slot in self._slots:
+            if not slot.is_free or slot.executor is None:
+                continue  # у слота задача или его процесс еще заменяется
+
+            self._drain_free_slot(slot)
+
+            while True:
+                if (item := self._incoming_tasks.pop()) is None:
+                    return
+                ch, delivery_tag, task_message, queued_at = item
+
+                if self._canceled_sessions is None or task_message.session_id not in self._canceled_sessions:
                     break
+                self._skip_canceled_task(ch, delivery_tag, task_message)
+
+            if self._checkpoint_store is not None:
+                try:
+                    task_message.checkpoint = self._checkpoint_store.load(task_message.id)
+                except Exception as error:
+                    logger.exception(f'Task({task_message.id}) checkpoint load failed, starting from scratch: {error}')
+                if task_message.checkpoint is not None:
+                    logger.info(f'Task({task_message.id}) resumed from checkpoint')
+
+            slot.channel = ch
+            slot.delivery_tag = delivery_tag
+            slot.task_message = task_message
+            slot.started_at = slot.last_progress_at = time.monotonic()
+            slot.executor_tasks_count += 1
+            self.metrics.queue_to_start_seconds.observe(max(0.0, time.time() - queued_at))
+            slot.executor.task_queue.put(task_message)
+
+    def _drain_free_slot(self, slot: TaskSlot) -> None:
+        """Забирает сообщения, пришедшие в свободный слот: запоминает отмененные сессии, остальное больше не нужно"""
+        for ipc_message in slot.drain():
+            if ipc_message.type == schema.QueueMessageType.session_canceled:
+                self._remember_canceled_session(ipc_message)
+            if isinstance(ipc_message.payload, schema.TaskDone):
+                self._release_payload(ipc_message)
+
+    def _remember_canceled_session(self, ipc_message: schema.QueueMessage) -> None:
+        """Запоминает отмененную сессию и сразу подтверждает ее задачи из буфера"""
+        session_id = ipc_message.payload['session_id']
+        if self._canceled_sessions is not None:
+            self._canceled_sessions.add(session_id)
+
+        for ch, delivery_tag, task_message, _ in self._incoming_tasks.pop_session(session_id):
+            self._skip_canceled_task(ch, delivery_tag, task_message)
+
+    def _skip_canceled_task(self, ch, delivery_tag: int, task_message: schema.TaskMessage) -> None:
+        """Подтверждает задачу отмененной сессии не запуская ее"""
+        logger.info(f'Task({task_message.id}) skipped, session {task_message.session_id} canceled')
+        ipc_message = schema.QueueMessage(
+            type=schema.QueueMessageType.session_canceled,
+            payload={'session_id': task_message.session_id},
+        )
+        try:
+            self._task_obj.on_session_canceled(task_message, ipc_message)
+        except Exception as error:
+            logger.exception(f'Task({task_message.id}) on_session_canceled failed: {error}')
+        self._call_threadsafe(ch, ch.basic_ack, delivery_tag=delivery_tag)
+        self.metrics.tasks_total.inc(status='skipped')
+        if self._checkpoint_store is not None:
+            self._checkpoint_store.delete(task_message.id)
+
+    def _process_slot_events(self, slot: TaskSlot) -> None:
+        task_message = slot.task_message
+        progress_timeout_sec = self._task_obj.progress_timeout_sec
+
+        for ipc_message in slot.drain():
+            if ipc_message.type == schema.QueueMessageType.progress_changed:
+                self.metrics.progress_interval_seconds.observe(time.monotonic() - slot.last_progress_at)
+            if ipc_message.type in (schema.QueueMessageType.progress_changed, schema.QueueMessageType.checkpoint):
+                slot.last_progress_at = time.monotonic()
+
+            if self._handle_ipc_message(slot, ipc_message):
+                if ipc_message.type == schema.QueueMessageType.session_canceled:
+                    self._release_slot(slot, 'canceled', kill=True, canceled_at=ipc_message.payload.get('canceled_at'))
+                else:
+                    self._release_slot(slot, ipc_message.type.value)
+                return
+
+        if not slot.executor.is_alive():
+            # процесс завершился не отправив результат (например, был убит системой)
+            logger.info(f'Task({task_message.id}) process exited with code {slot.executor.exitcode}')
+            ipc_message = schema.QueueMessage(
+                type=schema.QueueMessageType.error,
+                payload={
+                    'message': f'Task process exited with code {slot.executor.exitcode}',
+                    'traceback': '',
+                },
+            )
+            self._finish_task(slot, partial(self._task_obj.on_error, task_message, ipc_message))
+            self._release_slot(slot, 'error', kill=True)
+            return
+
+        if progress_timeout_sec and time.monotonic() - slot.last_progress_at >= progress_timeout_sec:
+            logger.info(f'Task({task_message.id}) progress timeout')
+            slot.executor.terminate()
+            self._finish_task(slot, partial(self._task_obj.on_progress_timeout, task_message), ack=False)
+            self._release_slot(slot, 'timeout', kill=True)
+
+    def _handle_ipc_message(self, slot: TaskSlot, ipc_message: schema.QueueMessage) -> bool:
+        """Обрабатывает сообщение от процесса задачи. Возвращает True если выполнение задачи завершено."""
+        task_message = slot.task_message
+
+        if ipc_message.type == schema.QueueMessageType.progress_changed:
+            logger.info(f'Task({task_message.id}) progress updated ({ipc_message.payload.in_percentages} %)')
+            if self._progress_batcher:
+                self._progress_batcher.add(task_message, ipc_message)
+            else:
+                self._task_obj.on_progress_changed(task_message, ipc_message)
+
+        if ipc_message.type == schema.QueueMessageType.checkpoint and self._checkpoint_store is not None:
+            self._checkpoint_store.save(task_message.id, ipc_message.payload.state)
+
+        if ipc_message.type == schema.QueueMessageType.session_canceled:
+            self._remember_canceled_session(ipc_message)
+            if ipc_message.payload['session_id'] == task_message.session_id:
+                logger.info(f'Task({task_message.id}) canceled')
+                slot.executor.terminate()
+                self._finish_task(slot, partial(self._task_obj.on_session_canceled, task_message, ipc_message))
+                return True
+
+        if ipc_message.type == schema.QueueMessageType.done:
+            logger.info(f'Task({task_message.id}) done')
+            # файл загружается сразу: on_done может быть отложен, а файлы процесса удаляются при его замене
+            spilled = ipc_message.payload.payload
+            if isinstance(spilled, (schema.SpilledPayload, schema.PickledPayload)):
+                try:
+                    ipc_message.payload.payload = load_spilled_payload(spilled)
+                finally:
+                    if isinstance(spilled, schema.SpilledPayload):
+                        release_spilled_payload(spilled)
+            self._finish_task(slot, partial(self._task_obj.on_done, task_message, ipc_message))
+            return True
+
+        if ipc_message.type == schema.QueueMessageType.error:
+            logger.info(f'Task({task_message.id}) error: {ipc_message.payload["message"]}')
+            self._finish_task(slot, partial(self._task_obj.on_error, task_message, ipc_message))
+            return True
+
+        return False
+
+    def _fail_slot(self, slot: TaskSlot, error: Exception) -> None:
+        """
+        Завершает задачу слота, если обработка ее событий упала (в обработчиках Task, хранилище контрольных точек и т.д.).
+
+        Сообщение подтверждается как при ошибке задачи (повторная доставка скорее всего упадет так же),
+        процесс слота заменяется, остальные слоты продолжают работать.
+        """
+        if slot.is_free:
+            logger.exception(f'Slot release failed: {error}')
+            return
+
+        logger.exception(f'Task({slot.task_message.id}) events processing failed: {error}')
+        if slot.delivery_tag is not None:
+            self._call_threadsafe(slot.channel, slot.channel.basic_ack, delivery_tag=slot.delivery_tag)
+            slot.delivery_tag = None
+        self._release_slot(slot, 'error', kill=True)
+
+    def _finish_task(self, slot: TaskSlot, hook: Callable[[], None], ack: bool = True) -> None:
+        """
+        Отбрасывает неотправленный прогресс задачи слота, вызывает hook (on_done/on_error/...)
+        и подтверждает (ack) или возвращает в очередь (nack) ее сообщение.
+
+        Если прогресс задачи сейчас передается в on_progress_batch, hook вызывается после отправки пачки
+        в потоке ProgressBatcher, чтобы on_progress_batch не получил прогресс уже завершенной задачи,
+        а поток слежения не ждал медленную отправку.
+        """
+        settle = partial(self._settle_task, slot.channel, slot.delivery_tag, slot.task_message, hook, ack)
+        slot.delivery_tag = None  # сообщение подтверждает settle, см. _fail_slot
+        if self._progress_batcher:
+            self._progress_batcher.discard(slot.task_message.id, then=settle)
+        else:
+            settle()
+
+    def _settle_task(self, ch, delivery_tag: int, task_message: schema.TaskMessage,
+                     hook: Callable[[], None], ack: bool) -> None:
+        """Вызывает hook и подтверждает сообщение задачи, при ошибке hook - как при ошибке задачи (ack)"""
+        try:
+            hook()
+        except Exception:
+            ack = True
+            raise
+        finally:
+            self._call_threadsafe(ch, ch.basic_ack if ack else ch.basic_nack, delivery_tag=delivery_tag)
+            # подтвержденная задача больше не будет запущена повторно
+            if ack and self._checkpoint_store is not None:
+                self._checkpoint_store.delete(task_message.id)
+
+    def _release_slot(self, slot: TaskSlot, status: str, kill: bool = False, canceled_at: float = None) -> None:
+        """
+        Освобождает слот после завершения задачи со статусом status (для метрик).
+
+        Процесс слота заменяется новым в фоне если он был убит или выполнил executor_max_tasks задач.
+        canceled_at - время команды отмены сессии, для метрики времени до завершения процесса.
+        """
+        self.metrics.run_seconds.observe(time.monotonic() - slot.started_at)
+        self.metrics.tasks_total.inc(status=status)
+
+        slot.channel = None
+        slot.delivery_tag = None
+        slot.task_message = None
+
+        if kill or (self._executor_max_tasks and slot.executor_tasks_count >= self._executor_max_tasks):
+            executor, slot.executor = slot.executor, None
+            self._replacers = [replacer for replacer in self._replacers if replacer.is_alive()]
+            self._replacers.append(Thread(target=self._replace_executor, args=(slot, executor, kill, canceled_at)))
+            self._replacers[-1].start()
+
+    def _replace_executor(self, slot: TaskSlot, executor: TaskExecutor, kill: bool, canceled_at: float | None) -> None:
+        """Останавливает прежний процесс слота и запускает новый (в отдельном потоке)"""
+        self._stop_executor(executor, kill)
+        if canceled_at:
+            self.metrics.cancel_to_terminate_seconds.observe(max(0.0, time.time() - canceled_at))
+
+        self._start_executor(slot)
+        self._wakeup_writer.send_bytes(b'')
+
+    @classmethod
+    def _call_threadsafe(cls, ch, method: Callable, **kwargs) -> None:
+        """Вызывает метод канала в потоке соединения"""
+        try:
+            ch.connection.add_callback_threadsafe(partial(method, **kwargs))
+        except Exception as error:
+            # соединение закрыто, брокер сам вернет неподтвержденные сообщения в очередь
+            logger.error(f'Unable to call {method.__name__}: {error}')
+
+    @classmethod
+    def _release_payload(cls, ipc_message: schema.QueueMessage) -> None:
+        if isinstance(ipc_message.payload.payload, schema.SpilledPayload):
+            release_spilled_payload(ipc_message.payload.payload)
+
+    def _start_executor(self, slot: TaskSlot) -> None:
+        # новая очередь: прежний процесс мог быть убит во время записи в свою
+        executor = TaskExecutor(Queue(), self._task_obj.run, spill_min_size=self._spill_min_size,
+                                spill_dir_path=self._spill_dir_path)
+        executor.start()
+        slot.executor_tasks_count = 0
+        slot.executor = executor
 
-            if self._task_obj.progress_timeout_sec and last_progress_sec > self._task_obj.progress_timeout_sec:
-                logger.info(f'Task({task_message.id}) progress timeout')
-                task_runner.terminate()
-                self._task_obj.on_progress_timeout(task_message)
-                ch.basic_nack(delivery_tag=method_frame.delivery_tag)
-                break
+    def _stop_executor(self, executor: TaskExecutor | None, kill: bool) -> None:
+        if executor is None:
+            return
+        if kill:
+            executor.terminate()
+        else:
+            executor.task_queue.put(None)
+        executor.join()
+        executor.ipc_queue.close()
+        if self._spill_min_size is not None:
+            release_executor_spills(executor.pid, self._spill_dir_path)
@@ -0,0 +1,43 @@
+"""
+Микробенчмарк десериализаторов xml-файлов.
+
+Запуск из директории zip_objects_multiprocessing:
+python -m benchmarks.deserialize --files 20000
+"""
+
+import argparse
+import timeit
+
+from generate_data import generate_xml_files
+from serializers import ObjXmlSerializer, ObjXmlFastSerializer
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compares ObjXmlSerializer and ObjXmlFastSerializer.')
+    parser.add_argument('--files', type=int, default=20000, help='Number of generated xml files')
+    parser.add_argument('--repeat', type=int, default=5, help='Number of measurements, best one is shown')
+    args = parser.parse_args()
+
+    documents = [content.encode() for _, content in generate_xml_files(args.files)]
+    serializers = {
+        'generic': ObjXmlSerializer(),
+        'fast': ObjXmlFastSerializer(),
+    }
+
+    expected = [serializers['generic'].deserialize(document) for document in documents]
+    assert [serializers['fast'].deserialize(document) for document in documents] == expected
+
+    timings = {}
+    for name, serializer in serializers.items():
+        timings[name] = min(timeit.repeat(
+            lambda: [serializer.deserialize(document) for document in documents],
+            number=1,
+            repeat=args.repeat,
+        ))
+        print(f'{name:>8}: {timings[name]:.3f} sec, {len(documents) / timings[name]:,.0f} files/sec')
+
+    print(f' speedup: {timings["generic"] / timings["fast"]:.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+"""
+Сравнение памяти и размера pickle для Obj и ObjRecord.
+
+Запуск из директории zip_objects_multiprocessing:
+python -m benchmarks.obj_size --files 20000
+"""
+
+import pickle
+import timeit
+import argparse
+import tracemalloc
+from random import Random
+
+from generate_data import generate_xml_files
+from serializers import ObjXmlFastSerializer
+
+
+def allocated_bytes(factory) -> tuple:
+    tracemalloc.start()
+    objs = factory()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return objs, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compares memory and pickle size of Obj and ObjRecord.')
+    parser.add_argument('--files', type=int, default=20000, help='Number of generated xml files')
+    parser.add_argument('--batch-size', type=int, default=500, help='Objects per pickled batch (as in BatchQueue)')
+    args = parser.parse_args()
+
+    serializer = ObjXmlFastSerializer()
+    documents = [content.encode() for _, content in generate_xml_files(args.files, Random(0))]
+    factories = {
+        'Obj': lambda: [serializer.deserialize(document) for document in documents],
+        'ObjRecord': lambda: [serializer.deserialize_record(document) for document in documents],
+    }
+
+    for name, factory in factories.items():
+        objs, memory = allocated_bytes(factory)
+        batches = [objs[i:i + args.batch_size] for i in range(0, len(objs), args.batch_size)]
+        pickled = [pickle.dumps(batch, protocol=pickle.HIGHEST_PROTOCOL) for batch in batches]
+        pickle_sec = min(timeit.repeat(
+            lambda: [pickle.loads(pickle.dumps(batch, protocol=pickle.HIGHEST_PROTOCOL)) for batch in batches],
+            number=1,
+            repeat=3,
+        ))
+
+        print(f'{name:>10}: {memory / len(objs):6.0f} bytes/obj in memory, '
+              f'{sum(map(len, pickled)) / len(objs):6.1f} bytes/obj pickled, '
+              f'{len(objs) / pickle_sec:,.0f} obj/sec dumps+loads')
+
+
+if __name__ == '__main__':
+    main()
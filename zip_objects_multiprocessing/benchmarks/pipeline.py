@@ -0,0 +1,281 @@
+"""
+Бенчмарк пайплайна zip -> csv по стадиям и целиком.
+
+Генерирует корпус архивов через create_archives и замеряет в отдельных процессах:
+read (read_zip_archive и read_zip_archive_mmap), parse (ObjXmlFastSerializer.deserialize),
+transport (очередь TaskRunner), write и load (запись и чтение csv и бинарных колонок),
+end_to_end (unzip_archives в обычном и шардированном режиме) для разного числа процессов.
+Результат печатается (или записывается в --output) в виде json. Входные данные стадий готовятся заранее
+и в замер не входят; пиковая память (peak_rss_mb) включает эту подготовку, у transport mb_per_sec считается по pickle,
+у load - по размеру выходных файлов.
+
+Запуск из директории zip_objects_multiprocessing:
+python -m benchmarks.pipeline --archives 20 --files-per-archive 1000 --processes 1 2 4 --output bench.json
+"""
+
+import os
+import csv
+import sys
+import json
+import pickle
+import time
+import shutil
+import argparse
+import platform
+import resource
+import tempfile
+from queue import Empty
+from pathlib import Path
+from typing import List, Tuple
+from multiprocessing import get_context
+
+from generate_data import create_archives
+from main import unzip_archives
+from schemas import Obj
+from serializers import ObjXmlFastSerializer
+from utils.tasks import TaskExecutor, TaskRunner, BatchQueue
+from utils.zip import read_zip_archive, read_zip_archive_mmap, dir_zip_files
+from writers import ObjWriter, ObjCsvWriter, ObjColumnarWriter, ObjColumnarReader
+
+
+class TransportBenchTask(TaskExecutor):
+    """Отправляет в очередь заданное количество одинаковых объектов, чтобы замерить только передачу"""
+
+    obj = Obj(
+        vars={'id': 'c9e50e58-a29d-4033-8df4-9f1d300f38bb', 'level': '42'},
+        objects=['17915dd5-9a86-4990-9039-5193ababbc83'] * 5,
+    )
+
+    @classmethod
+    def run(cls, queue: BatchQueue, objects_count: int):
+        for _ in range(objects_count):
+            queue.put(cls.obj)
+
+    def on_progress(self, obj: Obj):
+        pass
+
+
+def dir_size(dir_path: Path) -> int:
+    return sum(file_path.stat().st_size for file_path in dir_path.rglob('*') if file_path.is_file())
+
+
+def read_corpus(corpus_dir: Path) -> List[bytes]:
+    return [content for zip_file_path in dir_zip_files(corpus_dir) for _, content in read_zip_archive(zip_file_path)]
+
+
+def stage_read(corpus_dir: Path, reader: str) -> Tuple[int, int, float]:
+    read = read_zip_archive_mmap if reader == 'mmap' else read_zip_archive
+    objects_count, bytes_count = 0, 0
+    start = time.perf_counter()
+    for zip_file_path in dir_zip_files(corpus_dir):
+        for _, content in read(zip_file_path):
+            objects_count += 1
+            bytes_count += len(content)
+    return objects_count, bytes_count, time.perf_counter() - start
+
+
+def stage_parse(corpus_dir: Path) -> Tuple[int, int, float]:
+    documents = read_corpus(corpus_dir)
+    serializer = ObjXmlFastSerializer()
+
+    start = time.perf_counter()
+    for document in documents:
+        serializer.deserialize(document)
+    return len(documents), sum(map(len, documents)), time.perf_counter() - start
+
+
+def stage_transport(corpus_dir: Path, processes: int, batch_size: int) -> Tuple[int, int, float]:
+    objects_count = len(read_corpus(corpus_dir))
+    tasks = [objects_count // processes + (i < objects_count % processes) for i in range(processes)]
+
+    start = time.perf_counter()
+    TaskRunner(TransportBenchTask(), tasks, processes=processes, batch_size=batch_size).run()
+    seconds = time.perf_counter() - start
+    return objects_count, objects_count * len(pickle.dumps(TransportBenchTask.obj)), seconds
+
+
+def write_in_batches(writer: ObjWriter, objs: List[Obj], batch_size: int = 500):
+    for i in range(0, len(objs), batch_size):
+        writer.write(objs[i:i + batch_size])
+
+
+def stage_write(corpus_dir: Path, work_dir: Path, output_format: str) -> Tuple[int, int, float]:
+    documents = read_corpus(corpus_dir)
+    serializer = ObjXmlFastSerializer()
+    objs = [serializer.deserialize(document) for document in documents]
+
+    start = time.perf_counter()
+    if output_format == 'columnar':
+        with ObjColumnarWriter(work_dir / 'columns') as writer:
+            write_in_batches(writer, objs)
+    else:
+        with (open(work_dir / 'id_level.csv', 'w', newline='') as id_level_file,
+              open(work_dir / 'id_object_name.csv', 'w', newline='') as id_object_name_file):
+            write_in_batches(ObjCsvWriter(id_level_file, id_object_name_file), objs)
+    return len(objs), sum(map(len, documents)), time.perf_counter() - start
+
+
+def stage_load(corpus_dir: Path, work_dir: Path, output_format: str) -> Tuple[int, int, float]:
+    """Читает результат stage_write обратно: csv через csv.reader, колонки через mmap"""
+    stage_write(corpus_dir, work_dir, output_format)
+    output_bytes = dir_size(work_dir)
+
+    start = time.perf_counter()
+    if output_format == 'columnar':
+        with ObjColumnarReader(work_dir / 'columns') as reader:
+            objects_count = len(reader)
+            sum(reader.levels), sum(reader.offsets)
+    else:
+        with (open(work_dir / 'id_level.csv', newline='') as id_level_file,
+              open(work_dir / 'id_object_name.csv', newline='') as id_object_name_file):
+            levels = [int(level) for _, level in csv.reader(id_level_file)]
+            objects_count = len(levels)
+            list(csv.reader(id_object_name_file))
+    return objects_count, output_bytes, time.perf_counter() - start
+
+
+def stage_end_to_end(corpus_dir: Path, work_dir: Path, processes: int, sharded: bool) -> Tuple[int, int, float]:
+    documents = read_corpus(corpus_dir)
+
+    start = time.perf_counter()
+    unzip_archives(
+        archives_dir_path=corpus_dir,
+        id_level_file_path=work_dir / 'id_level.csv',
+        id_object_name_file_path=work_dir / 'id_object_name.csv',
+        shards_dir_path=work_dir / 'shards' if sharded else None,
+        processes=processes,
+    )
+    return len(documents), sum(map(len, documents)), time.perf_counter() - start
+
+
+STAGES = {
+    'read': stage_read,
+    'parse': stage_parse,
+    'transport': stage_transport,
+    'write': stage_write,
+    'load': stage_load,
+    'end_to_end': stage_end_to_end,
+}
+
+
+def _run_stage(results_queue, stage: str, kwargs: dict):
+    objects_count, bytes_count, seconds = STAGES[stage](**kwargs)
+
+    # ru_maxrss в Linux в килобайтах, в macOS в байтах
+    rss_unit = 1 if sys.platform == 'darwin' else 1024
+    results_queue.put({
+        'seconds': seconds,
+        'objects': objects_count,
+        'objects_per_sec': objects_count / seconds,
+        'mb_per_sec': bytes_count / seconds / 1024 / 1024,
+        'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * rss_unit / 1024 / 1024,
+        'peak_children_rss_mb': resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * rss_unit / 1024 / 1024,
+    })
+
+
+def measure(stage: str, **kwargs) -> dict:
+    """Выполняет стадию в отдельном (spawn) процессе, чтобы пиковая память не зависела от предыдущих стадий"""
+    work_dir = kwargs.get('work_dir')
+    if work_dir is not None:
+        shutil.rmtree(work_dir, ignore_errors=True)
+        work_dir.mkdir(parents=True)
+
+    ctx = get_context('spawn')
+    results_queue = ctx.Queue()
+    process = ctx.Process(target=_run_stage, args=(results_queue, stage, kwargs))
+    process.start()
+    while True:
+        # exitcode проверяется до ожидания: результат завершившегося процесса уже лежит в очереди
+        exited = process.exitcode is not None
+        try:
+            result = results_queue.get(timeout=0.1 if exited else 1)
+            break
+        except Empty:
+            if exited:
+                raise RuntimeError(f'Stage {stage} process exited with code {process.exitcode} without a result')
+    process.join()
+
+    if work_dir is not None:
+        result['output_mb'] = dir_size(work_dir) / 1024 / 1024
+
+    params = {key: value for key, value in kwargs.items() if key not in ('corpus_dir', 'work_dir')}
+    return {'stage': stage, **params, **result}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmarks zip to csv pipeline stages.')
+    parser.add_argument('--archives', type=int, default=20)
+    parser.add_argument('--files-per-archive', type=int, default=1000)
+    parser.add_argument('--objects-per-file', type=int, nargs=2, default=(1, 10), metavar=('MIN', 'MAX'))
+    parser.add_argument('--extra-vars-per-file', type=int, nargs=2, default=(0, 0), metavar=('MIN', 'MAX'))
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--processes', type=int, nargs='+', default=[1, os.cpu_count()])
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 500])
+    parser.add_argument('--stages', nargs='+', choices=list(STAGES), default=list(STAGES))
+    parser.add_argument('--work-dir', type=Path, help='Directory for corpus and results (temporary by default)')
+    parser.add_argument('--output', type=Path, help='Json file for results (stdout by default)')
+    args = parser.parse_args()
+
+    work_dir = args.work_dir or Path(tempfile.mkdtemp(prefix='zip_pipeline_bench_'))
+    corpus_dir = work_dir / 'corpus'
+    results_dir = work_dir / 'results'
+    processes_counts = sorted(set(args.processes))
+
+    try:
+        corpus_dir.mkdir(parents=True, exist_ok=True)
+        create_archives(
+            corpus_dir,
+            archives_count=args.archives,
+            files_per_archive=args.files_per_archive,
+            processes=max(processes_counts),
+            seed=args.seed,
+            objects_per_file=tuple(args.objects_per_file),
+            extra_vars_per_file=tuple(args.extra_vars_per_file),
+        )
+
+        results = []
+        for stage in args.stages:
+            if stage == 'read':
+                for reader in ('zipfile', 'mmap'):
+                    results.append(measure(stage, corpus_dir=corpus_dir, reader=reader))
+            if stage == 'parse':
+                results.append(measure(stage, corpus_dir=corpus_dir))
+            if stage in ('write', 'load'):
+                for output_format in ('csv', 'columnar'):
+                    results.append(measure(stage, corpus_dir=corpus_dir, work_dir=results_dir,
+                                           output_format=output_format))
+            if stage == 'transport':
+                for processes in processes_counts:
+                    for batch_size in args.batch_sizes:
+                        results.append(measure(stage, corpus_dir=corpus_dir, processes=processes, batch_size=batch_size))
+            if stage == 'end_to_end':
+                for processes in processes_counts:
+                    for sharded in (False, True):
+                        results.append(measure(stage, corpus_dir=corpus_dir, work_dir=results_dir,
+                                               processes=processes, sharded=sharded))
+    finally:
+        if args.work_dir is None:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    report = {
+        'python': platform.python_version(),
+        'cpu_count': os.cpu_count(),
+        'corpus': {
+            'archives': args.archives,
+            'files_per_archive': args.files_per_archive,
+            'objects_per_file': args.objects_per_file,
+            'extra_vars_per_file': args.extra_vars_per_file,
+            'seed': args.seed,
+        },
+        'results': results,
+    }
+    report_json = json.dumps(report, indent=2)
+
+    if args.output:
+        args.output.write_text(report_json)
+    else:
+        print(report_json)
+
+
+if __name__ == '__main__':
+    main()
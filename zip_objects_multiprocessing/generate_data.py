@@ -1,41 +1,109 @@
-from uuid import uuid4
 from pathlib import Path
-from random import randint
-from typing import Generator, Tuple
+from random import Random
+from dataclasses import dataclass
+from multiprocessing import Pool
+from typing import Generator, Tuple, Callable, List
 
 from schemas import Obj
-from serializers import ObjXmlSerializer
+from serializers import ObjXmlFastSerializer
 from utils.zip import create_zip_archive
 
+# количество (объектов или переменных в файле): число, диапазон [a, b] или функция от Random
+SizeDistribution = int | Tuple[int, int] | Callable[[Random], int]
 
-def generate_obj() -> Obj:
+_UUID4_MASK = ~(0xf000 << 64) & ~(0xc000 << 48)
+_UUID4_BITS = (0x4000 << 64) | (0x8000 << 48)
+
+
+@dataclass
+class SkewedSize:
+    """Распределение Парето, обрезанное до [low, high]: в основном маленькие значения и редкие большие"""
+    low: int
+    high: int
+    alpha: float = 1.5
+
+    def __call__(self, rng: Random) -> int:
+        return min(self.high, int(self.low * rng.paretovariate(self.alpha)))
+
+
+def sample_size(rng: Random, distribution: SizeDistribution) -> int:
+    if isinstance(distribution, int):
+        return distribution
+    if isinstance(distribution, tuple):
+        return rng.randint(*distribution)
+    return distribution(rng)
+
+
+def random_uuids(rng: Random, count: int) -> List[str]:
+    """Генерирует uuid4 из переданного генератора (быстрее uuid4() и воспроизводимо при заданном seed)"""
+    uuids = []
+    for _ in range(count):
+        h = f'{(rng.getrandbits(128) & _UUID4_MASK) | _UUID4_BITS:032x}'
+        uuids.append(f'{h[:8]}-{h[8:12]}-{h[12:16]}-{h[16:20]}-{h[20:]}')
+    return uuids
+
+
+def generate_obj(rng: Random = None, objects_per_file: SizeDistribution = (1, 10),
+                 extra_vars_per_file: SizeDistribution = 0) -> Obj:
     """Генерирует объект"""
+    rng = rng or Random()
+    objects_count = sample_size(rng, objects_per_file)
+    extra_vars_count = sample_size(rng, extra_vars_per_file)
+    uuids = random_uuids(rng, 1 + objects_count)
+
     vars_ = {
-        'id': str(uuid4()),
-        'level': str(randint(1, 100)),
+        'id': uuids[0],
+        'level': str(rng.randint(1, 100)),
     }
-    objects = [str(uuid4()) for _ in range(randint(1, 10))]
+    for i in range(extra_vars_count):
+        vars_[f'var_{i}'] = str(rng.getrandbits(32))
 
     return Obj(
         vars=vars_,
-        objects=objects,
+        objects=uuids[1:],
     )
 
 
-def generate_xml_files(files_count: int) -> Generator[Tuple[str, str], None, None]:
+def generate_xml_files(files_count: int, rng: Random = None, objects_per_file: SizeDistribution = (1, 10),
+                       extra_vars_per_file: SizeDistribution = 0) -> Generator[Tuple[str, str], None, None]:
     """Генерирует заданное количество xml-файлов"""
-    serializer = ObjXmlSerializer()
+    rng = rng or Random()
+    serializer = ObjXmlFastSerializer()
 
     for i in range(files_count):
-        obj = generate_obj()
+        obj = generate_obj(rng, objects_per_file, extra_vars_per_file)
         obj_xml = serializer.serialize(obj)
         file_name = f'file_{i}.xml'
 
         yield file_name, obj_xml
 
 
-def create_archives(path: Path, archives_count: int, files_per_archive: int):
-    """Создает zip-архивы с xml-файлами внутри"""
-    for i in range(1, archives_count + 1):
-        archive_name = f'xml_objects_{i}.zip'
-        create_zip_archive(path / archive_name, generate_xml_files(files_per_archive))
+def create_archive(file_path: Path, files_count: int, seed: str | None, objects_per_file: SizeDistribution,
+                   extra_vars_per_file: SizeDistribution):
+    rng = Random(seed)
+    create_zip_archive(file_path, generate_xml_files(files_count, rng, objects_per_file, extra_vars_per_file))
+
+
+def create_archives(path: Path, archives_count: int, files_per_archive: int, processes: int = 1,
+                    seed: int | None = None, objects_per_file: SizeDistribution = (1, 10),
+                    extra_vars_per_file: SizeDistribution = 0):
+    """
+    Создает zip-архивы с xml-файлами внутри
+
+    При processes > 1 архивы создаются в пуле процессов (функции-распределения должны быть picklable).
+    У каждого архива свой генератор с seed, производным от seed и номера архива,
+    поэтому при заданном seed содержимое не зависит от количества процессов.
+    """
+    args = [
+        (path / f'xml_objects_{i}.zip', files_per_archive, None if seed is None else f'{seed}:{i}',
+         objects_per_file, extra_vars_per_file)
+        for i in range(1, archives_count + 1)
+    ]
+
+    if processes <= 1:
+        for archive_args in args:
+            create_archive(*archive_args)
+        return
+
+    with Pool(processes=processes) as pool:
+        pool.starmap(create_archive, args)
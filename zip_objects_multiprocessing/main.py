@@ -1,52 +1,486 @@
-import csv
-from queue import Queue
-from typing import TextIO
+import os
+import time
+import logging
+import hashlib
+import argparse
+from threading import Thread, Event
+from zipfile import BadZipFile
+from dataclasses import dataclass, asdict
+from typing import TextIO, List, Dict, Tuple
 from pathlib import Path
 
-from utils.tasks import TaskExecutor, TaskRunner
-from schemas import Obj
-from serializers import ObjXmlSerializer
-from utils.zip import read_zip_archive, dir_zip_files
+from utils.tasks import TaskExecutor, TaskRunner, TaskPool, TaskResult, BatchQueue
+from utils.files import concat_files, copy_file_ranges, write_json_atomic
+from schemas import Obj, ObjRecord, Shard
+from manifest import ArchiveFingerprint, ArchivesManifest
+from serializers import ObjXmlFastSerializer
+from writers import ObjWriter, ObjCsvWriter, ObjColumnarWriter, LockedObjWriter
+from utils.zip import ZipPart, read_zip_part, split_zip_archive, dir_zip_files
 from generate_data import create_archives
+from logger import logger
 
+SHARDS_MANIFEST_FILE_NAME = 'manifest.json'
+ARCHIVES_MANIFEST_FILE_NAME = 'archives.json'
+ZIP_PART_MAX_SIZE = 64 * 1024 * 1024
+
+
+@dataclass
+class ShardTask:
+    zip_part: ZipPart
+    shards_dir_path: str
+    shard_name: str
 
-class UnzipXmlToCsvTask(TaskExecutor):
-    def __init__(self, id_level_file: TextIO, id_object_name_file: TextIO, csv_delimiter=','):
-        self._id_level_writer = csv.writer(id_level_file, delimiter=csv_delimiter)
-        self._id_object_name_writer = csv.writer(id_object_name_file, delimiter=csv_delimiter)
+
+class UnzipXmlTask(TaskExecutor):
+    """Процессы пула разбирают xml-файлы, а основной процесс записывает объекты через ObjWriter"""
+
+    def __init__(self, writer: ObjWriter):
+        self._writer = writer
 
     @classmethod
-    def run(cls, queue: Queue, zip_file_path: Path | str):
-        """Читает файлы из zip-архива и отправляет их в очередь"""
-        serializer = ObjXmlSerializer()
-        for _, file_content in read_zip_archive(zip_file_path):
-            obj: Obj = serializer.deserialize(file_content)
+    def run(cls, queue: BatchQueue, zip_part: ZipPart):
+        """Читает файлы из части zip-архива и отправляет их в очередь компактными ObjRecord"""
+        serializer = ObjXmlFastSerializer()
+        for _, file_content in read_zip_part(zip_part):
+            queue.bytes_read += len(file_content)
+            obj: ObjRecord | Obj = serializer.deserialize_record(file_content)
             queue.put(obj)
 
-    def on_progress(self, obj: Obj):
+    def on_progress(self, obj: ObjRecord | Obj):
         """"""
-        self._id_level_writer.writerow([obj.vars['id'], obj.vars['level']])
-        self._id_object_name_writer.writerows([(obj.vars['id'], o) for o in obj.objects])
+        self._writer.write([obj])
 
+    def on_progress_batch(self, objs: List[ObjRecord | Obj]):
+        self._writer.write(objs)
 
-def unzip_archives(archives_dir_path: Path, id_level_file_path: Path, id_object_name_file_path: Path):
-    with (open(id_level_file_path, 'a', newline='') as id_level_file,
-          open(id_object_name_file_path, 'a', newline='') as id_object_name_file):
+    def on_task_done(self, task_result: TaskResult):
+        if task_result.error:
+            logger.error(f'Part {task_result.task} failed: {task_result.error}')
+
+
+class UnzipXmlToCsvTask(UnzipXmlTask):
+    def __init__(self, id_level_file: TextIO, id_object_name_file: TextIO, csv_delimiter=','):
+        super().__init__(ObjCsvWriter(id_level_file, id_object_name_file, csv_delimiter))
+
+
+class UnzipXmlToCsvShardsTask(TaskExecutor):
+    """Каждый процесс пула сам пишет csv-файлы (шарды) и возвращает только описание шарда"""
+
+    @classmethod
+    def run(cls, queue: BatchQueue, task: ShardTask) -> Shard:
+        id_level_path, id_object_name_path = shard_paths(task)
+        shard = Shard(
+            zip_part=task.zip_part,
+            id_level_path=id_level_path,
+            id_object_name_path=id_object_name_path,
+            objects_count=0,
+        )
+        serializer = ObjXmlFastSerializer()
+
+        # пишем во временные файлы, чтобы шард с итоговым именем всегда был записан целиком
+        with (open(f'{shard.id_level_path}.tmp', 'w', newline='') as id_level_file,
+              open(f'{shard.id_object_name_path}.tmp', 'w', newline='') as id_object_name_file):
+            writer = ObjCsvWriter(id_level_file, id_object_name_file)
+            for _, file_content in read_zip_part(task.zip_part):
+                writer.write([serializer.deserialize(file_content)])
+                shard.objects_count += 1
+                queue.bytes_read += len(file_content)
+        queue.items_count = shard.objects_count
+
+        os.replace(f'{shard.id_level_path}.tmp', shard.id_level_path)
+        os.replace(f'{shard.id_object_name_path}.tmp', shard.id_object_name_path)
+        return shard
+
+    def on_progress(self, message):
+        pass
+
+
+class UnzipXmlToCsvIncrementalTask(UnzipXmlToCsvShardsTask):
+    """
+    Фиксирует архив в манифесте как только успешно обработаны все его части.
+
+    Если хотя бы одна часть архива не обработана, шарды всех его частей удаляются, а архив не фиксируется.
+    """
+
+    def __init__(self, manifest: ArchivesManifest):
+        self._manifest = manifest
+        self._fingerprints: Dict[str, ArchiveFingerprint] = {}
+        self._pending_parts_count: Dict[str, int] = {}
+        self._shards: Dict[str, List[Shard]] = {}
+        self._failed_tasks: Dict[str, List[ShardTask]] = {}
+
+    def add_archive(self, archive_path: str, fingerprint: ArchiveFingerprint, parts_count: int):
+        self._fingerprints[archive_path] = fingerprint
+        self._pending_parts_count[archive_path] = parts_count
+        self._shards[archive_path] = []
+        self._failed_tasks[archive_path] = []
+        if parts_count == 0:
+            self._finish(archive_path)
+
+    def on_task_done(self, task_result: TaskResult):
+        task: ShardTask = task_result.task
+        archive_path = task.zip_part.file_path
+        if task_result.error:
+            logger.error(f'Part {task.zip_part} of archive {archive_path} failed: {task_result.error}')
+            self._failed_tasks[archive_path].append(task)
+        else:
+            self._shards[archive_path].append(task_result.result)
+
+        self._pending_parts_count[archive_path] -= 1
+        if self._pending_parts_count[archive_path] == 0:
+            self._finish(archive_path)
+
+    def _finish(self, archive_path: str):
+        shards = sorted(self._shards.pop(archive_path), key=lambda shard: shard.zip_part.start)
+        failed_tasks = self._failed_tasks.pop(archive_path)
+        if failed_tasks:
+            remove_shards(shards)
+            remove_task_shards(failed_tasks)
+            return
+
+        remove_shards(self._manifest.commit(archive_path, self._fingerprints[archive_path], shards))
+
+
+def shard_paths(task: ShardTask) -> Tuple[str, str]:
+    """Пути id_level и id_object_name файлов шарда задачи"""
+    shards_dir_path = Path(task.shards_dir_path)
+    return (str(shards_dir_path / f'{task.shard_name}.{ObjCsvWriter.id_level_file_name}'),
+            str(shards_dir_path / f'{task.shard_name}.{ObjCsvWriter.id_object_name_file_name}'))
+
+
+def remove_task_shards(tasks: List[ShardTask]) -> None:
+    """Удаляет шарды задач вместе с недописанными временными файлами"""
+    for task in tasks:
+        for file_path in shard_paths(task):
+            Path(file_path).unlink(missing_ok=True)
+            Path(f'{file_path}.tmp').unlink(missing_ok=True)
+
+
+def split_zip_archives(archives_dir_path: Path, max_part_size: int) -> List[ZipPart]:
+    """Делит все архивы директории на части не больше max_part_size сжатых байт, поврежденные архивы пропускает"""
+    parts = []
+    for zip_file_path in dir_zip_files(archives_dir_path):
+        try:
+            parts.extend(split_zip_archive(zip_file_path, max_part_size))
+        except BadZipFile as error:
+            logger.error(f'Archive {zip_file_path} is skipped: {error}')
+    return parts
+
+
+def unzip_archives_to_shards(archives_dir_path: Path, shards_dir_path: Path,
+                             max_part_size: int = ZIP_PART_MAX_SIZE, processes: int = None,
+                             pool: TaskPool = None) -> List[Shard]:
+    """
+    Обрабатывает архивы в процессах пула, оставляя в shards_dir_path шарды и manifest.json с их списком.
+
+    Если хотя бы одна задача завершилась ошибкой, шарды всех задач удаляются и выбрасывается RuntimeError.
+    """
+    shards_dir_path.mkdir(parents=True, exist_ok=True)
+
+    tasks = [
+        ShardTask(zip_part, str(shards_dir_path), shard_name=f'{i:06d}_{Path(zip_part.file_path).stem}')
+        for i, zip_part in enumerate(split_zip_archives(archives_dir_path, max_part_size))
+    ]
+    # большие части запускаются первыми, чтобы в конце пул не ждал одну долгую задачу
+    tasks.sort(key=lambda task: task.zip_part.compress_size, reverse=True)
+    # в общем пуле отправленные задачи дорабатывают и после ошибки, поэтому дожидаемся их, чтобы удалить их шарды
+    task_runner = TaskRunner(UnzipXmlToCsvShardsTask(), tasks, skip_errors=pool is not None, processes=processes,
+                             pool=pool)
+    results = task_runner.run()
+
+    failed_results = [result for result in results if result.error is not None]
+    if failed_results or len(results) < len(tasks):
+        remove_task_shards(tasks)
+        error = failed_results[0] if failed_results else None
+        raise RuntimeError(
+            f'{len(failed_results)} of {len(tasks)} tasks failed, {len(tasks) - len(results)} not finished'
+            + (f', first error in {error.task.zip_part.file_path}: {error.error}' if error else '')
+        )
+
+    # имена шардов начинаются с номера задачи, поэтому порядок шардов не зависит от планирования пула
+    results = sorted(results, key=lambda r: r.task.shard_name)
+    shards = [result.result for result in results]
+    write_json_atomic(shards_dir_path / SHARDS_MANIFEST_FILE_NAME, [asdict(shard) for shard in shards])
+
+    return shards
+
+
+def merge_shards(shards: List[Shard], id_level_file_path: Path, id_object_name_file_path: Path) -> None:
+    """Склеивает шарды в итоговые csv-файлы (файлы перезаписываются)"""
+    concat_files([shard.id_level_path for shard in shards], id_level_file_path, mode='wb')
+    concat_files([shard.id_object_name_path for shard in shards], id_object_name_file_path, mode='wb')
+
+
+def remove_shards(shards: List[Shard]) -> None:
+    for shard in shards:
+        Path(shard.id_level_path).unlink(missing_ok=True)
+        Path(shard.id_object_name_path).unlink(missing_ok=True)
+
+
+def _sync_outputs(manifest: ArchivesManifest, output_paths: Tuple[Path, Path]) -> None:
+    """
+    Приводит итоговые файлы к манифесту: строки, дописанные после последнего сохранения манифеста, обрезаются.
+    Если файлы короче ожидаемого (удалены или не успели пересобраться), манифест сбрасывается,
+    и все архивы будут обработаны заново.
+    """
+    expected_sizes = manifest.output_sizes()
+    actual_sizes = [file_path.stat().st_size if file_path.exists() else 0 for file_path in output_paths]
+    if any(actual < expected for actual, expected in zip(actual_sizes, expected_sizes)):
+        remove_shards(manifest.clear())
+        expected_sizes = (0, 0)
 
-        tasks = list(dir_zip_files(archives_dir_path))
+    for file_path, size in zip(output_paths, expected_sizes):
+        with open(file_path, 'ab') as file:
+            file.truncate(size)
+
+
+def _remove_from_outputs(manifest: ArchivesManifest, archive_paths: List[str], output_paths: Tuple[Path, Path]):
+    """Удаляет архивы из манифеста, а их строки из итоговых файлов (файлы пересобираются, только если строки были)"""
+    rebuild = any(manifest.is_merged(archive_path) for archive_path in archive_paths)
+    if rebuild:
+        kept_paths = [archive_path for archive_path in manifest.archive_paths() if archive_path not in archive_paths]
+        for file_path, ranges in zip(output_paths, manifest.output_ranges(kept_paths)):
+            copy_file_ranges(file_path, ranges, f'{file_path}.tmp')
+        for file_path in output_paths:
+            os.replace(f'{file_path}.tmp', file_path)
+
+    remove_shards(manifest.remove(archive_paths))
+
+
+def _append_pending_shards(manifest: ArchivesManifest, output_paths: Tuple[Path, Path]):
+    """Дописывает шарды зафиксированных архивов в конец итоговых файлов и удаляет шарды"""
+    pending_shards = manifest.pending_shards()
+    if not pending_shards:
+        return
+
+    sizes = {}
+    for archive_path, shards in pending_shards.items():
+        sizes[archive_path] = (sum(os.path.getsize(shard.id_level_path) for shard in shards),
+                               sum(os.path.getsize(shard.id_object_name_path) for shard in shards))
+
+    shards = [shard for archive_shards in pending_shards.values() for shard in archive_shards]
+    concat_files([shard.id_level_path for shard in shards], output_paths[0])
+    concat_files([shard.id_object_name_path for shard in shards], output_paths[1])
+    manifest.mark_merged(sizes)
+    remove_shards(shards)
+
+
+def unzip_archives_incremental(archives_dir_path: Path, id_level_file_path: Path, id_object_name_file_path: Path,
+                               state_dir_path: Path, max_part_size: int = ZIP_PART_MAX_SIZE, processes: int = None,
+                               pool: TaskPool = None):
+    """
+    Разбирает в шарды только новые и изменившиеся архивы и дописывает их строки в 2 csv файла.
+
+    В state_dir_path хранится archives.json - манифест обработанных архивов (путь, размер, mtime и crc
+    из центрального каталога и размеры строк архива в итоговых файлах), а также шарды до их дописывания.
+    Архив фиксируется в манифесте только когда все его части записаны, поэтому после падения
+    повторный запуск обработает лишь незафиксированные архивы. Итоговые файлы пересобираются только
+    если архив изменился или удален - копируются строки остальных архивов, без повторного разбора.
+    """
+    state_dir_path.mkdir(parents=True, exist_ok=True)
+    manifest = ArchivesManifest(state_dir_path / ARCHIVES_MANIFEST_FILE_NAME)
+    output_paths = (Path(id_level_file_path), Path(id_object_name_file_path))
+    _sync_outputs(manifest, output_paths)
+
+    archive_paths = [str(zip_file_path) for zip_file_path in dir_zip_files(archives_dir_path)]
+    changed_archives: Dict[str, Tuple[ArchiveFingerprint, List[ZipPart]]] = {}
+    for archive_path in archive_paths:
+        try:
+            fingerprint = ArchiveFingerprint.from_path(archive_path)
+            if manifest.is_committed(archive_path, fingerprint):
+                continue
+            changed_archives[archive_path] = fingerprint, split_zip_archive(archive_path, max_part_size)
+        except BadZipFile as error:
+            logger.error(f'Archive {archive_path} is skipped: {error}')
+
+    stale_archives = set(manifest.archive_paths()) - (set(archive_paths) - set(changed_archives))
+    _remove_from_outputs(manifest, [path for path in manifest.archive_paths() if path in stale_archives], output_paths)
+
+    task_executor = UnzipXmlToCsvIncrementalTask(manifest)
+    tasks = []
+    for archive_path, (fingerprint, parts) in changed_archives.items():
+        task_executor.add_archive(archive_path, fingerprint, len(parts))
+        # в имени шарда есть crc архива, чтобы шарды разных версий архива не пересекались
+        shard_prefix = f'{hashlib.sha1(archive_path.encode()).hexdigest()[:16]}_{fingerprint.crc:08x}'
+        tasks.extend(ShardTask(part, str(state_dir_path), f'{shard_prefix}_{i:06d}') for i, part in enumerate(parts))
+
+    if tasks:
+        tasks.sort(key=lambda task: task.zip_part.compress_size, reverse=True)
+        TaskRunner(task_executor, tasks, skip_errors=True, processes=processes, pool=pool).run()
+
+    _append_pending_shards(manifest, output_paths)
+
+
+def unzip_archives(archives_dir_path: Path, id_level_file_path: Path, id_object_name_file_path: Path,
+                   shards_dir_path: Path = None, merge: bool = True, max_part_size: int = ZIP_PART_MAX_SIZE,
+                   processes: int = None, pool: TaskPool = None):
+    """
+    Разбирает архивы в 2 csv файла (файлы перезаписываются).
+
+    Если задан shards_dir_path, csv пишут сами процессы пула, а основной процесс только склеивает шарды.
+    С merge=False шарды и manifest.json остаются в shards_dir_path без склейки.
+    Большие архивы делятся на задачи по max_part_size сжатых байт.
+    В режиме шардов ошибка любой задачи прерывает разбор с RuntimeError до склейки (итоговые файлы не меняются).
+    При частых вызовах стоит передавать pool, чтобы не запускать процессы заново.
+    """
+    if shards_dir_path is not None:
+        shards = unzip_archives_to_shards(archives_dir_path, shards_dir_path, max_part_size, processes, pool)
+        if merge:
+            merge_shards(shards, id_level_file_path, id_object_name_file_path)
+            remove_shards(shards)
+            (shards_dir_path / SHARDS_MANIFEST_FILE_NAME).unlink()
+        return
+
+    with (open(id_level_file_path, 'w', newline='') as id_level_file,
+          open(id_object_name_file_path, 'w', newline='') as id_object_name_file):
+
+        tasks = split_zip_archives(archives_dir_path, max_part_size)
+        tasks.sort(key=lambda zip_part: zip_part.compress_size, reverse=True)
         task_executor = UnzipXmlToCsvTask(id_level_file, id_object_name_file)
-        task_runner = TaskRunner(task_executor, tasks)
+        task_runner = TaskRunner(task_executor, tasks, processes=processes, batch_size=500, batch_timeout_sec=1,
+                                 pool=pool)
+        task_runner.run()
+
+
+def unzip_archives_to_columns(archives_dir_path: Path, columns_dir_path: Path,
+                              max_part_size: int = ZIP_PART_MAX_SIZE, processes: int = None, pool: TaskPool = None):
+    """Разбирает архивы в бинарные колонки (см. ObjColumnarWriter), дописывая их в columns_dir_path"""
+    with ObjColumnarWriter(columns_dir_path) as writer:
+        tasks = split_zip_archives(archives_dir_path, max_part_size)
+        tasks.sort(key=lambda zip_part: zip_part.compress_size, reverse=True)
+        task_runner = TaskRunner(UnzipXmlTask(writer), tasks, processes=processes, batch_size=500, batch_timeout_sec=1,
+                                 pool=pool)
         task_runner.run()
 
 
+def find_stable_archives(archives_dir_path: Path, last_seen: Dict[Path, Tuple[int, int]],
+                         processed: Dict[Path, Tuple[int, int]], stable_sec: float) -> List[Path]:
+    """
+    Возвращает новые (или изменившиеся) архивы, запись которых завершена.
+
+    Архив считается записанным, если его mtime старше stable_sec и размер и mtime не изменились с прошлой проверки,
+    поэтому впервые увиденный архив возвращается не раньше следующего вызова (mtime копии может быть старым, cp -p).
+    last_seen обновляется при каждом вызове, processed заполняет вызывающий код.
+    """
+    stable_archives = []
+    now_ns = time.time_ns()
+    current = {}
+
+    for zip_file_path in dir_zip_files(archives_dir_path):
+        try:
+            stat = zip_file_path.stat()
+        except FileNotFoundError:
+            continue
+
+        key = current[zip_file_path] = (stat.st_size, stat.st_mtime_ns)
+        if processed.get(zip_file_path) == key:
+            continue
+        if last_seen.get(zip_file_path) == key and now_ns - stat.st_mtime_ns >= stable_sec * 1e9:
+            stable_archives.append(zip_file_path)
+
+    last_seen.clear()
+    last_seen.update(current)
+    return stable_archives
+
+
+def _run_logged(task_runner: TaskRunner):
+    """Запуск TaskRunner в отдельном потоке: ошибка логируется, иначе поток завершится молча"""
+    try:
+        task_runner.run()
+    except Exception as error:
+        logger.exception(f'Archives run failed: {error}')
+
+
+def watch_archives(archives_dir_path: Path, id_level_file_path: Path, id_object_name_file_path: Path,
+                   pool: TaskPool = None, poll_interval_sec: float = 1.0, stable_sec: float = 2.0,
+                   flush_interval_sec: float = 1.0, max_part_size: int = ZIP_PART_MAX_SIZE, stop_event: Event = None):
+    """
+    Следит за директорией и дописывает в 2 csv файла объекты из появляющихся архивов, пока не установлен stop_event.
+
+    Каждые poll_interval_sec директория сканируется, дописанные архивы (см. find_stable_archives) сразу
+    отправляются в пул отдельным запуском TaskRunner, не дожидаясь предыдущих. csv файлы сбрасываются на диск
+    каждые flush_interval_sec. Строки архивов только дописываются, поэтому изменившийся после обработки архив
+    не обрабатывается повторно (иначе строки задублируются) - он пропускается с предупреждением в логе.
+    Для директорий, где архивы перезаписываются, подходит unzip_archives_incremental.
+    """
+    stop_event = stop_event or Event()
+    own_pool = pool is None
+    pool = pool or TaskPool()
+    last_seen, processed = {}, {}
+    failed = {}  # (размер, mtime) поврежденных архивов, чтобы не разбирать их повторно, пока они не изменятся
+    runs: List[Thread] = []
+
+    with (open(id_level_file_path, 'a', newline='') as id_level_file,
+          open(id_object_name_file_path, 'a', newline='') as id_object_name_file):
+        writer = LockedObjWriter(ObjCsvWriter(id_level_file, id_object_name_file))
+        next_scan_at = next_flush_at = time.monotonic()
+
+        try:
+            while not stop_event.is_set():
+                if time.monotonic() >= next_scan_at:
+                    stable_archives = find_stable_archives(archives_dir_path, last_seen, processed, stable_sec)
+                    tasks = []
+                    for zip_file_path in stable_archives:
+                        key = last_seen[zip_file_path]
+                        if zip_file_path in processed:
+                            processed[zip_file_path] = key
+                            logger.warning(f'Archive {zip_file_path} changed after processing and is skipped')
+                            continue
+                        if failed.get(zip_file_path) == key:
+                            continue
+                        try:
+                            tasks.extend(split_zip_archive(zip_file_path, max_part_size))
+                        except BadZipFile as error:
+                            # повторим, когда архив изменится (например, его перезапишут целым)
+                            failed[zip_file_path] = key
+                            logger.error(f'Archive {zip_file_path} is skipped until it changes: {error}')
+                            continue
+                        processed[zip_file_path] = key
+                        failed.pop(zip_file_path, None)
+
+                    if tasks:
+                        task_runner = TaskRunner(UnzipXmlTask(writer), tasks, skip_errors=True, pool=pool,
+                                                 batch_size=500, batch_timeout_sec=flush_interval_sec)
+                        runs.append(Thread(target=_run_logged, args=(task_runner,), daemon=True))
+                        runs[-1].start()
+                    runs = [run for run in runs if run.is_alive()]
+                    next_scan_at = time.monotonic() + poll_interval_sec
+
+                if time.monotonic() >= next_flush_at:
+                    with writer.lock:
+                        id_level_file.flush()
+                        id_object_name_file.flush()
+                    next_flush_at = time.monotonic() + flush_interval_sec
+
+                stop_event.wait(max(0.0, min(next_scan_at, next_flush_at) - time.monotonic()))
+        finally:
+            for run in runs:
+                run.join()
+            if own_pool:
+                pool.close()
+
+
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Unpacks xml objects from zip archives to csv files.')
+    parser.add_argument('--watch', action='store_true', help='Keep running and process archives as they appear')
+    args = parser.parse_args()
+
     archives_dir = Path().absolute() / 'archives'
     results_dir = Path().absolute() / 'results'
 
-    create_archives(archives_dir, archives_count=50, files_per_archive=100)
+    logging.basicConfig(level=logging.INFO)
+
+    if args.watch:
+        watch_archives(
+            archives_dir_path=archives_dir,
+            id_level_file_path=results_dir / 'id_level.csv',
+            id_object_name_file_path=results_dir / 'id_object_name.csv',
+        )
+    else:
+        create_archives(archives_dir, archives_count=50, files_per_archive=100)
 
-    unzip_archives(
-        archives_dir_path=archives_dir,
-        id_level_file_path=results_dir / 'id_level.csv',
-        id_object_name_file_path=results_dir / 'id_object_name.csv',
-    )
+        unzip_archives(
+            archives_dir_path=archives_dir,
+            id_level_file_path=results_dir / 'id_level.csv',
+            id_object_name_file_path=results_dir / 'id_object_name.csv',
+        )
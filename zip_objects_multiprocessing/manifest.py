@@ -0,0 +1,149 @@
+import os
+import json
+import zlib
+from pathlib import Path
+from zipfile import ZipFile
+from dataclasses import dataclass, asdict
+from typing import Dict, Iterable, List, Tuple
+
+from schemas import Shard
+from utils.files import FileRanges, write_json_atomic
+
+
+@dataclass
+class ArchiveFingerprint:
+    size: int
+    mtime_ns: int
+    crc: int  # crc32 от имен, размеров и crc всех файлов из центрального каталога архива
+
+    @classmethod
+    def from_path(cls, file_path: Path | str) -> 'ArchiveFingerprint':
+        stat = os.stat(file_path)
+        crc = 0
+        with ZipFile(file_path, 'r') as zf:
+            for zip_info in zf.infolist():
+                crc = zlib.crc32(f'{zip_info.filename}\0{zip_info.file_size}\0{zip_info.CRC}\0'.encode(), crc)
+
+        return cls(size=stat.st_size, mtime_ns=stat.st_mtime_ns, crc=crc)
+
+
+@dataclass
+class ArchiveEntry:
+    fingerprint: ArchiveFingerprint
+    shards: List[Shard]  # шарды, еще не дописанные в итоговые файлы
+    id_level_size: int = 0  # размер строк архива в итоговых файлах после дописывания шардов
+    id_object_name_size: int = 0
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'ArchiveEntry':
+        return cls(**{
+            **data,
+            'fingerprint': ArchiveFingerprint(**data['fingerprint']),
+            'shards': [Shard.from_dict(shard) for shard in data['shards']],
+        })
+
+    @property
+    def is_merged(self) -> bool:
+        return not self.shards
+
+
+class ArchivesManifest:
+    """
+    Список полностью обработанных архивов: их шарды до дописывания в итоговые файлы, а после - размеры их строк.
+
+    Строки архивов лежат в итоговых файлах подряд в порядке манифеста, поэтому по размерам можно найти
+    участок любого архива. Файл манифеста перезаписывается атомарно при каждом изменении,
+    поэтому после падения в нем остаются только архивы, шарды которых записаны целиком.
+    """
+
+    def __init__(self, file_path: Path | str):
+        self._file_path = Path(file_path)
+        self._archives: Dict[str, ArchiveEntry] = {}
+
+        if self._file_path.exists():
+            with open(self._file_path) as file:
+                self._archives = {path: ArchiveEntry.from_dict(entry) for path, entry in json.load(file).items()}
+
+    def archive_paths(self) -> List[str]:
+        return list(self._archives)
+
+    def is_committed(self, archive_path: Path | str, fingerprint: ArchiveFingerprint) -> bool:
+        entry = self._archives.get(str(archive_path))
+        if entry is None or entry.fingerprint != fingerprint:
+            return False
+        return all(Path(shard.id_level_path).exists() and Path(shard.id_object_name_path).exists()
+                   for shard in entry.shards)
+
+    def is_merged(self, archive_path: Path | str) -> bool:
+        """Строки архива есть в итоговых файлах"""
+        entry = self._archives.get(str(archive_path))
+        return entry is not None and entry.is_merged
+
+    def commit(self, archive_path: Path | str, fingerprint: ArchiveFingerprint, shards: List[Shard]) -> List[Shard]:
+        """
+        Фиксирует обработанный архив с шардами для дописывания, возвращает его прежние шарды,
+        которые больше не используются. Строки прежней версии архива нужно предварительно удалить (remove).
+        """
+        if self.is_merged(archive_path) and self._archives[str(archive_path)].fingerprint != fingerprint:
+            raise ValueError(f'Rows of the previous version of {archive_path} are not removed')
+
+        new_paths = {shard.id_level_path for shard in shards}
+        old_entry = self._archives.pop(str(archive_path), None)
+
+        self._archives[str(archive_path)] = ArchiveEntry(fingerprint, shards)
+        self._save()
+
+        if old_entry is None:
+            return []
+        return [shard for shard in old_entry.shards if shard.id_level_path not in new_paths]
+
+    def remove(self, archive_paths: Iterable[Path | str]) -> List[Shard]:
+        """Удаляет архивы из манифеста, возвращает их шарды"""
+        shards = []
+        for archive_path in archive_paths:
+            shards.extend(self._archives.pop(str(archive_path)).shards)
+        self._save()
+        return shards
+
+    def clear(self) -> List[Shard]:
+        """Забывает все архивы, возвращает их шарды"""
+        return self.remove(self.archive_paths())
+
+    def pending_shards(self) -> Dict[str, List[Shard]]:
+        """Шарды зафиксированных, но еще не дописанных в итоговые файлы архивов"""
+        return {path: entry.shards for path, entry in self._archives.items() if not entry.is_merged}
+
+    def mark_merged(self, sizes: Dict[str, Tuple[int, int]]) -> None:
+        """
+        Отмечает архивы дописанными в конец итоговых файлов в порядке sizes,
+        sizes - размеры строк архивов (id_level, id_object_name) в итоговых файлах
+        """
+        for archive_path, (id_level_size, id_object_name_size) in sizes.items():
+            entry = self._archives.pop(archive_path)
+            self._archives[archive_path] = ArchiveEntry(entry.fingerprint, [], id_level_size, id_object_name_size)
+        self._save()
+
+    def output_sizes(self) -> Tuple[int, int]:
+        """Ожидаемые размеры итоговых id_level и id_object_name файлов"""
+        merged = [entry for entry in self._archives.values() if entry.is_merged]
+        return sum(entry.id_level_size for entry in merged), sum(entry.id_object_name_size for entry in merged)
+
+    def output_ranges(self, archive_paths: Iterable[Path | str]) -> Tuple[FileRanges, FileRanges]:
+        """Участки (offset, size) строк архивов в итоговых id_level и id_object_name файлах в порядке файлов"""
+        selected = {str(archive_path) for archive_path in archive_paths}
+        id_level_ranges, id_object_name_ranges = [], []
+        id_level_offset = id_object_name_offset = 0
+
+        for path, entry in self._archives.items():
+            if not entry.is_merged:
+                continue
+            if path in selected:
+                id_level_ranges.append((id_level_offset, entry.id_level_size))
+                id_object_name_ranges.append((id_object_name_offset, entry.id_object_name_size))
+            id_level_offset += entry.id_level_size
+            id_object_name_offset += entry.id_object_name_size
+
+        return id_level_ranges, id_object_name_ranges
+
+    def _save(self) -> None:
+        write_json_atomic(self._file_path, {path: asdict(entry) for path, entry in self._archives.items()})
@@ -1,8 +1,68 @@
 from dataclasses import dataclass
 from typing import Dict, List
 
+from utils.zip import ZipPart
+
+
+def format_uuid(data: bytes) -> str:
+    """16 байт uuid в каноническую строку (как str(UUID(bytes=data)), но быстрее)"""
+    h = data.hex()
+    return f'{h[:8]}-{h[8:12]}-{h[12:16]}-{h[16:20]}-{h[20:]}'
+
 
 @dataclass
 class Obj:
     vars: Dict[str, str]
     objects: List[str]
+
+
+class ObjRecord:
+    """
+    Компактное представление Obj для передачи между процессами.
+
+    id и имена объектов (object_ids) хранятся как 16 байт uuid (имена - одной строкой байт подряд), level - int.
+    Остальные переменные можно сохранить в extra_vars (по умолчанию не сохраняются).
+    Свойства vars и objects повторяют интерфейс Obj.
+    """
+
+    __slots__ = ('id', 'level', 'object_ids', 'extra_vars')
+
+    def __init__(self, id: bytes, level: int, object_ids: bytes = b'', extra_vars: Dict[str, str] = None):
+        self.id = id
+        self.level = level
+        self.object_ids = object_ids
+        self.extra_vars = extra_vars
+
+    @property
+    def vars(self) -> Dict[str, str]:
+        return {'id': format_uuid(self.id), 'level': str(self.level), **(self.extra_vars or {})}
+
+    @property
+    def objects(self) -> List[str]:
+        return [format_uuid(self.object_ids[i:i + 16]) for i in range(0, len(self.object_ids), 16)]
+
+    def to_obj(self) -> Obj:
+        return Obj(self.vars, self.objects)
+
+    def __reduce__(self):
+        return self.__class__, (self.id, self.level, self.object_ids, self.extra_vars)
+
+    def __eq__(self, other):
+        if not isinstance(other, ObjRecord):
+            return NotImplemented
+        return self.__reduce__() == other.__reduce__()
+
+    def __repr__(self):
+        return f'ObjRecord(vars={self.vars!r}, objects={self.objects!r})'
+
+
+@dataclass
+class Shard:
+    zip_part: ZipPart
+    id_level_path: str
+    id_object_name_path: str
+    objects_count: int
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'Shard':
+        return cls(**{**data, 'zip_part': ZipPart(**data['zip_part'])})
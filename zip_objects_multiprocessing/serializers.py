@@ -1,7 +1,10 @@
+import re
 from abc import ABC, abstractmethod
 import xml.etree.ElementTree as XmlElementTree
 
-from schemas import Obj
+from typing import Dict, List
+
+from schemas import Obj, ObjRecord
 
 
 class ObjSerializer(ABC):
@@ -40,3 +43,108 @@ class ObjXmlSerializer(ObjSerializer):
                 objects.append(obj_tag.get('name'))
 
         return Obj(vars_, objects)
+
+
+class ObjXmlFastSerializer(ObjXmlSerializer):
+    """
+    Сериализатор и десериализатор без построения ElementTree.
+
+    Разбирает регулярными выражениями документ ровно той формы, которую выдает ObjXmlSerializer.serialize:
+    <root><var name="..." value="..." />...<objects><object name="..." />...</objects></root>
+    Любой другой документ (xml-декларация, пробелы между тэгами, сущности вроде &amp; и.т.д)
+    разбирается обычным ObjXmlSerializer.deserialize, поэтому результат всегда совпадает.
+    Так же и serialize: значения, которые нужно экранировать, передаются в ObjXmlSerializer.serialize.
+    """
+
+    # значение атрибута, которое не нужно разбирать парсером: символы XML Char, кроме ", &, < и \t\n\r
+    # (их парсер нормализует), остальное (в том числе недопустимые в XML символы) - в ObjXmlSerializer.deserialize
+    _attr_value_pattern = r'[^"&<\x00-\x1f\ud800-\udfff\ufffe\uffff]*'
+    _document_re = re.compile(
+        rf'<root>((?:<var name="{_attr_value_pattern}" value="{_attr_value_pattern}" />)*)'
+        rf'(?:<objects>((?:<object name="{_attr_value_pattern}" />)*)</objects>|<objects />)</root>'
+    )
+    _uuid_pattern = '[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}'
+    _uuid_re = re.compile(_uuid_pattern)
+    _level_re = re.compile(r'0|[1-9][0-9]*')
+    _record_re = re.compile(
+        rf'<root><var name="id" value="({_uuid_pattern})" /><var name="level" value="(0|[1-9][0-9]*)" />'
+        rf'(?:<objects>((?:<object name="{_uuid_pattern}" />)*)</objects>|<objects />)</root>'
+    )
+    _escape_re = re.compile(r'[&<>"\n\r\t]')
+    _var_re = re.compile(r'<var name="([^"]*)" value="([^"]*)" />')
+    _object_re = re.compile(r'<object name="([^"]*)" />')
+
+    def serialize(self, obj: Obj) -> str:
+        values = [*obj.vars.keys(), *obj.vars.values(), *obj.objects]
+        if any(self._escape_re.search(value) for value in values):
+            return super().serialize(obj)
+
+        vars_xml = ''.join([f'<var name="{name}" value="{value}" />' for name, value in obj.vars.items()])
+        if not obj.objects:
+            return f'<root>{vars_xml}<objects /></root>'
+
+        objects_xml = ''.join([f'<object name="{name}" />' for name in obj.objects])
+        return f'<root>{vars_xml}<objects>{objects_xml}</objects></root>'
+
+    def deserialize(self, obj_xml: bytes | str) -> Obj:
+        try:
+            text = obj_xml if isinstance(obj_xml, str) else str(obj_xml, 'utf-8')
+        except UnicodeDecodeError:
+            return super().deserialize(obj_xml)
+
+        match = self._document_re.fullmatch(text)
+        if match is None:
+            return super().deserialize(obj_xml)
+
+        vars_xml, objects_xml = match.groups()
+        vars_ = dict(self._var_re.findall(vars_xml))
+        objects = self._object_re.findall(objects_xml) if objects_xml else []
+
+        return Obj(vars_, objects)
+
+    def deserialize_record(self, obj_xml: bytes | str, keep_vars: bool = False) -> ObjRecord | Obj:
+        """
+        Разбирает документ сразу в компактный ObjRecord.
+
+        Если id или имена объектов не uuid в каноническом виде, или level не целое число,
+        возвращается обычный Obj, чтобы не потерять данные. С keep_vars остальные переменные попадают в extra_vars.
+        """
+        try:
+            text = obj_xml if isinstance(obj_xml, str) else str(obj_xml, 'utf-8')
+        except UnicodeDecodeError:
+            text = None
+
+        # документ из id, level и uuid-объектов (самый частый случай) разбирается одним выражением
+        match = self._record_re.fullmatch(text) if text is not None else None
+        if match is not None:
+            obj_id, level, objects_xml = match.groups()
+            object_ids = ''
+            if objects_xml:
+                object_ids = objects_xml.replace('<object name="', '').replace('" />', '').replace('-', '')
+
+            return ObjRecord(
+                id=bytes.fromhex(obj_id.replace('-', '')),
+                level=int(level),
+                object_ids=bytes.fromhex(object_ids),
+            )
+
+        obj = self.deserialize(obj_xml)
+        if not all(self._uuid_re.fullmatch(name) for name in obj.objects):
+            return obj
+        return self._to_record(obj.vars, obj.objects, keep_vars)
+
+    def _to_record(self, vars_: Dict[str, str], objects: List[str], keep_vars: bool) -> ObjRecord | Obj:
+        obj_id, level = vars_.get('id'), vars_.get('level')
+        if obj_id is None or level is None or not self._uuid_re.fullmatch(obj_id) or not self._level_re.fullmatch(level):
+            return Obj(vars_, objects)
+
+        extra_vars = None
+        if keep_vars:
+            extra_vars = {name: value for name, value in vars_.items() if name not in ('id', 'level')} or None
+
+        return ObjRecord(
+            id=bytes.fromhex(obj_id.replace('-', '')),
+            level=int(level),
+            object_ids=bytes.fromhex(''.join(objects).replace('-', '')),
+            extra_vars=extra_vars,
+        )
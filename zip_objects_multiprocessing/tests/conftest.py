@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# модули проекта импортируются от корня zip_objects_multiprocessing (как при запуске main.py)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
@@ -0,0 +1,3 @@
+def read_lines(file_path):
+    with open(file_path) as file:
+        return file.read().splitlines()
@@ -0,0 +1,64 @@
+import os
+from zipfile import ZipFile
+
+from main import unzip_archives_incremental, ARCHIVES_MANIFEST_FILE_NAME
+from manifest import ArchivesManifest
+from generate_data import create_archive, create_archives
+from helpers import read_lines
+
+
+def unzip(tmp_path):
+    unzip_archives_incremental(tmp_path / 'archives', tmp_path / 'id_level.csv', tmp_path / 'id_object_name.csv',
+                               tmp_path / 'state', processes=2)
+    return sorted(read_lines(tmp_path / 'id_level.csv'))
+
+
+def test_incremental_appends_rebuilds_and_removes(tmp_path):
+    archives_dir = tmp_path / 'archives'
+    archives_dir.mkdir()
+    create_archives(archives_dir, archives_count=2, files_per_archive=5, seed=1)
+
+    first_rows = unzip(tmp_path)
+    assert len(first_rows) == 10
+    assert unzip(tmp_path) == first_rows  # повторный запуск не дублирует строки
+
+    # шарды удаляются после дописывания
+    assert os.listdir(tmp_path / 'state') == [ARCHIVES_MANIFEST_FILE_NAME]
+
+    # новый архив дописывается в конец, строки прежних архивов не переписываются
+    id_level_before = (tmp_path / 'id_level.csv').read_bytes()
+    create_archive(archives_dir / 'new.zip', 3, seed='new', objects_per_file=1, extra_vars_per_file=0)
+    assert len(unzip(tmp_path)) == 13
+    assert (tmp_path / 'id_level.csv').read_bytes().startswith(id_level_before)
+
+    # изменившийся архив пересобирается
+    create_archive(archives_dir / 'xml_objects_1.zip', 2, seed='changed', objects_per_file=1, extra_vars_per_file=0)
+    assert len(unzip(tmp_path)) == 10
+
+    # удаленный архив убирается из итоговых файлов
+    os.remove(archives_dir / 'new.zip')
+    assert len(unzip(tmp_path)) == 7
+
+
+def test_incremental_truncates_rows_appended_before_crash(tmp_path):
+    archives_dir = tmp_path / 'archives'
+    archives_dir.mkdir()
+    create_archives(archives_dir, archives_count=2, files_per_archive=5, seed=1)
+    rows = unzip(tmp_path)
+
+    with open(tmp_path / 'id_level.csv', 'a') as file:
+        file.write('partial,row\n')
+    assert unzip(tmp_path) == rows
+
+
+def test_incremental_skips_failed_archive_and_removes_its_shards(tmp_path):
+    archives_dir = tmp_path / 'archives'
+    archives_dir.mkdir()
+    create_archives(archives_dir, archives_count=1, files_per_archive=5, seed=1)
+    with ZipFile(archives_dir / 'broken.zip', 'w') as zf:
+        zf.writestr('broken.xml', 'not xml')
+
+    assert len(unzip(tmp_path)) == 5
+    manifest = ArchivesManifest(tmp_path / 'state' / ARCHIVES_MANIFEST_FILE_NAME)
+    assert manifest.archive_paths() == [str(archives_dir / 'xml_objects_1.zip')]
+    assert os.listdir(tmp_path / 'state') == [ARCHIVES_MANIFEST_FILE_NAME]
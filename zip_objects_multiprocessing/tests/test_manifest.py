@@ -0,0 +1,55 @@
+from manifest import ArchiveFingerprint, ArchivesManifest
+from schemas import Shard
+from utils.zip import ZipPart
+
+
+def make_shard(tmp_path, name):
+    id_level_path, id_object_name_path = tmp_path / f'{name}.id_level.csv', tmp_path / f'{name}.id_object_name.csv'
+    id_level_path.write_text('id,1\n')
+    id_object_name_path.write_text('id,name\n')
+    return Shard(ZipPart(f'{name}.zip', 0, 1, 1), str(id_level_path), str(id_object_name_path), 1)
+
+
+def test_commit_remove_and_persist(tmp_path):
+    fingerprint = ArchiveFingerprint(size=1, mtime_ns=1, crc=1)
+    manifest = ArchivesManifest(tmp_path / 'archives.json')
+    shard = make_shard(tmp_path, 'a')
+
+    assert manifest.commit('a.zip', fingerprint, [shard]) == []
+    assert manifest.is_committed('a.zip', fingerprint)
+    assert not manifest.is_committed('a.zip', ArchiveFingerprint(size=2, mtime_ns=1, crc=1))
+    assert not manifest.is_merged('a.zip')
+
+    # манифест читается из файла
+    manifest = ArchivesManifest(tmp_path / 'archives.json')
+    assert manifest.pending_shards() == {'a.zip': [shard]}
+
+    # повторная фиксация возвращает прежние шарды, которые больше не нужны
+    new_shard = make_shard(tmp_path, 'a2')
+    assert manifest.commit('a.zip', fingerprint, [new_shard]) == [shard]
+    assert manifest.remove(['a.zip']) == [new_shard]
+    assert manifest.archive_paths() == []
+
+
+def test_committed_archive_with_missing_shards_is_not_committed(tmp_path):
+    fingerprint = ArchiveFingerprint(size=1, mtime_ns=1, crc=1)
+    manifest = ArchivesManifest(tmp_path / 'archives.json')
+    shard = make_shard(tmp_path, 'a')
+    manifest.commit('a.zip', fingerprint, [shard])
+
+    (tmp_path / 'a.id_level.csv').unlink()
+    assert not manifest.is_committed('a.zip', fingerprint)
+
+
+def test_merged_archives_output_ranges(tmp_path):
+    fingerprint = ArchiveFingerprint(size=1, mtime_ns=1, crc=1)
+    manifest = ArchivesManifest(tmp_path / 'archives.json')
+    for name in ('a', 'b', 'c'):
+        manifest.commit(f'{name}.zip', fingerprint, [make_shard(tmp_path, name)])
+
+    manifest.mark_merged({'b.zip': (10, 100), 'a.zip': (20, 200)})
+    assert manifest.is_merged('a.zip') and not manifest.is_merged('c.zip')
+    assert manifest.output_sizes() == (30, 300)
+    # строки лежат в порядке дописывания
+    assert manifest.output_ranges(['a.zip']) == ([(10, 20)], [(100, 200)])
+    assert manifest.output_ranges(['a.zip', 'b.zip', 'c.zip']) == ([(0, 10), (10, 20)], [(0, 100), (100, 200)])
@@ -0,0 +1,58 @@
+import io
+import pickle
+from random import Random
+
+from generate_data import generate_obj
+from schemas import Obj, ObjRecord
+from serializers import ObjXmlSerializer, ObjXmlFastSerializer
+from writers import ObjCsvWriter, ObjColumnarWriter, ObjColumnarReader
+
+
+def generate_objs(count: int, seed: int = 0, **kwargs) -> list:
+    rng = Random(seed)
+    return [generate_obj(rng, **kwargs) for _ in range(count)]
+
+
+def test_obj_record_is_slotted_and_pickles():
+    record = ObjXmlFastSerializer().deserialize_record(ObjXmlSerializer().serialize(generate_objs(1)[0]))
+    record_with_vars = ObjRecord(record.id, record.level, record.object_ids, extra_vars={'a': 'b'})
+
+    assert not hasattr(record, '__dict__')
+    for value in (record, record_with_vars, ObjRecord(record.id, 0)):
+        restored = pickle.loads(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+        assert restored == value
+        assert restored.to_obj() == value.to_obj()
+    assert record_with_vars.vars == {**record.vars, 'a': 'b'}
+
+
+def test_deserialize_record_matches_obj():
+    serializer = ObjXmlFastSerializer()
+    for obj in generate_objs(50, objects_per_file=(0, 5), extra_vars_per_file=(0, 2)):
+        document = serializer.serialize(obj)
+        record = serializer.deserialize_record(document, keep_vars=True)
+
+        assert isinstance(record, ObjRecord)
+        assert record.to_obj() == serializer.deserialize(document)
+
+
+def test_deserialize_record_keeps_non_uuid_obj():
+    obj = Obj(vars={'id': 'not-uuid', 'level': '1'}, objects=[])
+    assert ObjXmlFastSerializer().deserialize_record(ObjXmlSerializer().serialize(obj)) == obj
+
+
+def test_records_and_objs_written_identically(tmp_path):
+    objs = generate_objs(30, objects_per_file=(0, 5))
+    serializer = ObjXmlFastSerializer()
+    records = [serializer.deserialize_record(serializer.serialize(obj)) for obj in objs]
+
+    outputs = []
+    for items in (objs, records):
+        id_level_file, id_object_name_file = io.StringIO(), io.StringIO()
+        ObjCsvWriter(id_level_file, id_object_name_file).write(items)
+        outputs.append((id_level_file.getvalue(), id_object_name_file.getvalue()))
+    assert outputs[0] == outputs[1]
+
+    with ObjColumnarWriter(tmp_path) as writer:
+        writer.write(records)
+    with ObjColumnarReader(tmp_path) as reader:
+        assert [reader.obj(i) for i in range(len(reader))] == objs
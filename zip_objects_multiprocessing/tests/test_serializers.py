@@ -0,0 +1,63 @@
+from random import Random
+from xml.etree.ElementTree import ParseError
+
+import pytest
+
+from generate_data import generate_obj
+from schemas import Obj
+from serializers import ObjXmlSerializer, ObjXmlFastSerializer
+
+UUID = 'c9e50e58-a29d-4033-8df4-9f1d300f38bb'
+
+DOCUMENTS = [
+    f'<root><var name="id" value="{UUID}" /><var name="level" value="7" /><objects /></root>',
+    f'<root><var name="id" value="{UUID}" /><objects><object name="{UUID}" /><object name="x y" /></objects></root>',
+    '<root><objects /></root>',
+    '<root><var name="a" value="&amp;&lt;&quot;&#x41;" /><objects /></root>',
+    '<root><var name="a" value="\u00e9\U0001f600" /><objects /></root>',
+    "<root><var name='a' value='single' /><objects /></root>",
+    '<root><var value="b" name="a" /><objects /></root>',
+    '<root><var name="a" value="b"/><objects/></root>',
+    '<root>\n  <var name="a" value="b" />\n  <objects />\n</root>',
+    '<?xml version="1.0"?><root><var name="a" value="b" /><objects /></root>',
+    '<root><!-- comment --><var name="a" value="b" /><objects /></root>',
+    '<root><var name="a" value="b" /><objects><![CDATA[text]]></objects></root>',
+    '<root><var name="a" value="tab\there" /><objects /></root>',
+    '<root><var name="a" value="b" /></root>',
+]
+
+INVALID_DOCUMENTS = [
+    '<root><var name="a" value="\ufffe" /><objects /></root>',
+    '<root><var name="a" value="\uffff" /><objects /></root>',
+    '<root><var name="a" value="\x01" /><objects /></root>',
+    '<root><objects><object name="\ufffe" /></objects></root>',
+]
+
+
+@pytest.mark.parametrize('document', DOCUMENTS)
+def test_fast_deserialize_matches_generic(document):
+    expected = ObjXmlSerializer().deserialize(document)
+    assert ObjXmlFastSerializer().deserialize(document) == expected
+    assert ObjXmlFastSerializer().deserialize(document.encode('utf-8')) == expected
+
+
+@pytest.mark.parametrize('document', INVALID_DOCUMENTS)
+def test_fast_deserialize_rejects_invalid_characters(document):
+    with pytest.raises(ParseError):
+        ObjXmlSerializer().deserialize(document)
+    with pytest.raises(ParseError):
+        ObjXmlFastSerializer().deserialize(document)
+    with pytest.raises(ParseError):
+        ObjXmlFastSerializer().deserialize_record(document)
+
+
+def test_fast_serialize_matches_generic():
+    rng = Random(0)
+    objs = [generate_obj(rng) for _ in range(50)] + [
+        Obj(vars={'a': 'x & "y" <z>', 'b': 'line\nbreak'}, objects=['tab\tname']),
+        Obj(vars={}, objects=[]),
+    ]
+    for obj in objs:
+        document = ObjXmlFastSerializer().serialize(obj)
+        assert document == ObjXmlSerializer().serialize(obj)
+        assert ObjXmlFastSerializer().deserialize(document) == ObjXmlSerializer().deserialize(document)
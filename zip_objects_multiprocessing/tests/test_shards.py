@@ -0,0 +1,36 @@
+from zipfile import ZipFile
+
+import pytest
+
+from main import unzip_archives, unzip_archives_to_shards, SHARDS_MANIFEST_FILE_NAME
+from generate_data import create_archives
+from utils.tasks import TaskPool
+from helpers import read_lines
+
+
+def test_unzip_archives_merges_shards(tmp_path):
+    archives_dir = tmp_path / 'archives'
+    archives_dir.mkdir()
+    create_archives(archives_dir, archives_count=3, files_per_archive=5, seed=1)
+
+    unzip_archives(archives_dir, tmp_path / 'id_level.csv', tmp_path / 'id_object_name.csv',
+                   shards_dir_path=tmp_path / 'shards', processes=2)
+
+    assert len(read_lines(tmp_path / 'id_level.csv')) == 15
+    assert list((tmp_path / 'shards').iterdir()) == []
+
+
+@pytest.mark.parametrize('shared_pool', [False, True])
+def test_unzip_archives_to_shards_raises_and_removes_shards_on_error(tmp_path, shared_pool):
+    archives_dir = tmp_path / 'archives'
+    archives_dir.mkdir()
+    create_archives(archives_dir, archives_count=3, files_per_archive=5, seed=1)
+    with ZipFile(archives_dir / 'broken.zip', 'w') as zf:
+        zf.writestr('broken.xml', 'not xml')
+
+    shards_dir = tmp_path / 'shards'
+    with TaskPool(processes=2) as pool, pytest.raises(RuntimeError, match='broken.zip'):
+        unzip_archives_to_shards(archives_dir, shards_dir, processes=2, pool=pool if shared_pool else None)
+
+    assert list(shards_dir.iterdir()) == []
+    assert not (shards_dir / SHARDS_MANIFEST_FILE_NAME).exists()
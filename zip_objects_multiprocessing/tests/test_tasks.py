@@ -0,0 +1,115 @@
+import time
+import queue as thread_queue
+
+from utils.tasks import TaskExecutor, TaskPool, TaskRunner, TaskResult, BatchQueue
+
+
+class CountTask(TaskExecutor):
+    def __init__(self):
+        self.messages = []
+
+    @classmethod
+    def run(cls, queue: BatchQueue, count: int):
+        for i in range(count):
+            queue.put(i)
+        return count
+
+    def on_progress(self, message):
+        self.messages.append(message)
+
+
+def test_task_runner_collects_messages_and_results():
+    task_executor = CountTask()
+    results = TaskRunner(task_executor, [3, 5], processes=2, batch_size=2).run()
+
+    assert sorted(result.result for result in results) == [3, 5]
+    assert sorted(task_executor.messages) == sorted(list(range(3)) + list(range(5)))
+
+
+def test_slow_run_does_not_block_other_runs():
+    with TaskPool(processes=2, queue_maxsize=2) as pool:
+        # очередь этого запуска никто не читает
+        slow_run_id, _ = pool.open_run()
+        pool.submit(slow_run_id, CountTask(), 100)
+
+        run_id, messages = pool.open_run()
+        pool.submit(run_id, CountTask(), 10)
+
+        deadline = time.monotonic() + 10
+        received = []
+        while not received or type(received[-1]) != TaskResult:
+            received.append(messages.get(timeout=max(0.0, deadline - time.monotonic())))
+
+        assert received[-1].result == 10
+        assert sum(len(message.messages) for message in received[1:-1]) == 10
+
+
+def collect_batches(queue: thread_queue.Queue) -> list:
+    batches = []
+    while not queue.empty():
+        batches.append(queue.get_nowait().messages)
+    return batches
+
+
+def test_batch_queue_sends_full_batches_and_rest_on_close():
+    queue = thread_queue.Queue()
+    batch_queue = BatchQueue(queue, batch_size=3)
+    for i in range(7):
+        batch_queue.put(i)
+
+    assert collect_batches(queue) == [[0, 1, 2], [3, 4, 5]]
+    batch_queue.close()
+    assert collect_batches(queue) == [[6]]
+    assert batch_queue.items_count == 7
+
+
+def test_batch_queue_flushes_expired_batch_without_next_put():
+    queue = thread_queue.Queue()
+    batch_queue = BatchQueue(queue, batch_size=100, batch_timeout_sec=0.05)
+    batch_queue.put(1)
+    batch_queue.put(2)
+
+    # сообщения больше не поступают, пачку отправляет фоновый поток
+    assert queue.get(timeout=2).messages == [1, 2]
+    batch_queue.put(3)
+    assert queue.get(timeout=2).messages == [3]
+
+    batch_queue.close()
+    assert queue.empty()
+
+
+def test_slow_run_blocks_its_producers():
+    with TaskPool(processes=1, queue_maxsize=3) as pool:
+        run_id, messages = pool.open_run()
+        pool.submit(run_id, CountTask(), 100)
+
+        # сообщения никто не забирает: задача отправила TaskStarted и 2 пачки и ждет кредит
+        time.sleep(0.5)
+        assert messages.qsize() == 3
+        assert pool.queue_depth() in (0, None)
+
+        received = [messages.get(timeout=5) for _ in range(3)]
+        time.sleep(0.2)
+        assert messages.qsize() == 3
+
+        while type(received[-1]) != TaskResult:
+            received.append(messages.get(timeout=5))
+        assert received[-1].result == 100
+        assert sum(len(message.messages) for message in received[1:-1]) == 100
+        # задача ждала, пока запуск заберет сообщения, а не отправила все сразу
+        assert received[-1].wall_time_sec >= 0.5
+
+
+def test_closed_run_returns_credits():
+    with TaskPool(processes=1, queue_maxsize=2, max_runs=1) as pool:
+        run_id, _ = pool.open_run()
+        pool.submit(run_id, CountTask(), 50)
+        time.sleep(0.2)
+        pool.close_run(run_id)
+
+        # слот и кредиты закрытого запуска достаются следующему
+        run_id, messages = pool.open_run()
+        pool.submit(run_id, CountTask(), 5)
+        received = []
+        while not received or type(received[-1]) != TaskResult or received[-1].result != 5:
+            received.append(messages.get(timeout=10))
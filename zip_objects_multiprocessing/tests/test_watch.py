@@ -0,0 +1,107 @@
+import os
+import time
+from pathlib import Path
+from threading import Event, Thread
+
+from main import find_stable_archives, watch_archives
+from generate_data import create_archive
+
+
+def set_mtime(file_path: Path, seconds_ago: float):
+    timestamp = time.time() - seconds_ago
+    os.utime(file_path, (timestamp, timestamp))
+
+
+def test_find_stable_archives_waits_for_second_scan(tmp_path):
+    archive_path = tmp_path / 'a.zip'
+    create_archive(archive_path, 1, seed='a', objects_per_file=1, extra_vars_per_file=0)
+    set_mtime(archive_path, 60)  # копия со старым mtime (cp -p)
+    last_seen, processed = {}, {}
+
+    assert find_stable_archives(tmp_path, last_seen, processed, stable_sec=1) == []
+    assert find_stable_archives(tmp_path, last_seen, processed, stable_sec=1) == [archive_path]
+
+    processed[archive_path] = last_seen[archive_path]
+    assert find_stable_archives(tmp_path, last_seen, processed, stable_sec=1) == []
+
+
+def test_find_stable_archives_skips_growing_and_fresh_archives(tmp_path):
+    archive_path = tmp_path / 'a.zip'
+    create_archive(archive_path, 1, seed='a', objects_per_file=1, extra_vars_per_file=0)
+    last_seen = {}
+
+    # mtime свежее stable_sec
+    find_stable_archives(tmp_path, last_seen, {}, stable_sec=60)
+    assert find_stable_archives(tmp_path, last_seen, {}, stable_sec=60) == []
+
+    # размер изменился между проверками
+    set_mtime(archive_path, 60)
+    find_stable_archives(tmp_path, last_seen, {}, stable_sec=1)
+    with open(archive_path, 'ab') as file:
+        file.write(b'\0')
+    set_mtime(archive_path, 60)
+    assert find_stable_archives(tmp_path, last_seen, {}, stable_sec=1) == []
+    assert find_stable_archives(tmp_path, last_seen, {}, stable_sec=1) == [archive_path]
+
+
+def count_lines(file_path: Path) -> int:
+    return len(file_path.read_text().splitlines()) if file_path.exists() else 0
+
+
+def test_watch_archives_skips_rewritten_archive(tmp_path):
+    archives_dir = tmp_path / 'archives'
+    archives_dir.mkdir()
+    archive_path = archives_dir / 'a.zip'
+    create_archive(archive_path, 3, seed='a', objects_per_file=1, extra_vars_per_file=0)
+    set_mtime(archive_path, 60)
+
+    stop_event = Event()
+    watcher = Thread(target=watch_archives, kwargs=dict(
+        archives_dir_path=archives_dir, id_level_file_path=tmp_path / 'id_level.csv',
+        id_object_name_file_path=tmp_path / 'id_object_name.csv', poll_interval_sec=0.05, stable_sec=0,
+        flush_interval_sec=0.05, stop_event=stop_event,
+    ))
+    watcher.start()
+    try:
+        deadline = time.monotonic() + 10
+        while time.monotonic() < deadline and count_lines(tmp_path / 'id_level.csv') < 3:
+            time.sleep(0.05)
+
+        create_archive(archive_path, 5, seed='b', objects_per_file=1, extra_vars_per_file=0)
+        set_mtime(archive_path, 30)
+        time.sleep(0.5)
+    finally:
+        stop_event.set()
+        watcher.join()
+
+    assert count_lines(tmp_path / 'id_level.csv') == 3
+
+
+def test_watch_archives_retries_broken_archive_after_it_changes(tmp_path):
+    archives_dir = tmp_path / 'archives'
+    archives_dir.mkdir()
+    archive_path = archives_dir / 'a.zip'
+    archive_path.write_bytes(b'not a zip yet')
+    set_mtime(archive_path, 60)
+
+    stop_event = Event()
+    watcher = Thread(target=watch_archives, kwargs=dict(
+        archives_dir_path=archives_dir, id_level_file_path=tmp_path / 'id_level.csv',
+        id_object_name_file_path=tmp_path / 'id_object_name.csv', poll_interval_sec=0.05, stable_sec=0,
+        flush_interval_sec=0.05, stop_event=stop_event,
+    ))
+    watcher.start()
+    try:
+        time.sleep(0.3)
+        # поврежденный архив перезаписан целым
+        create_archive(archive_path, 3, seed='a', objects_per_file=1, extra_vars_per_file=0)
+        set_mtime(archive_path, 30)
+
+        deadline = time.monotonic() + 10
+        while time.monotonic() < deadline and count_lines(tmp_path / 'id_level.csv') < 3:
+            time.sleep(0.05)
+    finally:
+        stop_event.set()
+        watcher.join()
+
+    assert count_lines(tmp_path / 'id_level.csv') == 3
@@ -0,0 +1,41 @@
+from random import Random
+
+import pytest
+
+from generate_data import generate_obj
+from schemas import Obj
+from serializers import ObjXmlFastSerializer
+from writers import ObjColumnarWriter, ObjColumnarReader
+
+
+def test_columnar_round_trip_with_append(tmp_path):
+    rng = Random(1)
+    objs = [generate_obj(rng, objects_per_file=(0, 5)) for _ in range(20)]
+    serializer = ObjXmlFastSerializer()
+
+    with ObjColumnarWriter(tmp_path) as writer:
+        writer.write(objs[:10])
+    # вторая половина дописывается в уже существующие колонки, в том числе компактными ObjRecord
+    with ObjColumnarWriter(tmp_path) as writer:
+        writer.write([serializer.deserialize_record(serializer.serialize(obj)) for obj in objs[10:]])
+
+    with ObjColumnarReader(tmp_path) as reader:
+        assert len(reader) == 20
+        assert [reader.obj(i) for i in range(len(reader))] == objs
+
+
+def test_columnar_rejects_batch_with_large_level(tmp_path):
+    rng = Random(1)
+    valid_obj = generate_obj(rng)
+    invalid_obj = Obj(vars={**generate_obj(rng).vars, 'level': '70000'}, objects=[])
+
+    with ObjColumnarWriter(tmp_path) as writer:
+        writer.write([valid_obj])
+        with pytest.raises(ValueError):
+            writer.write([valid_obj, invalid_obj])
+        writer.write([valid_obj])
+
+    with ObjColumnarReader(tmp_path) as reader:
+        assert len(reader) == 2
+        assert list(reader.offsets) == [0, len(valid_obj.objects), 2 * len(valid_obj.objects)]
+        assert reader.obj(1) == valid_obj
@@ -0,0 +1,121 @@
+import os
+from zipfile import ZipFile, ZIP_DEFLATED, ZIP_LZMA, ZIP_STORED
+
+import pytest
+
+from utils.zip import (compress_member, create_zip_archive, read_zip_archive_mmap, read_zip_entries, split_zip_archive,
+                       read_zip_part, ZipPart)
+
+# 6 символов, но 12 байт в utf-8
+FILES = [('short.xml', 'абвгде'), ('long.xml', 'x' * 1000), ('bytes.xml', b'y' * 11)]
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_create_zip_archive_stores_small_members_by_bytes(tmp_path, workers):
+    archive_path = tmp_path / 'a.zip'
+    create_zip_archive(archive_path, FILES, stored_max_size=11, workers=workers, chunk_size=1)
+
+    with ZipFile(archive_path) as zf:
+        assert [zip_info.compress_type for zip_info in zf.infolist()] == [ZIP_DEFLATED, ZIP_DEFLATED, ZIP_STORED]
+        assert zf.read('short.xml').decode() == 'абвгде'
+    assert [content for _, content in read_zip_archive_mmap(archive_path)] == [
+        'абвгде'.encode(), b'x' * 1000, b'y' * 11,
+    ]
+
+
+def test_split_zip_archive_covers_all_files(tmp_path):
+    archive_path = tmp_path / 'a.zip'
+    create_zip_archive(archive_path, [(f'{i}.xml', f'<root>{i}</root>' * 100) for i in range(10)])
+
+    parts = split_zip_archive(archive_path, max_part_size=100)
+    assert len(parts) > 1
+    assert [name for part in parts for name, _ in read_zip_part(part)] == [f'{i}.xml' for i in range(10)]
+
+
+def test_compress_member_rejects_unsupported_compression():
+    with pytest.raises(ValueError):
+        compress_member('a.xml', b'data', ZIP_LZMA, None, stored_max_size=0)
+
+
+def test_split_zip_archive_respects_max_part_size(tmp_path):
+    archive_path = tmp_path / 'a.zip'
+    sizes = [100, 300, 50, 50, 1000, 10]
+    create_zip_archive(archive_path, [(f'{i}.bin', os.urandom(size)) for i, size in enumerate(sizes)],
+                       compression=ZIP_STORED)
+
+    parts = split_zip_archive(archive_path, max_part_size=400)
+
+    # части идут подряд, файл больше max_part_size занимает отдельную часть
+    assert [(part.start, part.stop) for part in parts] == [(0, 2), (2, 4), (4, 5), (5, 6)]
+    assert [part.compress_size for part in parts] == [400, 100, 1000, 10]
+    assert split_zip_archive(archive_path, max_part_size=10 ** 9) == [ZipPart(str(archive_path), 0, 6, sum(sizes))]
+
+
+def test_split_empty_zip_archive(tmp_path):
+    archive_path = tmp_path / 'empty.zip'
+    ZipFile(archive_path, 'w').close()
+
+    assert split_zip_archive(archive_path, max_part_size=100) == []
+
+
+def zipfile_contents(archive_path) -> list:
+    with ZipFile(archive_path) as zf:
+        return [(zip_info.filename, zf.read(zip_info)) for zip_info in zf.infolist()]
+
+
+def mmap_contents(archive_path) -> list:
+    return [(name, bytes(content)) for name, content in read_zip_archive_mmap(archive_path)]
+
+
+def write_zipfile(archive_path, files, compression=ZIP_DEFLATED, comment=b''):
+    with ZipFile(archive_path, 'w', compression=compression) as zf:
+        zf.comment = comment
+        for name, content in files:
+            zf.writestr(name, content)
+
+
+@pytest.mark.parametrize('compression', [ZIP_STORED, ZIP_DEFLATED])
+def test_mmap_reader_matches_zipfile(tmp_path, compression):
+    archive_path = tmp_path / 'a.zip'
+    files = [('a.xml', b'<root />' * 100), ('empty.xml', b''), ('dir/файл.xml', os.urandom(3000))]
+    write_zipfile(archive_path, files, compression, comment=b'comment')
+
+    assert mmap_contents(archive_path) == zipfile_contents(archive_path) == files
+    assert [entry.filename for entry in read_zip_entries(archive_path)] == [name for name, _ in files]
+
+
+def test_mmap_reader_matches_zipfile_with_prefix(tmp_path):
+    # данные перед архивом, как у самораспаковывающихся архивов
+    write_zipfile(tmp_path / 'a.zip', [('a.xml', b'data' * 50), ('b.xml', b'x')])
+    archive_path = tmp_path / 'sfx.zip'
+    archive_path.write_bytes(b'#!stub\n' * 10 + (tmp_path / 'a.zip').read_bytes())
+
+    assert mmap_contents(archive_path) == zipfile_contents(archive_path)
+
+
+def test_mmap_reader_empty_archive(tmp_path):
+    archive_path = tmp_path / 'empty.zip'
+    write_zipfile(archive_path, [])
+
+    assert mmap_contents(archive_path) == zipfile_contents(archive_path) == []
+
+
+def test_mmap_reader_zip64_archive(tmp_path):
+    # больше 65535 файлов - архив с zip64 end of central directory
+    archive_path = tmp_path / 'zip64.zip'
+    write_zipfile(archive_path, [(f'{i}.xml', str(i)) for i in range(0x10000)], ZIP_STORED)
+
+    contents = mmap_contents(archive_path)
+    assert len(contents) == 0x10000
+    assert contents == zipfile_contents(archive_path)
+    assert list(read_zip_archive_mmap(archive_path, 0x10000 - 1)) == [(f'{0x10000 - 1}.xml', b'65535')]
+
+
+def test_mmap_reader_zip64_local_headers(tmp_path):
+    archive_path = tmp_path / 'a.zip'
+    with ZipFile(archive_path, 'w', compression=ZIP_DEFLATED) as zf:
+        for name, content in [('a.xml', b'a' * 1000), ('b.xml', b'b')]:
+            with zf.open(name, 'w', force_zip64=True) as file:
+                file.write(content)
+
+    assert mmap_contents(archive_path) == zipfile_contents(archive_path)
@@ -0,0 +1,38 @@
+import os
+import json
+import shutil
+from pathlib import Path
+from typing import Iterable, Any, List, Tuple
+
+COPY_BUFFER_SIZE = 16 * 1024 * 1024
+
+FileRanges = List[Tuple[int, int]]  # участки файла (offset, size)
+
+
+def concat_files(src_paths: Iterable[Path | str], dest_path: Path | str, mode='ab') -> None:
+    """Склеивает файлы в один, копируя их большими блоками"""
+    with open(dest_path, mode) as dest_file:
+        for src_path in src_paths:
+            with open(src_path, 'rb') as src_file:
+                shutil.copyfileobj(src_file, dest_file, COPY_BUFFER_SIZE)
+
+
+def copy_file_ranges(src_path: Path | str, ranges: FileRanges, dest_path: Path | str) -> None:
+    """Записывает в dest_path участки файла src_path в порядке ranges"""
+    with open(src_path, 'rb') as src_file, open(dest_path, 'wb') as dest_file:
+        for offset, size in ranges:
+            src_file.seek(offset)
+            while size > 0:
+                chunk = src_file.read(min(size, COPY_BUFFER_SIZE))
+                if not chunk:
+                    raise EOFError(f'{src_path} is shorter than {offset + size} bytes')
+                dest_file.write(chunk)
+                size -= len(chunk)
+
+
+def write_json_atomic(file_path: Path | str, data: Any) -> None:
+    """Записывает json во временный файл и заменяет им исходный, чтобы файл никогда не был записан частично"""
+    tmp_path = f'{file_path}.tmp'
+    with open(tmp_path, 'w') as file:
+        json.dump(data, file, indent=2)
+    os.replace(tmp_path, file_path)
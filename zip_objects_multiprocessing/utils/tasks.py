@@ -5,36 +5,163 @@
 """
 
 import os
+import time
+import itertools
 import traceback
-from dataclasses import dataclass
-from typing import List, Any
-from queue import Queue
-from multiprocessing import Pool, Manager
+import queue as thread_queue
+from queue import Empty
+from threading import Thread, Lock, Event, Condition
+from dataclasses import dataclass, field
+from typing import List, Any, Dict, Tuple
+from multiprocessing import Pool, Queue, Semaphore
 from abc import ABC, abstractmethod
 
 
+_results_queue: Queue = None  # очередь результатов процесса пула, задается в _init_pool_process
+_run_credits: List[Semaphore] = None  # сколько еще сообщений может отправить запуск, по слоту запуска
+
+
+def _init_pool_process(results_queue: Queue, run_credits: List[Semaphore]):
+    """Сохраняет очередь результатов и кредиты запусков в процессе пула (их нельзя передать в apply_async)"""
+    global _results_queue, _run_credits
+    _results_queue = results_queue
+    _run_credits = run_credits
+
+
+class _RunChannel:
+    """Отправка сообщений запуска: put ждет кредит, который возвращается, когда запуск забрал сообщение"""
+
+    def __init__(self, run_id: int):
+        self._credit = _run_credits[run_id % len(_run_credits)]
+
+    def put(self, message: Any):
+        self._credit.acquire()
+        _results_queue.put(message)
+
+
 @dataclass
 class TaskResult:
     task: Any
     result: Any = None
     error: str = None
     traceback_str: str = None
+    pid: int = None
+    wall_time_sec: float = 0.0
+    cpu_time_sec: float = 0.0
+    items_count: int = 0
+    bytes_read: int = 0
+    run_id: int = None
+
+
+@dataclass
+class TaskStarted:
+    task: Any
+    pid: int
+    started_at: float
+    run_id: int = None
+
+
+@dataclass
+class MessageBatch:
+    messages: List[Any]
+    pid: int = None
+    sent_at: float = None
+    run_id: int = None
+
+
+class BatchQueue:
+    """
+    Накапливает сообщения задачи и отправляет их в очередь пачками.
+
+    Пачка отправляется когда в ней набралось batch_size сообщений или когда с момента первого сообщения пачки
+    прошло batch_timeout_sec секунд: это проверяется при put и фоновым потоком, так что последняя неполная пачка
+    не ждет close, если сообщения перестали поступать. close отправляет оставшиеся сообщения и останавливает поток.
+    items_count считает отправленные сообщения, bytes_read задача может увеличивать сама - оба попадут в TaskResult.
+    """
+
+    def __init__(self, queue: Queue, batch_size: int = 1, batch_timeout_sec: float = None, run_id: int = None):
+        self._queue = queue
+        self._run_id = run_id
+        self._batch_size = batch_size
+        self._batch_timeout_sec = batch_timeout_sec
+        self._messages = []
+        self._batch_started_at = None
+        self._lock = Lock()
+        self._closed = Event()
+        self._flusher = None
+        if batch_timeout_sec is not None and batch_size > 1:
+            self._flusher = Thread(target=self._flush_expired, name='BatchQueueFlusher', daemon=True)
+            self._flusher.start()
+        self.items_count = 0
+        self.bytes_read = 0
+
+    def put(self, message: Any):
+        with self._lock:
+            if not self._messages:
+                self._batch_started_at = time.monotonic()
+            self._messages.append(message)
+            self.items_count += 1
+
+            if len(self._messages) >= self._batch_size or self._is_batch_expired():
+                self._send()
+
+    def flush(self):
+        with self._lock:
+            self._send()
+
+    def close(self):
+        self._closed.set()
+        if self._flusher is not None:
+            self._flusher.join()
+        self.flush()
+
+    def _send(self):
+        if self._messages:
+            self._queue.put(MessageBatch(self._messages, pid=os.getpid(), sent_at=time.time(), run_id=self._run_id))
+            self._messages = []
+
+    def _flush_expired(self):
+        timeout = self._batch_timeout_sec
+        while not self._closed.wait(timeout):
+            with self._lock:
+                if self._messages and self._is_batch_expired():
+                    self._send()
+                if self._messages:
+                    timeout = max(0.001, self._batch_started_at + self._batch_timeout_sec - time.monotonic())
+                else:
+                    timeout = self._batch_timeout_sec
+
+    def _is_batch_expired(self) -> bool:
+        if self._batch_timeout_sec is None:
+            return False
+        return time.monotonic() - self._batch_started_at >= self._batch_timeout_sec
 
 
 class TaskExecutor(ABC):
     @classmethod
-    def process_task(cls, queue: Queue, task: Any):
-        task_result = TaskResult(task=task)
+    def process_task(cls, task: Any, batch_size: int = 1, batch_timeout_sec: float = None, run_id: int = None):
+        channel = _RunChannel(run_id)
+        channel.put(TaskStarted(task=task, pid=os.getpid(), started_at=time.time(), run_id=run_id))
+        started_at, cpu_started_at = time.perf_counter(), time.process_time()
+
+        queue = BatchQueue(channel, batch_size, batch_timeout_sec, run_id)
+        task_result = TaskResult(task=task, pid=os.getpid(), run_id=run_id)
         try:
             task_result.result = cls.run(queue, task)
         except Exception as e:
             task_result.error = str(e)
             task_result.traceback_str = traceback.format_exc()
-        queue.put(task_result)
+        queue.close()
+
+        task_result.wall_time_sec = time.perf_counter() - started_at
+        task_result.cpu_time_sec = time.process_time() - cpu_started_at
+        task_result.items_count = queue.items_count
+        task_result.bytes_read = queue.bytes_read
+        channel.put(task_result)
 
     @classmethod
     @abstractmethod
-    def run(cls, queue: Queue, task: Any):
+    def run(cls, queue: BatchQueue, task: Any):
         """Parallel execution in separate process"""
         pass
 
@@ -43,32 +170,292 @@ class TaskExecutor(ABC):
         """Sequentially executes in main process"""
         pass
 
+    def on_progress_batch(self, messages: List[Any]):
+        """Sequentially executes in main process for every received batch, calls on_progress by default"""
+        for message in messages:
+            self.on_progress(message)
+
+    def on_task_done(self, task_result: TaskResult):
+        """Sequentially executes in main process when a task is finished (successfully or not)"""
+        pass
+
+
+@dataclass
+class WorkerState:
+    task: Any
+    started_at: float
+    last_message_at: float
+    items_count: int = 0
+
+
+@dataclass
+class RunnerStats:
+    """Метрики выполнения TaskRunner, обновляются в основном процессе"""
+    tasks_count: int
+    started_at: float = field(default_factory=time.time)
+    completed_tasks_count: int = 0
+    failed_tasks_count: int = 0
+    items_count: int = 0  # получено основным процессом через очередь
+    task_items_count: int = 0  # по TaskResult.items_count завершенных задач
+    bytes_read: int = 0
+    batches_count: int = 0
+    handler_time_sec: float = 0.0
+    queue_latency_sum_sec: float = 0.0
+    queue_latency_max_sec: float = 0.0
+    queue_depth: int = None
+    workers: Dict[int, WorkerState] = field(default_factory=dict)  # выполняемые задачи по pid процесса пула
+
+    @property
+    def elapsed_sec(self) -> float:
+        return time.time() - self.started_at
+
+    @property
+    def items_per_sec(self) -> float:
+        return max(self.items_count, self.task_items_count) / max(self.elapsed_sec, 1e-9)
+
+    @property
+    def queue_latency_avg_sec(self) -> float:
+        return self.queue_latency_sum_sec / self.batches_count if self.batches_count else 0.0
+
+    def stalled_workers(self, timeout_sec: float) -> List[WorkerState]:
+        """Процессы, от которых не было сообщений дольше timeout_sec"""
+        now = time.time()
+        return [worker for worker in self.workers.values() if now - worker.last_message_at > timeout_sec]
+
+
+class TaskRunnerHook:
+    """Получает метрики TaskRunner во время выполнения, методы вызываются в основном процессе"""
+
+    def on_task_done(self, task_result: TaskResult, stats: RunnerStats):
+        pass
+
+    def on_sample(self, stats: RunnerStats):
+        """Вызывается каждые sample_interval_sec секунд"""
+        pass
+
+
+class _RunQueue(thread_queue.Queue):
+    """Очередь сообщений запуска, каждое забранное сообщение возвращает кредит запуска процессам пула"""
+
+    def __init__(self, credit: Semaphore):
+        super().__init__()
+        self._credit = credit
+
+    def _get(self):
+        message = super()._get()
+        self._credit.release()
+        return message
+
+
+class TaskPool:
+    """
+    Долгоживущий пул процессов с очередью результатов, который можно использовать в нескольких TaskRunner.
+
+    Процессы и очередь создаются один раз, поэтому запуск задач не платит за старт интерпретатора и импорты.
+    Сообщения помечаются run_id запуска, поток-диспетчер раскладывает их по очередям запусков,
+    так что несколько TaskRunner могут выполняться на одном пуле одновременно (из разных потоков).
+    У каждого запуска не больше queue_maxsize не забранных сообщений: процессы пула ждут кредит запуска
+    (семафор его слота) перед отправкой, поэтому медленный запуск задерживает только свои задачи,
+    а память не растет. Одновременно открыто не больше max_runs запусков, open_run ждет освобождения слота.
+    maxtasksperchild перезапускает процесс пула после заданного количества задач.
+    """
+
+    def __init__(self, processes: int = None, queue_maxsize: int = 64, maxtasksperchild: int = None,
+                 max_runs: int = 32):
+        self.processes = processes or os.cpu_count()
+        self._queue = Queue(maxsize=queue_maxsize)
+        self._run_credits = [Semaphore(queue_maxsize) for _ in range(max_runs)]
+        self._pool = Pool(
+            processes=self.processes,
+            initializer=_init_pool_process,
+            initargs=(self._queue, self._run_credits),
+            maxtasksperchild=maxtasksperchild,
+        )
+        # run_id % max_runs - слот запуска, поэтому по run_id сообщения закрытого запуска можно вернуть кредит
+        self._run_generations = itertools.count()
+        self._free_slots = list(range(max_runs))
+        self._runs: Dict[int, _RunQueue] = {}
+        self._runs_lock = Condition(Lock())
+        self._stopped = Event()
+        self._dispatcher = Thread(target=self._dispatch, name='TaskPoolDispatcher', daemon=True)
+        self._dispatcher.start()
+
+    def open_run(self) -> Tuple[int, thread_queue.Queue]:
+        """Регистрирует запуск и возвращает его run_id и очередь сообщений"""
+        with self._runs_lock:
+            self._runs_lock.wait_for(lambda: self._free_slots)
+            slot = self._free_slots.pop()
+            run_id = next(self._run_generations) * len(self._run_credits) + slot
+            self._runs[run_id] = _RunQueue(self._run_credits[slot])
+            return run_id, self._runs[run_id]
+
+    def close_run(self, run_id: int):
+        """Сообщения завершенного (или прерванного) запуска дальше отбрасываются, уже отправленные задачи доработают"""
+        with self._runs_lock:
+            run_messages = self._runs.pop(run_id, None)
+            if run_messages is None:
+                return
+            self._free_slots.append(run_id % len(self._run_credits))
+            self._runs_lock.notify()
+
+        # не забранные сообщения возвращают кредиты
+        while True:
+            try:
+                run_messages.get_nowait()
+            except Empty:
+                break
+
+    def submit(self, run_id: int, task_executor: 'TaskExecutor', task: Any,
+               batch_size: int = 1, batch_timeout_sec: float = None):
+        self._pool.apply_async(task_executor.process_task, (task, batch_size, batch_timeout_sec, run_id))
+
+    def queue_depth(self) -> int | None:
+        try:
+            return self._queue.qsize()
+        except NotImplementedError:  # macOS
+            return None
+
+    def close(self):
+        """Дожидается выполнения отправленных задач и останавливает пул"""
+        self._pool.close()
+        self._pool.join()
+        self._stop_dispatcher()
+
+    def terminate(self):
+        """Останавливает пул не дожидаясь задач"""
+        self._pool.terminate()
+        self._stop_dispatcher()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.terminate()
+
+    def _stop_dispatcher(self):
+        self._stopped.set()
+        self._dispatcher.join()
+
+    def _dispatch(self):
+        # очереди запусков не ограничены (их ограничивают кредиты), поэтому диспетчер никогда не ждет запуск
+        while not self._stopped.is_set():
+            try:
+                message = self._queue.get(timeout=0.1)
+            except Empty:
+                continue
+
+            # под блокировкой, чтобы close_run не пропустил сообщение при возврате кредитов
+            with self._runs_lock:
+                run_messages = self._runs.get(message.run_id)
+                if run_messages is None:
+                    # запуск закрыт: сообщение отбрасывается, кредит возвращается
+                    self._run_credits[message.run_id % len(self._run_credits)].release()
+                else:
+                    run_messages.put(message)
+
 
 class TaskRunner:
-    def __init__(self, task_executor: TaskExecutor, tasks: List, skip_errors=False):
+    """
+    Выполняет задачи в пуле процессов.
+
+    Процессы пула берут задачи по одной в порядке списка tasks по мере освобождения,
+    поэтому задачи стоит делить на соразмерные части и передавать самые большие первыми.
+    Если передан pool (TaskPool), задачи выполняются в нем, иначе на время run создается временный пул.
+
+    Сообщения задач передаются через multiprocessing.Queue пачками (см. BatchQueue).
+    У запуска не больше queue_maxsize не обработанных пачек, поэтому если on_progress не успевает обрабатывать
+    сообщения, процессы пула блокируются на отправке, а не копят результаты в памяти (см. TaskPool).
+
+    Метрики выполнения собираются в stats, hook получает их по мере выполнения задач
+    и каждые sample_interval_sec секунд (вместе с размером очереди).
+    """
+
+    def __init__(self, task_executor: TaskExecutor, tasks: List, skip_errors=False, processes: int = None,
+                 batch_size: int = 1, batch_timeout_sec: float = None, queue_maxsize: int = 64,
+                 hook: TaskRunnerHook = None, sample_interval_sec: float = 1.0, pool: TaskPool = None):
         self._task_executor = task_executor
         self._tasks = tasks
         self._skip_errors = skip_errors
+        self._batch_size = batch_size
+        self._batch_timeout_sec = batch_timeout_sec
+        self._queue_maxsize = queue_maxsize
+        self._hook = hook
+        self._sample_interval_sec = sample_interval_sec
+        self._pool = pool
+        self.stats = RunnerStats(tasks_count=len(tasks))
         self._completed_tasks_count = 0
         self._results: List[TaskResult] = []
-        self._num_processes = os.cpu_count() if len(self._tasks) > os.cpu_count() else len(self._tasks)
+        self._num_processes = max(1, min(processes or os.cpu_count(), len(self._tasks)))
 
     def run(self) -> Any:
-        with Pool(processes=self._num_processes) as pool, Manager() as manager:
-            queue = manager.Queue()
+        if self._pool is not None:
+            return self._run(self._pool)
+
+        with TaskPool(processes=self._num_processes, queue_maxsize=self._queue_maxsize) as pool:
+            return self._run(pool)
 
+    def _run(self, pool: TaskPool) -> Any:
+        run_id, messages = pool.open_run()
+        try:
             for task in self._tasks:
-                pool.apply_async(self._task_executor.process_task, (queue, task))
+                pool.submit(run_id, self._task_executor, task, self._batch_size, self._batch_timeout_sec)
 
+            next_sample_at = time.monotonic()
             while self._completed_tasks_count < len(self._tasks):
-                message = queue.get()
+                if self._hook is not None and time.monotonic() >= next_sample_at:
+                    self._sample(pool, messages)
+                    next_sample_at = time.monotonic() + self._sample_interval_sec
+
+                try:
+                    timeout = None if self._hook is None else max(0.0, next_sample_at - time.monotonic())
+                    message = messages.get(timeout=timeout)
+                except Empty:
+                    continue
+
+                handler_started_at = time.perf_counter()
+                if type(message) == TaskStarted:
+                    self.stats.workers[message.pid] = WorkerState(message.task, message.started_at, time.time())
 
-                if type(message) == TaskResult:
+                elif type(message) == TaskResult:
                     self._completed_tasks_count += 1
                     self._results.append(message)
+                    self._on_task_result(message)
+                    self._task_executor.on_task_done(message)
+                    self.stats.handler_time_sec += time.perf_counter() - handler_started_at
+                    if self._hook is not None:
+                        self._hook.on_task_done(message, self.stats)
                     if message.error and not self._skip_errors:
                         break
+
                 else:
-                    self._task_executor.on_progress(message)
+                    self._on_message_batch(message)
+                    self._task_executor.on_progress_batch(message.messages)
+                    self.stats.handler_time_sec += time.perf_counter() - handler_started_at
+        finally:
+            pool.close_run(run_id)
 
         return self._results
+
+    def _on_task_result(self, task_result: TaskResult):
+        self.stats.completed_tasks_count += 1
+        self.stats.failed_tasks_count += task_result.error is not None
+        self.stats.task_items_count += task_result.items_count
+        self.stats.bytes_read += task_result.bytes_read
+        self.stats.workers.pop(task_result.pid, None)
+
+    def _on_message_batch(self, batch: MessageBatch):
+        now = time.time()
+        latency = now - batch.sent_at
+        self.stats.items_count += len(batch.messages)
+        self.stats.batches_count += 1
+        self.stats.queue_latency_sum_sec += latency
+        self.stats.queue_latency_max_sec = max(self.stats.queue_latency_max_sec, latency)
+
+        if worker := self.stats.workers.get(batch.pid):
+            worker.last_message_at = now
+            worker.items_count += len(batch.messages)
+
+    def _sample(self, pool: TaskPool, messages: thread_queue.Queue):
+        pool_queue_depth = pool.queue_depth()
+        self.stats.queue_depth = None if pool_queue_depth is None else pool_queue_depth + messages.qsize()
+        self._hook.on_sample(self.stats)
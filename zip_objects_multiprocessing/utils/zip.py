@@ -1,26 +1,333 @@
 import os
+import bz2
+import mmap
+import time
+import zlib
+import struct
 from pathlib import Path
-from zipfile import ZipFile, ZIP_DEFLATED, is_zipfile
-from typing import Iterable, Tuple, Generator, TypeVar
+from itertools import islice
+from collections import deque
+from dataclasses import dataclass
+from concurrent.futures import Executor, ThreadPoolExecutor, ProcessPoolExecutor
+from zipfile import ZipFile, ZIP_DEFLATED, ZIP_STORED, ZIP_BZIP2, BadZipFile, LargeZipFile
+from typing import Iterable, Tuple, Generator, TypeVar, List
 
 AnyStr = TypeVar('AnyStr', bytes, str)
 
+_EOCD_STRUCT = struct.Struct('<4s4H2LH')
+_CENTRAL_DIR_STRUCT = struct.Struct('<4s6H3L5H2L')
+_LOCAL_HEADER_STRUCT = struct.Struct('<4s5H3L2H')
+_EOCD_SIGNATURE = b'PK\x05\x06'
+_CENTRAL_DIR_SIGNATURE = b'PK\x01\x02'
+_LOCAL_HEADER_SIGNATURE = b'PK\x03\x04'
+_EOCD_MAX_COMMENT_SIZE = 0xFFFF
+_FLAG_ENCRYPTED = 0x1
+_FLAG_UTF8 = 0x800
+_ZIP_VERSION = 20
+_ZIP_BZIP2_VERSION = 46
+_ZIP_UNIX_SYSTEM = 3
+_ZIP_MAX_SIZE = 0xFFFFFFFF
+_ZIP_MAX_ENTRIES = 0xFFFF
 
-def create_zip_archive(file_path: Path | str, files: Iterable[Tuple[str, AnyStr]]) -> None:
-    with ZipFile(file_path, 'w', ZIP_DEFLATED) as zf:
-        for file_name, content in files:
-            zf.writestr(file_name, content)
 
+@dataclass(frozen=True)
+class ZipPart:
+    """Диапазон файлов [start, stop) zip-архива в порядке центрального каталога"""
+    file_path: str
+    start: int
+    stop: int
+    compress_size: int
 
-def read_zip_archive(file_path: Path | str) -> Generator[Tuple[str, AnyStr], None, None]:
+
+@dataclass(frozen=True)
+class ZipEntry:
+    """Запись центрального каталога zip-архива"""
+    filename: str
+    header_offset: int
+    compress_type: int
+    compress_size: int
+    file_size: int
+    crc: int
+
+
+@dataclass(frozen=True)
+class CompressedMember:
+    filename: str
+    compress_type: int
+    crc: int
+    file_size: int
+    data: bytes
+
+
+def compress_member(file_name: str, content: AnyStr, compression: int, compresslevel: int | None,
+                    stored_max_size: int) -> CompressedMember:
+    """Сжимает файл так же, как ZipFile.writestr (файлы до stored_max_size байт не сжимаются)"""
+    content = content.encode('utf-8') if isinstance(content, str) else content
+    if len(content) <= stored_max_size:
+        compression = ZIP_STORED
+
+    if compression == ZIP_STORED:
+        data = content
+    elif compression == ZIP_DEFLATED:
+        compressor = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION if compresslevel is None else compresslevel,
+                                      zlib.DEFLATED, -zlib.MAX_WBITS)
+        data = compressor.compress(content) + compressor.flush()
+    elif compression == ZIP_BZIP2:
+        data = bz2.compress(content, 9 if compresslevel is None else compresslevel)
+    else:
+        raise ValueError(f'Compression {compression} is not supported')
+
+    return CompressedMember(file_name, compression, zlib.crc32(content), len(content), data)
+
+
+def _compress_members(args: List[Tuple[str, AnyStr, int, int | None, int]]) -> List[CompressedMember]:
+    return [compress_member(*member_args) for member_args in args]
+
+
+def _dos_date_time(timestamp: float) -> Tuple[int, int]:
+    t = time.localtime(timestamp)
+    return (t.tm_year - 1980) << 9 | t.tm_mon << 5 | t.tm_mday, t.tm_hour << 11 | t.tm_min << 5 | t.tm_sec // 2
+
+
+def write_compressed_zip_archive(file_path: Path | str, members: Iterable[CompressedMember]) -> None:
+    """
+    Записывает уже сжатые файлы в zip-архив в переданном порядке.
+
+    Формат совпадает с тем, что пишет ZipFile.writestr, но без zip64: архивы больше 4 ГБ
+    или больше 65535 файлов вызывают LargeZipFile.
+    """
+    dos_date, dos_time = _dos_date_time(time.time())
+    central_dir = bytearray()
+    entries_count = 0
+
+    with open(file_path, 'wb') as file:
+        for member in members:
+            header_offset = file.tell()
+            if header_offset > _ZIP_MAX_SIZE or max(len(member.data), member.file_size) > _ZIP_MAX_SIZE:
+                raise LargeZipFile('Zip64 is not supported by write_compressed_zip_archive')
+
+            try:
+                filename, flags = member.filename.encode('ascii'), 0
+            except UnicodeEncodeError:
+                filename, flags = member.filename.encode('utf-8'), _FLAG_UTF8
+            version = _ZIP_BZIP2_VERSION if member.compress_type == ZIP_BZIP2 else _ZIP_VERSION
+
+            file.write(_LOCAL_HEADER_STRUCT.pack(
+                _LOCAL_HEADER_SIGNATURE, version, flags, member.compress_type, dos_time, dos_date,
+                member.crc, len(member.data), member.file_size, len(filename), 0,
+            ))
+            file.write(filename)
+            file.write(member.data)
+
+            central_dir += _CENTRAL_DIR_STRUCT.pack(
+                _CENTRAL_DIR_SIGNATURE, _ZIP_UNIX_SYSTEM << 8 | version, version, flags, member.compress_type,
+                dos_time, dos_date, member.crc, len(member.data), member.file_size, len(filename), 0, 0, 0, 0,
+                0o600 << 16, header_offset,
+            )
+            central_dir += filename
+            entries_count += 1
+
+        central_dir_offset = file.tell()
+        if entries_count > _ZIP_MAX_ENTRIES or central_dir_offset + len(central_dir) > _ZIP_MAX_SIZE:
+            raise LargeZipFile('Zip64 is not supported by write_compressed_zip_archive')
+
+        file.write(central_dir)
+        file.write(_EOCD_STRUCT.pack(
+            _EOCD_SIGNATURE, 0, 0, entries_count, entries_count, len(central_dir), central_dir_offset, 0,
+        ))
+
+
+def create_zip_archive(file_path: Path | str, files: Iterable[Tuple[str, AnyStr]], compression: int = ZIP_DEFLATED,
+                       compresslevel: int = None, stored_max_size: int = 0, workers: int = 1,
+                       use_processes: bool = False, chunk_size: int = 64) -> None:
+    """
+    Создает zip-архив.
+
+    Файлы размером до stored_max_size байт сохраняются без сжатия.
+    При workers > 1 файлы сжимаются параллельно пачками по chunk_size (в потоках - zlib и bz2 отпускают GIL,
+    или в процессах при use_processes) и записываются в архив уже сжатыми в исходном порядке.
+    В памяти одновременно держится не больше workers * 2 пачек. Параллельно поддерживаются STORED, DEFLATED и BZIP2.
+    """
+    if workers <= 1:
+        with ZipFile(file_path, 'w', compression, compresslevel=compresslevel) as zf:
+            for file_name, content in files:
+                # размер сравнивается в байтах, как в compress_member
+                content = content.encode('utf-8') if isinstance(content, str) else content
+                if len(content) <= stored_max_size:
+                    zf.writestr(file_name, content, compress_type=ZIP_STORED)
+                else:
+                    zf.writestr(file_name, content)
+        return
+
+    executor_class = ProcessPoolExecutor if use_processes else ThreadPoolExecutor
+    with executor_class(max_workers=workers) as executor:
+        members = _compress_in_order(executor, files, compression, compresslevel, stored_max_size, workers, chunk_size)
+        write_compressed_zip_archive(file_path, members)
+
+
+def _compress_in_order(executor: Executor, files: Iterable[Tuple[str, AnyStr]], compression: int,
+                       compresslevel: int | None, stored_max_size: int, workers: int,
+                       chunk_size: int) -> Generator[CompressedMember, None, None]:
+    files = iter(files)
+    pending = deque()
+
+    while True:
+        while len(pending) < workers * 2:
+            chunk = [(name, content, compression, compresslevel, stored_max_size)
+                     for name, content in islice(files, chunk_size)]
+            if not chunk:
+                break
+            pending.append(executor.submit(_compress_members, chunk))
+
+        if not pending:
+            return
+        yield from pending.popleft().result()
+
+
+def read_zip_archive(file_path: Path | str, start: int = None,
+                     stop: int = None) -> Generator[Tuple[str, AnyStr], None, None]:
     with ZipFile(file_path, 'r') as zf:
-        for file_name in zf.namelist():
-            with zf.open(file_name) as file:
-                yield file_name, file.read()
+        for zip_info in zf.infolist()[start:stop]:
+            with zf.open(zip_info) as file:
+                yield zip_info.filename, file.read()
+
+
+def _parse_central_directory(data: mmap.mmap) -> List[ZipEntry] | None:
+    """
+    Разбирает центральный каталог отображенного в память архива.
+
+    Возвращает None для архивов, которые проще прочитать через ZipFile (zip64, шифрование, сжатие кроме deflate).
+    """
+    eocd_offset = data.rfind(_EOCD_SIGNATURE, max(0, len(data) - _EOCD_MAX_COMMENT_SIZE - _EOCD_STRUCT.size))
+    if eocd_offset < 0:
+        raise BadZipFile('File is not a zip file')
+
+    *_, entries_count, central_dir_size, central_dir_offset, _ = _EOCD_STRUCT.unpack_from(data, eocd_offset)
+    if entries_count == 0xFFFF or central_dir_size == 0xFFFFFFFF or central_dir_offset == 0xFFFFFFFF:
+        return None
+    # данные перед архивом (например, самораспаковывающийся exe) сдвигают все смещения
+    prefix_size = eocd_offset - central_dir_size - central_dir_offset
+
+    entries = []
+    offset = central_dir_offset + prefix_size
+    for _ in range(entries_count):
+        (signature, _, _, flags, compress_type, _, _, crc, compress_size, file_size,
+         name_size, extra_size, comment_size, _, _, _, header_offset) = _CENTRAL_DIR_STRUCT.unpack_from(data, offset)
+        if signature != _CENTRAL_DIR_SIGNATURE:
+            raise BadZipFile('Bad magic number for central directory')
+        if flags & _FLAG_ENCRYPTED or compress_type not in (ZIP_STORED, ZIP_DEFLATED):
+            return None
+        if compress_size == 0xFFFFFFFF or file_size == 0xFFFFFFFF or header_offset == 0xFFFFFFFF:
+            return None
+
+        name_offset = offset + _CENTRAL_DIR_STRUCT.size
+        filename = data[name_offset:name_offset + name_size].decode('utf-8' if flags & _FLAG_UTF8 else 'cp437')
+        entries.append(ZipEntry(filename, header_offset + prefix_size, compress_type, compress_size, file_size, crc))
+        offset = name_offset + name_size + extra_size + comment_size
+
+    return entries
+
+
+def _read_entry(view: memoryview, entry: ZipEntry) -> bytes | memoryview:
+    signature, *_, name_size, extra_size = _LOCAL_HEADER_STRUCT.unpack_from(view, entry.header_offset)
+    if signature != _LOCAL_HEADER_SIGNATURE:
+        raise BadZipFile(f'Bad magic number for file header of {entry.filename}')
+
+    data_offset = entry.header_offset + _LOCAL_HEADER_STRUCT.size + name_size + extra_size
+    content = view[data_offset:data_offset + entry.compress_size]
+    if entry.compress_type == ZIP_DEFLATED:
+        content = zlib.decompress(content, -zlib.MAX_WBITS, entry.file_size)
+
+    if zlib.crc32(content) != entry.crc:
+        raise BadZipFile(f'Bad CRC-32 for file {entry.filename}')
+    return content
+
+
+def read_zip_entries(file_path: Path | str) -> List[ZipEntry]:
+    """Читает центральный каталог архива"""
+    with open(file_path, 'rb') as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            raise BadZipFile('File is not a zip file')
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            entries = _parse_central_directory(data)
+
+    if entries is None:
+        with ZipFile(file_path, 'r') as zf:
+            entries = [
+                ZipEntry(i.filename, i.header_offset, i.compress_type, i.compress_size, i.file_size, i.CRC)
+                for i in zf.infolist()
+            ]
+    return entries
+
+
+def read_zip_archive_mmap(file_path: Path | str, start: int = None,
+                          stop: int = None) -> Generator[Tuple[str, bytes | memoryview], None, None]:
+    """
+    Читает файлы архива через mmap, один раз разбирая центральный каталог.
+
+    Несжатые файлы возвращаются как memoryview без копирования, они действительны только до следующей итерации.
+    Архивы, которые не поддерживает _parse_central_directory, читаются через read_zip_archive.
+    """
+    with open(file_path, 'rb') as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            raise BadZipFile('File is not a zip file')
+        data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    try:
+        entries = _parse_central_directory(data)
+        if entries is None:
+            yield from read_zip_archive(file_path, start, stop)
+            return
+
+        with memoryview(data) as view:
+            for entry in entries[start:stop]:
+                yield entry.filename, _read_entry(view, entry)
+    finally:
+        try:
+            data.close()
+        except BufferError:
+            pass  # снаружи остались ссылки на несжатые файлы, mmap закроется сборщиком мусора
+
+
+def read_zip_part(zip_part: ZipPart) -> Generator[Tuple[str, bytes | memoryview], None, None]:
+    yield from read_zip_archive_mmap(zip_part.file_path, zip_part.start, zip_part.stop)
+
+
+def split_zip_archive(file_path: Path | str, max_part_size: int) -> List[ZipPart]:
+    """Делит архив на части, в каждой из которых сжатых данных не больше max_part_size (но минимум 1 файл)"""
+    entries = read_zip_entries(file_path)
+
+    parts = []
+    start, part_size = 0, 0
+    for i, entry in enumerate(entries):
+        if i > start and part_size + entry.compress_size > max_part_size:
+            parts.append(ZipPart(str(file_path), start, i, part_size))
+            start, part_size = i, 0
+        part_size += entry.compress_size
+
+    if start < len(entries):
+        parts.append(ZipPart(str(file_path), start, len(entries), part_size))
+
+    return parts
+
+
+def dir_zip_files(path: Path, recursive: bool = False, extensions: Tuple[str, ...] = ('.zip',),
+                  min_size: int = 1, max_size: int = None) -> Generator[Path, None, None]:
+    """
+    Находит архивы в директории по расширению и размеру через os.scandir, не открывая сами файлы.
+
+    Содержимое не проверяется, поврежденный архив выдаст BadZipFile при чтении.
+    """
+    with os.scandir(path) as dir_entries:
+        for dir_entry in dir_entries:
+            if dir_entry.is_dir():
+                if recursive:
+                    yield from dir_zip_files(Path(dir_entry.path), recursive, extensions, min_size, max_size)
+                continue
 
+            if not dir_entry.is_file() or not dir_entry.name.lower().endswith(extensions):
+                continue
 
-def dir_zip_files(path: Path) -> Generator[str, None, None]:
-    for file_name in os.listdir(path):
-        file_path = path / str(file_name)
-        if is_zipfile(file_path):
-            yield file_path
+            size = dir_entry.stat().st_size
+            if size >= min_size and (max_size is None or size <= max_size):
+                yield Path(dir_entry.path)
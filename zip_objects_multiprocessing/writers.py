@@ -0,0 +1,202 @@
+import os
+import csv
+import sys
+import mmap
+from array import array
+from pathlib import Path
+from threading import Lock
+from abc import ABC, abstractmethod
+from typing import TextIO, Iterable, List
+
+from schemas import Obj, ObjRecord, format_uuid
+
+
+class ObjWriter(ABC):
+    @abstractmethod
+    def write(self, objs: Iterable[Obj | ObjRecord]):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class LockedObjWriter(ObjWriter):
+    """Обертка над ObjWriter для записи из нескольких потоков, lock можно брать снаружи (например для flush файлов)"""
+
+    def __init__(self, writer: ObjWriter):
+        self._writer = writer
+        self.lock = Lock()
+
+    def write(self, objs: Iterable[Obj | ObjRecord]):
+        with self.lock:
+            self._writer.write(objs)
+
+    def close(self):
+        with self.lock:
+            self._writer.close()
+
+
+class ObjCsvWriter(ObjWriter):
+    """Записывает объекты в 2 csv файла: id, level и id, object_name"""
+
+    id_level_file_name = 'id_level.csv'
+    id_object_name_file_name = 'id_object_name.csv'
+
+    def __init__(self, id_level_file: TextIO, id_object_name_file: TextIO, csv_delimiter=','):
+        self._id_level_writer = csv.writer(id_level_file, delimiter=csv_delimiter)
+        self._id_object_name_writer = csv.writer(id_object_name_file, delimiter=csv_delimiter)
+
+    def write(self, objs: Iterable[Obj | ObjRecord]):
+        id_level_rows, id_object_name_rows = [], []
+        for obj in objs:
+            if isinstance(obj, ObjRecord):
+                obj_id, level = format_uuid(obj.id), obj.level
+            else:
+                obj_id, level = obj.vars['id'], obj.vars['level']
+            id_level_rows.append((obj_id, level))
+            id_object_name_rows.extend([(obj_id, o) for o in obj.objects])
+
+        self._id_level_writer.writerows(id_level_rows)
+        self._id_object_name_writer.writerows(id_object_name_rows)
+
+
+def _uuid_bytes(value: str) -> bytes:
+    data = bytes.fromhex(value.replace('-', ''))
+    if len(data) != 16:
+        raise ValueError(f'"{value}" is not uuid')
+    return data
+
+
+def _to_little_endian(values: array) -> array:
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values
+
+
+class ObjColumnarWriter(ObjWriter):
+    """
+    Записывает объекты в директорию с бинарными колонками фиксированной ширины (little-endian):
+
+    ids.bin - id объектов, по 16 байт uuid
+    levels.bin - level объектов, uint16
+    objects_offsets.bin - uint64, на 1 больше чем объектов: имена объекта i это objects[offsets[i]:offsets[i + 1]]
+    objects.bin - имена объектов, по 16 байт uuid
+
+    id и имена объектов должны быть uuid, level - целым числом от 0 до 65535.
+    Если директория уже содержит колонки, объекты дописываются в конец.
+    """
+
+    ids_file_name = 'ids.bin'
+    levels_file_name = 'levels.bin'
+    objects_offsets_file_name = 'objects_offsets.bin'
+    objects_file_name = 'objects.bin'
+
+    def __init__(self, dir_path: Path | str):
+        dir_path = Path(dir_path)
+        dir_path.mkdir(parents=True, exist_ok=True)
+
+        offsets_path = dir_path / self.objects_offsets_file_name
+        self._objects_offset = 0
+        if offsets_path.exists() and offsets_path.stat().st_size:
+            with open(offsets_path, 'rb') as offsets_file:
+                offsets_file.seek(-8, os.SEEK_END)
+                self._objects_offset = int.from_bytes(offsets_file.read(8), 'little')
+
+        self._ids_file = open(dir_path / self.ids_file_name, 'ab')
+        self._levels_file = open(dir_path / self.levels_file_name, 'ab')
+        self._offsets_file = open(offsets_path, 'ab')
+        self._objects_file = open(dir_path / self.objects_file_name, 'ab')
+
+        if self._offsets_file.tell() == 0:
+            self._offsets_file.write(_to_little_endian(array('Q', [0])))
+
+    def write(self, objs: Iterable[Obj | ObjRecord]):
+        """Пачка проверяется целиком до записи, поэтому при ошибке в файлы не попадает ни один объект пачки"""
+        ids, objects = bytearray(), bytearray()
+        levels, offsets = array('H'), array('Q')
+        objects_offset = self._objects_offset
+
+        for obj in objs:
+            if isinstance(obj, ObjRecord):
+                obj_id, level, object_ids = obj.id, obj.level, obj.object_ids
+            else:
+                obj_id, level = _uuid_bytes(obj.vars['id']), int(obj.vars['level'])
+                object_ids = b''.join(_uuid_bytes(object_name) for object_name in obj.objects)
+            if not 0 <= level <= 0xFFFF:
+                raise ValueError(f'Level {level} does not fit into uint16')
+
+            ids += obj_id
+            levels.append(level)
+            objects += object_ids
+            objects_offset += len(object_ids) // 16
+            offsets.append(objects_offset)
+
+        self._ids_file.write(ids)
+        self._levels_file.write(_to_little_endian(levels))
+        self._offsets_file.write(_to_little_endian(offsets))
+        self._objects_file.write(objects)
+        self._objects_offset = objects_offset
+
+    def close(self):
+        for file in (self._ids_file, self._levels_file, self._offsets_file, self._objects_file):
+            file.close()
+
+
+class ObjColumnarReader:
+    """
+    Читает колонки ObjColumnarWriter через mmap без копирования.
+
+    ids, levels, offsets и objects - memoryview поверх отображенных в память файлов
+    (levels и offsets приведены к uint16 и uint64, поэтому читать их напрямую можно только на little-endian машинах).
+    """
+
+    def __init__(self, dir_path: Path | str):
+        dir_path = Path(dir_path)
+        self._mmaps: List[mmap.mmap] = []
+
+        self.ids = self._map(dir_path / ObjColumnarWriter.ids_file_name)
+        self.levels = self._map(dir_path / ObjColumnarWriter.levels_file_name).cast('H')
+        self.offsets = self._map(dir_path / ObjColumnarWriter.objects_offsets_file_name).cast('Q')
+        self.objects = self._map(dir_path / ObjColumnarWriter.objects_file_name)
+
+    def __len__(self) -> int:
+        return len(self.levels)
+
+    def obj_id(self, i: int) -> memoryview:
+        return self.ids[i * 16:(i + 1) * 16]
+
+    def object_names(self, i: int) -> List[memoryview]:
+        return [self.objects[j * 16:(j + 1) * 16] for j in range(self.offsets[i], self.offsets[i + 1])]
+
+    def obj(self, i: int) -> Obj:
+        """Собирает Obj (с копированием) - для проверки и отладки"""
+        return Obj(
+            vars={'id': format_uuid(self.obj_id(i)), 'level': str(self.levels[i])},
+            objects=[format_uuid(name) for name in self.object_names(i)],
+        )
+
+    def close(self):
+        for view in (self.ids, self.levels, self.offsets, self.objects):
+            view.release()
+        for mm in self._mmaps:
+            mm.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def _map(self, file_path: Path) -> memoryview:
+        with open(file_path, 'rb') as file:
+            if os.fstat(file.fileno()).st_size == 0:
+                return memoryview(b'')
+            mm = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._mmaps.append(mm)
+        return memoryview(mm)